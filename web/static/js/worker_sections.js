@@ -0,0 +1,155 @@
+/* Worker sections of the iteration page are loaded when they are expanded and scrolled into view,
+   their forms are submitted in the background and the section is replaced by the response.
+   Changes of other users come from the iteration events stream, loaded sections of changed workers are reloaded. */
+(function () {
+  'use strict';
+
+  var headers = {'X-Requested-With': 'XMLHttpRequest'};
+  var eventsUrl = document.currentScript.dataset.events;
+
+  function request(url, options) {
+    options = Object.assign({headers: headers, credentials: 'same-origin'}, options);
+    return fetch(url, options).then(function (response) {
+      return response.text().then(function (text) {
+        if (!response.ok) {
+          throw new Error(text || response.statusText);
+        }
+        return text;
+      });
+    });
+  }
+
+  function section(workerId) {
+    return document.querySelector('.worker-section[data-worker="' + workerId + '"]');
+  }
+
+  function show(details, html) {
+    var container = details.querySelector('.worker-reports');
+    container.innerHTML = html;
+    container.dataset.loaded = 'true';
+    // counters are taken from the rows classes
+    details.querySelectorAll('[data-count]').forEach(function (counter) {
+      counter.textContent = container.querySelectorAll('tr.bg-' + counter.dataset.count).length;
+    });
+  }
+
+  function load(details) {
+    var container = details.querySelector('.worker-reports');
+    return request(container.dataset.url).then(function (html) {
+      show(details, html);
+    });
+  }
+
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        load(entry.target.closest('.worker-section')).catch(function (error) {
+          entry.target.textContent = error.message;
+        });
+      }
+    });
+  });
+
+  document.querySelectorAll('.worker-section .worker-reports').forEach(function (container) {
+    observer.observe(container);
+  });
+
+  document.addEventListener('submit', function (event) {
+    var form = event.target;
+    var details = form.closest('.worker-section');
+    if (!details || event.defaultPrevented) {
+      return;
+    }
+    event.preventDefault();
+    request(form.action, {method: 'POST', body: new FormData(form)}).then(function (html) {
+      show(details, html);
+      // the report is moved to another worker section
+      var worker = form.elements.worker;
+      var other = worker && worker.value !== details.dataset.worker ? section(worker.value) : null;
+      if (other && other.querySelector('.worker-reports').dataset.loaded) {
+        return load(other);
+      }
+    }).catch(function (error) {
+      window.alert(error.message);
+    });
+  });
+
+  function isLoaded(details) {
+    return Boolean(details.querySelector('.worker-reports').dataset.loaded);
+  }
+
+  function reload(details) {
+    // a section with a focused form is reloaded when the focus leaves it
+    if (details.contains(document.activeElement)) {
+      details.dataset.stale = 'true';
+      return;
+    }
+    delete details.dataset.stale;
+    load(details).catch(function () {
+      details.dataset.stale = 'true';
+    });
+  }
+
+  document.addEventListener('focusout', function (event) {
+    var details = event.target.closest && event.target.closest('.worker-section[data-stale]');
+    if (details && !details.contains(event.relatedTarget)) {
+      reload(details);
+    }
+  });
+
+  function reloadAll() {
+    document.querySelectorAll('.worker-section').forEach(function (details) {
+      if (isLoaded(details)) {
+        reload(details);
+      }
+    });
+  }
+
+  function onReports(event) {
+    var data = JSON.parse(event.data);
+    Object.keys(data.workers).forEach(function (workerId) {
+      var details = section(workerId);
+      if (!details) {
+        return;
+      }
+      if (isLoaded(details)) {
+        reload(details);
+        return;
+      }
+      var totals = {warning: 'planned', info: 'in_progress', success: 'done'};
+      details.querySelectorAll('[data-count]').forEach(function (counter) {
+        counter.textContent = data.workers[workerId][totals[counter.dataset.count]];
+      });
+    });
+  }
+
+  function onIteration(event) {
+    var comment = document.querySelector('#iteration_update [name="comment"]');
+    if (comment && comment !== document.activeElement) {
+      comment.value = JSON.parse(event.data).comment;
+    }
+  }
+
+  if (eventsUrl && window.EventSource) {
+    var source = new EventSource(eventsUrl);
+    var connected = false;
+    source.addEventListener('reports', onReports);
+    source.addEventListener('iteration', onIteration);
+    // events are lost if the client is too slow or disconnected
+    source.addEventListener('overflow', reloadAll);
+    source.addEventListener('open', function () {
+      if (connected) {
+        reloadAll();
+      }
+      connected = true;
+    });
+  }
+
+  // report links point to worker anchors
+  var match = window.location.hash.match(/^#worker_(\d+)$/);
+  if (match && section(match[1])) {
+    section(match[1]).open = true;
+    section(match[1]).scrollIntoView();
+  }
+})();
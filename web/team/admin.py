@@ -2,7 +2,46 @@ from django.contrib import admin
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
-from team.models import Iteration, Report, Task, Tracker, Worker
+from team import cache, stats
+from team.models import ExportJob, Iteration, Report, Task, Tracker, Worker
+from team.pagination import EstimatedCountPaginator
+from team.signals import reports_bulk_changed
+
+RECENT_ITERATIONS = 10
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Changelist without full COUNT(*) queries of big tables"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class RecentIterationFilter(admin.SimpleListFilter):
+    """Filter by the latest iterations instead of all ones"""
+    title = _('iteration')
+    parameter_name = 'iteration'
+
+    def lookups(self, request, model_admin):
+        return [(str(i.pk), str(i)) for i in Iteration.objects.order_by('-start')[:RECENT_ITERATIONS]]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(iteration_id=self.value())
+        return queryset
+
+
+class EnabledWorkerFilter(admin.SimpleListFilter):
+    """Filter by enabled workers only"""
+    title = _('worker')
+    parameter_name = 'worker'
+
+    def lookups(self, request, model_admin):
+        return [(str(w.pk), w.name) for w in Worker.objects.filter(disabled=False).only('pk', 'name')]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(worker_id=self.value())
+        return queryset
 
 
 class TrackerAdmin(admin.ModelAdmin):
@@ -12,12 +51,13 @@ class TrackerAdmin(admin.ModelAdmin):
 
 def disable_workers(_, __, queryset):
     queryset.update(disabled=True)
+    cache.bump_sections()
 
 
 disable_workers.short_description = _('Disable selected workers')
 
 
-class WorkerAdmin(admin.ModelAdmin):
+class WorkerAdmin(ScalableAdmin):
     list_display = ['name', 'email', 'dashboard_link', 'no_export', 'disabled', 'order', 'created']
     search_fields = ('name', 'email')
     actions = [disable_workers]
@@ -28,34 +68,64 @@ class WorkerAdmin(admin.ModelAdmin):
         return mark_safe(f'<a href="{worker.dashboard}" target="_blank">{title}</a>')
 
 
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ScalableAdmin):
     list_display = ['number', 'title', 'url', 'comment']
     search_fields = ('number', 'title')
     list_select_related = ['tracker']
     list_filter = ['created']
+    autocomplete_fields = ['tracker']
+    ordering = ['-id']
 
 
 class IterationAdmin(admin.ModelAdmin):
-    list_display = ['start', 'stop', 'comment']
+    list_display = ['start', 'stop', 'comment', 'planned', 'in_progress', 'done']
     list_filter = ['start']
+    search_fields = ('comment',)
+
+    def get_queryset(self, request):
+        return stats.with_totals(super().get_queryset(request))
+
+    @staticmethod
+    def _total(iteration: Iteration, name: str) -> int:
+        return getattr(iteration.totals[0], name) if iteration.totals else 0
+
+    @admin.display(description=_('planned'))
+    def planned(self, iteration: Iteration) -> int:
+        return self._total(iteration, 'planned')
+
+    @admin.display(description=_('in progress'))
+    def in_progress(self, iteration: Iteration) -> int:
+        return self._total(iteration, 'in_progress')
+
+    @admin.display(description=_('done'))
+    def done(self, iteration: Iteration) -> int:
+        return self._total(iteration, 'done')
 
 
 def make_done(_, __, queryset):
-    queryset.exclude(status=Report.DONE).update(status=Report.DONE)
+    queryset = queryset.exclude(status=Report.DONE)
+    pairs = set(queryset.values_list('iteration_id', 'worker_id'))
+    queryset.update(status=Report.DONE)
+    reports_bulk_changed.send(sender=Report, pairs=pairs)
 
 
 make_done.short_description = _('Mark selected as done')
 
 
-class ReportAdmin(admin.ModelAdmin):
+class ReportAdmin(ScalableAdmin):
     list_display = [
         'id', 'iteration', 'worker', 'task', 'title', 'delegation', 'status', 'updated', 'created',
     ]
     search_fields = ('task__number', 'task__title', 'worker__name')
-    list_filter = ['iteration__start', 'created', 'delegation', 'status', 'worker']
+    # filters choices are fixed or taken from small querysets
+    list_filter = [RecentIterationFilter, 'created', 'delegation', 'status', EnabledWorkerFilter]
     actions = [make_done]
-    list_select_related = ['iteration', 'worker', 'task']
+    list_select_related = ['iteration', 'worker', 'task__tracker']
     list_per_page = 30
+    # the primary key order does not sort the whole table
+    ordering = ['-id']
+    raw_id_fields = ['iteration']
+    autocomplete_fields = ['worker', 'task']
 
     @staticmethod
     def title(report: Report) -> str:
@@ -64,8 +134,15 @@ class ReportAdmin(admin.ModelAdmin):
         return mark_safe(f'<a href="{url}" target="_blank">{title}</a>')
 
 
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['date_from', 'date_to', 'format', 'planned', 'status', 'reports', 'created', 'finished']
+    list_filter = ['status', 'format']
+    readonly_fields = ['file', 'iterations', 'reports', 'error', 'started', 'finished']
+
+
 admin.site.register(Tracker, TrackerAdmin)
 admin.site.register(Worker, WorkerAdmin)
 admin.site.register(Task, TaskAdmin)
 admin.site.register(Report, ReportAdmin)
 admin.site.register(Iteration, IterationAdmin)
+admin.site.register(ExportJob, ExportJobAdmin)
@@ -0,0 +1,174 @@
+"""
+Cross-iteration analytics: carry-over of tasks, cycle time and velocity of workers.
+
+Reports of closed iterations (all except the latest one) are folded into a cached state
+by aggregate queries. The state stores versions of processed iterations,
+so only new iterations are processed on the next run and any change of a processed iteration
+causes full recalculation. The latest iteration is always added on the fly.
+Archived iterations are included, their reports are read from the archive tables.
+"""
+import statistics
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import models
+
+from team import cache
+from team.models import ArchivedIteration, ArchivedReport, Iteration, Report, Task, Worker
+
+
+@dataclass
+class TaskStats:
+    first_start: date
+    iterations: int = 0
+    done_stop: Optional[date] = None
+
+    @property
+    def carry_over(self) -> int:
+        return self.iterations - 1
+
+    @property
+    def cycle_time(self) -> Optional[int]:
+        """Days from the start of the first iteration to the end of the iteration where the task was done"""
+        if self.done_stop is None:
+            return None
+        return (self.done_stop - self.first_start).days + 1
+
+
+@dataclass
+class WorkerStats:
+    done: int = 0
+    iterations: int = 0
+
+    @property
+    def velocity(self) -> float:
+        return self.done / self.iterations if self.iterations else 0.0
+
+
+@dataclass
+class State:
+    versions: list[tuple[int, int]] = field(default_factory=list)  # processed iterations IDs and their versions
+    tasks: dict[int, TaskStats] = field(default_factory=dict)
+    workers: dict[int, WorkerStats] = field(default_factory=dict)
+
+    def copy(self) -> 'State':
+        return State(
+            versions=list(self.versions),
+            tasks={k: TaskStats(v.first_start, v.iterations, v.done_stop) for k, v in self.tasks.items()},
+            workers={k: WorkerStats(v.done, v.iterations) for k, v in self.workers.items()},
+        )
+
+
+@dataclass
+class Summary:
+    iterations: int
+    tasks: list[tuple[Task, TaskStats]]  # the most carried over tasks
+    cycle_time_mean: Optional[float]
+    cycle_time_median: Optional[float]
+    workers: list[tuple[Worker, WorkerStats]]
+
+
+def _versions(iteration_ids: list[int]) -> list[tuple[int, int]]:
+    keys = {iteration_id: cache.version_key('iteration', iteration_id) for iteration_id in iteration_ids}
+    versions = cache.get_versions(keys.values())
+    return [(iteration_id, versions[key]) for iteration_id, key in keys.items()]
+
+
+def fold(state: State, iteration_ids: list[int]) -> None:
+    """Adds reports of hot and archived iterations to the state by two aggregate queries of every table"""
+    if not iteration_ids:
+        return
+    for model in (Report, ArchivedReport):
+        _fold_reports(state, model.objects.filter(iteration_id__in=iteration_ids).order_by())
+
+
+def _fold_reports(state: State, reports: models.QuerySet) -> None:
+    done = models.Q(status=Report.DONE)
+
+    task_rows = reports.values_list('task_id').annotate(
+        first_start=models.Min('iteration__start'),
+        iterations=models.Count('iteration_id', distinct=True),
+        done_stop=models.Min('iteration__stop', filter=done),
+    )
+    for task_id, first_start, iterations, done_stop in task_rows:
+        item = state.tasks.get(task_id)
+        if item is None:
+            state.tasks[task_id] = TaskStats(first_start, iterations, done_stop)
+            continue
+        item.first_start = min(item.first_start, first_start)
+        item.iterations += iterations
+        if done_stop is not None and (item.done_stop is None or done_stop < item.done_stop):
+            item.done_stop = done_stop
+
+    worker_rows = reports.values_list('worker_id').annotate(
+        done=models.Count('id', filter=done),
+        iterations=models.Count('iteration_id', distinct=True),
+    )
+    for worker_id, done_count, iterations in worker_rows:
+        item = state.workers.setdefault(worker_id, WorkerStats())
+        item.done += done_count
+        item.iterations += iterations
+
+
+def closed_state(closed_ids: list[int]) -> State:
+    """State of closed iterations (ordered by start), only new ones are processed if the cached state is valid"""
+    versions = _versions(closed_ids)
+    state = cache.get_analytics()
+    processed = len(state.versions) if state else 0
+    if state is None or state.versions != versions[:processed]:
+        state, processed = State(), 0
+    if processed < len(versions):
+        fold(state, closed_ids[processed:])
+        state.versions = versions
+        cache.set_analytics(state)
+    return state
+
+
+def calculate() -> State:
+    """State of all iterations"""
+    items = [
+        *Iteration.objects.values_list('start', 'id'),
+        *ArchivedIteration.objects.values_list('start', 'id'),
+    ]
+    iteration_ids = [iteration_id for _, iteration_id in sorted(items)]
+    if not iteration_ids:
+        return State()
+    state = closed_state(iteration_ids[:-1]).copy()
+    fold(state, iteration_ids[-1:])
+    state.versions.extend(_versions(iteration_ids[-1:]))
+    return state
+
+
+def _top_tasks(state: State, limit: int) -> list[tuple[Task, TaskStats]]:
+    items = sorted(state.tasks.items(), key=lambda x: (-x[1].carry_over, x[0]))[:limit]
+    tasks = Task.objects.select_related('tracker').in_bulk([task_id for task_id, _ in items])
+    return [(tasks[task_id], item) for task_id, item in items if task_id in tasks and item.carry_over]
+
+
+def _workers(workers: dict[int, WorkerStats]) -> list[tuple[Worker, WorkerStats]]:
+    objects = Worker.objects.in_bulk(workers.keys())
+    items = [(objects[worker_id], item) for worker_id, item in workers.items() if worker_id in objects]
+    return sorted(items, key=lambda x: (-x[1].velocity, x[0].name))
+
+
+def _averages(values: Iterable[int]) -> tuple[Optional[float], Optional[float]]:
+    values = list(values)
+    if not values:
+        return None, None
+    return statistics.fmean(values), statistics.median(values)
+
+
+def summary(limit: int = settings.ANALYTICS_TASKS_LIMIT) -> Summary:
+    state = calculate()
+    cycle_time_mean, cycle_time_median = _averages(
+        item.cycle_time for item in state.tasks.values() if item.cycle_time is not None
+    )
+    return Summary(
+        iterations=len(state.versions),
+        tasks=_top_tasks(state, limit),
+        cycle_time_mean=cycle_time_mean,
+        cycle_time_median=cycle_time_median,
+        workers=_workers(state.workers),
+    )
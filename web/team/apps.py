@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TeamConfig(AppConfig):
     name = 'team'
+
+    def ready(self):
+        from team import db, signals, timing  # noqa F401
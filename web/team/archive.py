@@ -0,0 +1,87 @@
+"""
+Archive of old iterations.
+
+Iterations are moved to ArchivedIteration/ArchivedReport tables with the same IDs,
+so they are available by the same URLs and the search index rows stay valid.
+Reports are moved by INSERT ... SELECT and DELETE in chunks, every chunk is a short transaction.
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from team import cache, latest, search
+from team.models import ArchivedIteration, ArchivedReport, Iteration, Report
+
+REPORT_COLUMNS = 'id, iteration_id, worker_id, task_id, status, delegation, comment, created, updated'
+
+
+def archivable(weeks: int, today: Optional[date] = None) -> list[Iteration]:
+    """Iterations finished more than weeks ago, the latest iteration is never archived"""
+    cutoff = (today or timezone.localdate()) - timedelta(weeks=weeks)
+    current = latest.get_iteration()
+    queryset = Iteration.objects.filter(stop__lt=cutoff).order_by('start')
+    if current is not None:
+        queryset = queryset.exclude(pk=current.pk)
+    return list(queryset)
+
+
+def _move_reports(iteration_id: int, chunk_size: int) -> int:
+    """Moves one chunk of iteration reports, returns a number of moved reports"""
+    qn = connection.ops.quote_name
+    source, target = qn(Report._meta.db_table), qn(ArchivedReport._meta.db_table)
+    with transaction.atomic():
+        ids = list(Report.objects.filter(iteration_id=iteration_id).order_by('id').values_list('id', flat=True)[
+            :chunk_size
+        ])
+        if not ids:
+            return 0
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {target} ({REPORT_COLUMNS}) SELECT {REPORT_COLUMNS} FROM {source} '
+                f'WHERE id IN ({placeholders})',
+                ids,
+            )
+            cursor.execute(f'DELETE FROM {source} WHERE id IN ({placeholders})', ids)
+    return len(ids)
+
+
+def archive_iteration(iteration: Iteration, chunk_size: int = 1000) -> int:
+    """Moves the iteration and its reports to the archive, returns a number of moved reports"""
+    pk = iteration.pk
+    if not ArchivedIteration.objects.filter(pk=pk).exists():
+        ArchivedIteration.objects.create(
+            id=pk,
+            start=iteration.start,
+            stop=iteration.stop,
+            comment=iteration.comment,
+            created=iteration.created,
+            updated=iteration.updated,
+        )
+    moved = 0
+    while count := _move_reports(pk, chunk_size):
+        moved += count
+    with transaction.atomic():
+        # statistics are deleted by cascade, the search index gets the archived iteration comment back
+        iteration.delete()
+        search.index_archived_iteration(pk)
+        # exports cached during the move of reports are partial
+        cache.bump_versions([cache.version_key('iteration', pk)])
+    return moved
+
+
+def get_iteration(pk: int) -> Optional[Iteration | ArchivedIteration]:
+    """Hot or archived iteration, the latest one is taken from its cached pointer"""
+    current = latest.get_iteration()
+    if current is not None and current.pk == pk:
+        return current
+    return Iteration.objects.filter(pk=pk).first() or ArchivedIteration.objects.filter(pk=pk).first()
+
+
+async def aget_iteration(pk: int) -> Optional[Iteration | ArchivedIteration]:
+    current = await latest.aget_iteration()
+    if current is not None and current.pk == pk:
+        return current
+    return await Iteration.objects.filter(pk=pk).afirst() or await ArchivedIteration.objects.filter(pk=pk).afirst()
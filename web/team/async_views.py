@@ -0,0 +1,185 @@
+"""
+Asynchronous versions of read-only views for ASGI deployments (settings.ASYNC_VIEWS).
+Data is loaded by async ORM API, templates are rendered in a thread,
+because context processors may use the session and messages storages.
+"""
+from itertools import groupby
+from typing import Any, AsyncIterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.views import View
+from django.views.decorators.http import condition, require_GET
+
+from team import archive, cache, events, latest, rollover, search, stats
+from team.forms import IterationForm, ReportForm, ReportImportForm
+from team.models import ArchivedIteration, Iteration
+from team.pagination import CursorPage, InvalidCursor, IterationPaginator
+from team.views import Export, export_etag, export_filename, export_last_modified, export_version
+from team.views import IterationDetailView as SyncIterationDetailView
+
+arender = sync_to_async(render)
+
+
+class IterationDetailView(View):
+    template_name = 'team/iteration.html'
+
+    async def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        iteration = await archive.aget_iteration(pk)
+        if iteration is None:
+            raise Http404('iteration not found')
+        if iteration.is_archived:
+            worker_reports = await sync_to_async(SyncIterationDetailView.archived_worker_reports)(iteration)
+            context = {'iteration': iteration, 'object': iteration, 'worker_reports': worker_reports}
+            return await arender(request, SyncIterationDetailView.archived_template_name, context)
+        return await self.render(request, iteration)
+
+    @classmethod
+    async def render(cls, request: HttpRequest, iteration: Iteration) -> HttpResponse:
+        iteration.form = IterationForm(instance=iteration)
+        context = {
+            'iteration': iteration,
+            'object': iteration,
+            'is_last': await latest.ais_last(iteration),
+            'missed_weeks': rollover.missed_weeks(iteration),
+            'import_form': ReportImportForm(),
+        }
+        if settings.LAZY_WORKER_SECTIONS:
+            context['worker_totals'] = [item async for item in stats.worker_totals(iteration)]
+            context['events_url'] = events.events_url(iteration.pk)
+            context['workers'] = SyncIterationDetailView.workers_order(item.worker for item in context['worker_totals'])
+        else:
+            reports = iteration.reports.select_related('worker', 'task__tracker').order_by(
+                'worker', 'status', 'task',
+            )
+            reports = [report async for report in reports]
+            worker_reports = [(worker, list(items)) for worker, items in groupby(reports, lambda x: x.worker)]
+            choices = await ReportForm.ashared_choices()
+            # sections are rendered by templates with the cache and session access
+            context['worker_sections'] = await sync_to_async(SyncIterationDetailView.render_sections)(
+                request, iteration, worker_reports, choices,
+            )
+            context['workers'] = SyncIterationDetailView.workers_order(worker for worker, _ in worker_reports)
+        return await arender(request, cls.template_name, context)
+
+
+async def index(request: HttpRequest) -> HttpResponse:
+    iteration = await latest.aget_iteration()
+    if iteration is None:
+        raise Http404('no iterations')
+    return await IterationDetailView.render(request, iteration)
+
+
+class IterationListView(View):
+    template_name = 'team/iterations.html'
+    paginate_by = settings.OBJECTS_PER_PAGE
+
+    async def get_page(self, request: HttpRequest) -> CursorPage:
+        queryset = stats.with_totals(Iteration.objects.all())
+        paginator = IterationPaginator(
+            queryset, self.paginate_by, estimate=settings.PAGINATION_ESTIMATED_TOTAL,
+            archived=ArchivedIteration.objects.all(),
+        )
+        page = await paginator.apage(request.GET.get('cursor'))
+        await sync_to_async(stats.with_archived_totals)(page.object_list)
+        return page
+
+    def get_context_data(self, page: CursorPage) -> dict[str, Any]:
+        return {
+            'page_obj': page,
+            'is_paginated': page.has_other_pages,
+            'iterations': page.object_list,
+        }
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        try:
+            page = await self.get_page(request)
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return await arender(request, self.template_name, self.get_context_data(page))
+
+
+class IterationSearchListView(IterationListView):
+
+    async def get_page(self, request: HttpRequest) -> CursorPage:
+        query = request.GET.get('search', '').strip()
+        if not query:
+            return await super().get_page(request)
+        return await sync_to_async(search.search_page)(query, self.paginate_by, request.GET.get('cursor'))
+
+    def get_context_data(self, page: CursorPage) -> dict[str, Any]:
+        context = super().get_context_data(page)
+        context['search'] = self.request.GET.get('search')
+        return context
+
+
+async def cached_astream(key: str, parts: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Asynchronous version of views.cached_stream()"""
+    content, size = [], 0
+    async for part in parts:
+        size += len(part)
+        if size <= settings.EXPORT_CACHE_MAX_SIZE:
+            content.append(part)
+        yield part
+    if size <= settings.EXPORT_CACHE_MAX_SIZE:
+        cache.set_export(key, ''.join(content))
+
+
+async def export_response(request: HttpRequest, pk: int, planned: bool = False) -> HttpResponse:
+    iteration = await archive.aget_iteration(pk)
+    if iteration is None:
+        raise Http404('iteration not found')
+    etag, _ = export_version(request, iteration.pk)
+    key = cache.export_key(etag, planned)
+    content = cache.get_export(key)
+    if content is None:
+        exporter = Export(iteration, planned=planned)
+        response = StreamingHttpResponse(cached_astream(key, exporter.astream()), content_type='text/plain')
+    else:
+        response = HttpResponse(content, content_type='text/plain')
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(iteration, planned)}"'
+    return response
+
+
+@require_GET
+@condition(etag_func=export_etag, last_modified_func=export_last_modified)
+async def iteration_export(request: HttpRequest, pk: int) -> HttpResponse:
+    return await export_response(request, pk)
+
+
+@require_GET
+@condition(etag_func=export_etag, last_modified_func=export_last_modified)
+async def iteration_export_planned(request: HttpRequest, pk: int) -> HttpResponse:
+    return await export_response(request, pk, planned=True)
+
+
+async def event_stream(iteration_id: int) -> AsyncIterator[str]:
+    """Server-Sent Events of the iteration, comments keep idle connections open"""
+    async with events.get_broker().subscribe(events.channel(iteration_id)) as subscription:
+        yield f'retry: {settings.EVENTS_RETRY}\n\n'
+        while True:
+            event = await subscription.get(settings.EVENTS_HEARTBEAT)
+            yield ': ping\n\n' if event is None else event.encode()
+
+
+@require_GET
+async def iteration_events(request: HttpRequest, pk: int) -> HttpResponse:
+    """
+    Live changes of the iteration, it is asynchronous in both URL configurations.
+    WSGI handler would block threads by the endless stream, so it is served only by ASGI one
+    and "204 No Content" stops reconnections of other clients.
+    The latest iteration is taken from the cache, so its idle streams do not hold database connections.
+    """
+    if not settings.EVENTS_ENABLED or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    iteration = await archive.aget_iteration(pk)
+    if iteration is None or iteration.is_archived:
+        raise Http404('iteration not found')
+    response = StreamingHttpResponse(event_stream(iteration.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # disables buffering of nginx proxy
+    response['X-Accel-Buffering'] = 'no'
+    return response
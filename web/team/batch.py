@@ -0,0 +1,67 @@
+"""
+Batch update of reports by a list of changes like
+{"id": 1, "status": "done", "comment": "", "delegation": "agree", "worker": 2}.
+Omitted fields keep current values, every item is validated by ReportForm.
+"""
+from typing import Any, Iterable
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from team.forms import ReportForm
+from team.models import Report
+from team.signals import reports_bulk_changed
+
+FIELDS = ('status', 'comment', 'delegation', 'worker')
+
+
+def _errors(form: ReportForm) -> dict[str, list[str]]:
+    return {name: [error['message'] for error in errors] for name, errors in form.errors.get_json_data().items()}
+
+
+def update_reports(items: Iterable[Any]) -> list[dict[str, Any]]:
+    """
+    Applies valid changes by one bulk_update, returns results in the items order:
+    {"id": 1, "ok": true} or {"id": 1, "ok": false, "errors": {"field": ["message"]}}.
+    """
+    items = list(items)
+    ids = [item.get('id') for item in items if isinstance(item, dict)]
+    results: list[dict[str, Any]] = []
+    changed: list[Report] = []
+    pairs: set[tuple[int, int]] = set()
+    seen: set[int] = set()
+
+    with transaction.atomic():
+        reports = Report.objects.select_for_update().in_bulk([i for i in ids if isinstance(i, int)])
+        for item in items:
+            report_id = item.get('id') if isinstance(item, dict) else None
+            report = reports.get(report_id) if isinstance(report_id, int) else None
+            if report is None:
+                results.append({'id': report_id, 'ok': False, 'errors': {'id': [_('report not found')]}})
+                continue
+            if report_id in seen:
+                results.append({'id': report_id, 'ok': False, 'errors': {'id': [_('duplicate report')]}})
+                continue
+            seen.add(report_id)
+
+            old_pair = (report.iteration_id, report.worker_id)
+            data = {'status': report.status, 'comment': report.comment, 'delegation': report.delegation,
+                    'worker': report.worker_id}
+            data.update((name, item[name]) for name in FIELDS if name in item)
+            # the form changes the instance, but only valid ones are saved
+            form = ReportForm(data, instance=report)
+            if not form.is_valid():
+                results.append({'id': report_id, 'ok': False, 'errors': _errors(form)})
+                continue
+            pairs.add(old_pair)
+            report = form.save(commit=False)
+            report.updated = timezone.now()
+            pairs.add((report.iteration_id, report.worker_id))
+            changed.append(report)
+            results.append({'id': report_id, 'ok': True})
+
+        if changed:
+            Report.objects.bulk_update(changed, [*FIELDS, 'updated'])
+            reports_bulk_changed.send(sender=Report, pairs=pairs)
+    return results
@@ -0,0 +1,311 @@
+"""
+Benchmarks of views and hot functions, they use the data of the configured database.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, DEFAULT_DB_ALIAS, models, OperationalError, transaction
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from team.models import Iteration, Report
+from team.views import Export, IterationDetailView
+from web.urls import get_urlconf
+
+# test clients use "testserver" host, caches are cleared by benchmarks,
+# so they use a cache of the process instead of the shared one of running servers
+TEST_SETTINGS = {
+    'ALLOWED_HOSTS': ['testserver'],
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmarks'}},
+}
+# SQLite defaults to compare with settings.SQLITE_PRAGMAS
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+# Django defaults of SQLite connections options, the deferred transaction mode
+DEFAULT_OPTIONS: dict[str, Any] = {}
+
+
+def read_urls() -> list[str]:
+    """URLs of read-only views for the latest iteration"""
+    iteration = Iteration.objects.first()
+    if iteration is None:
+        raise ValueError('there are no iterations')
+    return [
+        reverse('index'),
+        reverse('iterations'),
+        reverse('iteration_search') + '?search=test',
+        reverse('iteration', kwargs={'pk': iteration.pk}),
+        reverse('iteration_export', kwargs={'pk': iteration.pk}),
+    ]
+
+
+def _result(name: str, requests: int, duration: float) -> dict[str, Any]:
+    return {'name': name, 'requests': requests, 'duration': duration, 'rps': requests / duration}
+
+
+def _wsgi_worker(urls: list[str], requests: int) -> None:
+    client = Client()
+    try:
+        for i in range(requests):
+            response = client.get(urls[i % len(urls)])
+            response.getvalue()
+    finally:
+        connections.close_all()
+
+
+def wsgi_throughput(urls: list[str], requests: int, concurrency: int) -> dict[str, Any]:
+    """Synchronous views by WSGI handler, every concurrent client is a thread"""
+    per_client = requests // concurrency
+    with override_settings(ROOT_URLCONF=get_urlconf(is_async=False), **TEST_SETTINGS):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(_wsgi_worker, urls, per_client) for _ in range(concurrency)]:
+                future.result()
+        duration = time.perf_counter() - started
+    return _result('wsgi', per_client * concurrency, duration)
+
+
+async def _asgi_worker(urls: list[str], requests: int) -> None:
+    client = AsyncClient()
+    for i in range(requests):
+        response = await client.get(urls[i % len(urls)])
+        if response.streaming:
+            [part async for part in response.streaming_content]
+
+
+async def _asgi_run(urls: list[str], per_client: int, concurrency: int) -> None:
+    await asyncio.gather(*[_asgi_worker(urls, per_client) for _ in range(concurrency)])
+
+
+def asgi_throughput(urls: list[str], requests: int, concurrency: int) -> dict[str, Any]:
+    """Asynchronous views by ASGI handler, every concurrent client is a coroutine in one event loop"""
+    per_client = requests // concurrency
+    with override_settings(ROOT_URLCONF=get_urlconf(is_async=True), **TEST_SETTINGS):
+        started = time.perf_counter()
+        asyncio.run(_asgi_run(urls, per_client, concurrency))
+        duration = time.perf_counter() - started
+    connections.close_all()
+    return _result('asgi', per_client * concurrency, duration)
+
+
+def server_throughput(requests: int = 200, concurrency: int = 10) -> list[dict[str, Any]]:
+    """WSGI and ASGI throughput of read-only views on the same data set"""
+    urls = read_urls()
+    return [
+        wsgi_throughput(urls, requests, concurrency),
+        asgi_throughput(urls, requests, concurrency),
+    ]
+
+
+def _update_worker(updates: list[tuple[str, dict[str, Any]]]) -> int:
+    """Sends report update requests, returns a number of failed ones"""
+    client = Client(raise_request_exception=False)
+    errors = 0
+    try:
+        for url, data in updates:
+            response = client.post(url, data=data)
+            errors += response.status_code != 302
+    except OperationalError:
+        errors += 1
+    finally:
+        connections.close_all()
+    return errors
+
+
+def report_updates(requests: int) -> list[tuple[str, dict[str, Any]]]:
+    """Update requests of the latest reports with their current values"""
+    reports = Report.objects.filter(worker__disabled=False).order_by('-id')[:requests]
+    return [
+        (
+            reverse('report_update', kwargs={'pk': r.pk}),
+            {'status': r.status, 'comment': r.comment, 'delegation': r.delegation, 'worker': r.worker_id},
+        )
+        for r in reports
+    ]
+
+
+@contextmanager
+def sqlite_copy(options: dict[str, Any]) -> Iterator[str]:
+    """
+    Fresh copy of the configured SQLite database in the rollback journal mode,
+    connections of the default alias use it with the options until exit of the context.
+    Journal mode is persistent in a database file, so every profile gets its own copy.
+    """
+    settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+    saved = settings_dict['NAME'], settings_dict['OPTIONS']
+    connections.close_all()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        source, target = sqlite3.connect(saved[0]), sqlite3.connect(path)
+        try:
+            source.backup(target)
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            source.close()
+            target.close()
+
+        # connections of all threads are created from these settings
+        settings_dict['NAME'], settings_dict['OPTIONS'] = path, options
+        try:
+            yield path
+        finally:
+            connections.close_all()
+            settings_dict['NAME'], settings_dict['OPTIONS'] = saved
+
+
+def sqlite_writes(requests: int = 200, concurrency: int = 10) -> list[dict[str, Any]]:
+    """
+    Concurrent report_update throughput with SQLite defaults and settings.SQLITE_PRAGMAS with the configured
+    connections options, every profile runs on a fresh copy of the database.
+    Reports are updated by the same values, only "updated" timestamps are changed.
+    """
+    if connection.vendor != 'sqlite':
+        raise ValueError('the default database is not SQLite')
+    updates = report_updates(requests)
+    if not updates:
+        raise ValueError('there are no reports')
+    per_client = len(updates) // concurrency or 1
+    chunks = [updates[i:i + per_client] for i in range(0, len(updates), per_client)]
+
+    profiles = (
+        ('default', DEFAULT_PRAGMAS, DEFAULT_OPTIONS),
+        ('tuned', settings.SQLITE_PRAGMAS, connections.settings[DEFAULT_DB_ALIAS]['OPTIONS']),
+    )
+    results = []
+    for name, pragmas, options in profiles:
+        with sqlite_copy(options), override_settings(SQLITE_PRAGMAS=pragmas, **TEST_SETTINGS):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                errors = sum(executor.map(_update_worker, chunks))
+            duration = time.perf_counter() - started
+        result = _result(name, len(updates), duration)
+        result['errors'] = errors
+        results.append(result)
+    return results
+
+
+def measure(name: str, func: Callable[[], Any], repeat: int) -> dict[str, Any]:
+    """
+    Durations of the function calls with cold caches and a number of its database queries.
+    Queries are captured, so durations include a small overhead of the debug cursor.
+    It is called with TEST_SETTINGS, so only the cache of benchmarks is cleared.
+    """
+    if settings.CACHES != TEST_SETTINGS['CACHES']:
+        raise ValueError('the shared cache must not be cleared by benchmarks')
+    durations, queries = [], 0
+    for _ in range(repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - started)
+        queries = len(ctx.captured_queries)
+    return {'name': name, 'min': min(durations), 'median': statistics.median(durations), 'queries': queries}
+
+
+def _get(client: Client, url: str) -> Callable[[], None]:
+    def func() -> None:
+        response = client.get(url)
+        if response.status_code != 200:
+            raise ValueError(f'GET {url}: status {response.status_code}')
+        response.getvalue()
+    return func
+
+
+def _iteration_create(client: Client, iteration: Iteration) -> Callable[[], None]:
+    url = reverse('iteration_create', kwargs={'pk': iteration.pk})
+
+    def func() -> None:
+        # the created iteration is rolled back
+        with transaction.atomic():
+            response = client.post(url)
+            if response.status_code != 302:
+                raise ValueError(f'POST {url}: status {response.status_code}')
+            transaction.set_rollback(True)
+    return func
+
+
+def largest_iteration() -> Iteration:
+    """Iteration with the maximum number of reports"""
+    iteration_id = Report.objects.values('iteration_id').annotate(
+        count=models.Count('id'),
+    ).order_by('-count', '-iteration_id').values_list('iteration_id', flat=True).first()
+    if iteration_id is None:
+        raise ValueError('there are no reports')
+    return Iteration.objects.get(pk=iteration_id)
+
+
+def view_timings(repeat: int = 5) -> list[dict[str, Any]]:
+    """Timings and queries of views and hot functions on the largest and the latest iterations"""
+    iteration, latest = largest_iteration(), Iteration.objects.first()
+    client = Client()
+    pk = {'pk': iteration.pk}
+    worker_id = iteration.reports.values_list('worker_id', flat=True).first()
+    cases = [
+        ('iteration', _get(client, reverse('iteration', kwargs=pk))),
+        ('worker_section', _get(client, reverse('worker_section', kwargs={**pk, 'worker_id': worker_id}))),
+        ('iterations', _get(client, reverse('iterations'))),
+        ('search', _get(client, reverse('iteration_search') + '?search=fix')),
+        ('export', _get(client, reverse('iteration_export', kwargs=pk))),
+        ('export_planned', _get(client, reverse('iteration_export_planned', kwargs=pk))),
+        ('iteration_create', _iteration_create(client, latest)),
+        ('Export.get_reports', lambda: Export(iteration).get_reports()),
+        ('Export.get_planned_reports', lambda: Export(iteration, planned=True).get_planned_reports()),
+        ('IterationDetailView._prepare_data', lambda: IterationDetailView._prepare_data(iteration)),
+    ]
+    with override_settings(**TEST_SETTINGS):
+        return [measure(name, func, repeat) for name, func in cases]
+
+
+def template_timings(repeat: int = 5) -> list[dict[str, Any]]:
+    """Rendering of hot templates by Django and Jinja2 backends on the largest iteration, it requires jinja2"""
+    iteration = largest_iteration()
+    client = Client()
+    cases = [
+        ('iteration', _get(client, reverse('iteration', kwargs={'pk': iteration.pk}))),
+        ('iterations', _get(client, reverse('iterations'))),
+        ('Export.render', lambda: Export(iteration).render()),
+        ('Export.render planned', lambda: Export(iteration, planned=True).render()),
+    ]
+    django_templates = [t for t in settings.TEMPLATES if t is not settings.JINJA2_TEMPLATES_BACKEND]
+    engines = {
+        'django': (django_templates, 'django.forms.renderers.DjangoTemplates'),
+        'jinja2': ([settings.JINJA2_TEMPLATES_BACKEND, *django_templates], settings.JINJA2_FORM_RENDERER),
+    }
+    results = []
+    for engine, (templates, form_renderer) in engines.items():
+        with override_settings(TEMPLATES=templates, FORM_RENDERER=form_renderer, **TEST_SETTINGS):
+            results += [measure(f'{name} [{engine}]', func, repeat) for name, func in cases]
+    return results
+
+
+def save_baseline(results: list[dict[str, Any]], path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({result['name']: result for result in results}, f, indent=2)
+
+
+def compare(results: list[dict[str, Any]], path: str, threshold: float = 1.2) -> list[dict[str, Any]]:
+    """
+    Adds baseline values to results, a result is a regression
+    if its median is greater than the baseline one by threshold times or it has more queries.
+    """
+    with open(path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    for result in results:
+        base = baseline.get(result['name'])
+        if base is None:
+            continue
+        result['baseline'] = base
+        result['ratio'] = result['median'] / base['median'] if base['median'] else 1.0
+        result['regression'] = result['ratio'] > threshold or result['queries'] > base['queries']
+    return results
@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import get_language
+
+# global version of data rendered in every worker section (workers list, trackers URLs)
+SECTIONS = 'sections'
+
+
+def version_key(*parts: object) -> str:
+    return 'team:version:' + ':'.join(str(p) for p in parts)
+
+
+def get_versions(keys: Iterable[str]) -> dict[str, int]:
+    """
+    Versions of the requested keys.
+    A missing version is initialized by the current time,
+    so an evicted version never returns to the old value.
+    """
+    keys = list(keys)
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return found
+
+
+def _bump(keys: list[str]) -> None:
+    now = time.time_ns()
+    cache.set_many({key: now for key in keys}, timeout=None)
+
+
+def bump_versions(keys: Iterable[str]) -> None:
+    """
+    Bumps versions now for the current transaction and after commit for other processes,
+    they could cache not committed data between these moments.
+    """
+    keys = list(keys)
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def bump_sections() -> None:
+    bump_versions([version_key(SECTIONS)])
+
+
+def bump_reports(pairs: Iterable[tuple[int, int]]) -> None:
+    """Invalidates worker sections and iterations data by (iteration_id, worker_id) pairs"""
+    keys = set()
+    for iteration_id, worker_id in pairs:
+        keys.add(version_key('section', iteration_id, worker_id))
+        keys.add(version_key('iteration', iteration_id))
+    bump_versions(keys)
+
+
+def worker_section_keys(iteration_id: int, worker_ids: Iterable[int]) -> dict[int, str]:
+    """Fragment cache keys of iteration worker sections"""
+    worker_ids = list(worker_ids)
+    common_key = version_key(SECTIONS)
+    section_keys = {worker_id: version_key('section', iteration_id, worker_id) for worker_id in worker_ids}
+    versions = get_versions([common_key, *section_keys.values()])
+    return {
+        worker_id: 'team:fragment:section:{}:{}:{}:{}:{}'.format(
+            iteration_id, worker_id, get_language(), versions[common_key], versions[key],
+        )
+        for worker_id, key in section_keys.items()
+    }
+
+
+def get_fragments(keys: Iterable[str]) -> dict[str, str]:
+    return cache.get_many(keys)
+
+
+def set_fragments(fragments: dict[str, str]) -> None:
+    if fragments:
+        cache.set_many(fragments, timeout=settings.FRAGMENT_CACHE_TIMEOUT)
+
+
+def export_version(iteration_id: int) -> tuple[str, datetime]:
+    """
+    ETag and last modification time of iteration exports.
+    They are built from cached versions without any database query.
+    """
+    keys = [version_key(SECTIONS), version_key('iteration', iteration_id)]
+    versions = get_versions(keys)
+    etag = '{}-{}-{}'.format(iteration_id, get_language(), '-'.join(str(versions[key]) for key in keys))
+    modified = datetime.fromtimestamp(max(versions.values()) // 10 ** 9, tz=timezone.utc)
+    return etag, modified
+
+
+def export_key(etag: str, planned: bool) -> str:
+    return 'team:export:{}:{}'.format('planned' if planned else 'all', etag)
+
+
+def get_export(key: str) -> Optional[str]:
+    return cache.get(key)
+
+
+def set_export(key: str, content: str) -> None:
+    cache.set(key, content, timeout=settings.EXPORT_CACHE_TIMEOUT)
+
+
+def get_analytics() -> Optional[Any]:
+    return cache.get('team:analytics')
+
+
+def set_analytics(state: Any) -> None:
+    cache.set('team:analytics', state, timeout=None)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs) -> None:
+    """Applies settings.SQLITE_PRAGMAS to every new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        # connections are persistent, statistics of tables changed since the last ANALYZE are refreshed on open
+        cursor.execute('PRAGMA optimize = 0x10002')
+
+
+def optimize(analyze: bool = False) -> None:
+    """
+    Refreshes SQLite statistics of the query planner after bulk changes of tables,
+    analyze runs a full ANALYZE, by default only stale statistics of the changed tables are refreshed.
+    """
+    if default_connection.vendor != 'sqlite':
+        return
+    with default_connection.cursor() as cursor:
+        cursor.execute('ANALYZE' if analyze else 'PRAGMA optimize')
@@ -0,0 +1,244 @@
+"""
+Live events of iterations for Server-Sent Events clients (iteration_events view).
+
+Events are published after commit of changes, a broker delivers them to subscribers of the iteration channel,
+settings.EVENT_BROKER is a path of the broker class. InProcessBroker delivers events to subscribers of the same
+process only, so changes and event streams have to be served by one process, DatabaseBroker shares them.
+Every subscriber has an asyncio queue, idle streams only wait for it.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from functools import partial
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Iterable, NamedTuple, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from team.models import EventMessage, IterationStats
+
+_broker: Optional['Broker'] = None
+
+
+class Event(NamedTuple):
+    name: str
+    data: dict[str, Any]
+
+    def encode(self) -> str:
+        """Server-Sent Events message"""
+        return 'event: {}\ndata: {}\n\n'.format(self.name, json.dumps(self.data, separators=(',', ':')))
+
+
+# it replaces events of a slow subscriber, its client has to reload the data
+OVERFLOW = Event('overflow', {})
+
+
+class Subscription:
+    """Events of one channel for a subscriber in the event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(size)
+
+    def put(self, event: Event) -> None:
+        """Adds the event, it is called in the loop of the subscription"""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = OVERFLOW
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event or None if there are no events during timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Interface of event brokers"""
+
+    def publish(self, channel: str, event: Event) -> None:
+        """Sends the event to subscribers of the channel, it can be called from any thread"""
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> AsyncContextManager[Subscription]:
+        """Subscription to events of the channel until exit of the context"""
+        raise NotImplementedError
+
+    def has_subscribers(self, channel: str) -> bool:
+        """Events are not built if there are no subscribers"""
+        return True
+
+
+class InProcessBroker(Broker):
+    """Broker of one process, events are put to queues of subscribers in their event loops"""
+
+    def __init__(self, queue_size: Optional[int] = None) -> None:
+        self.queue_size = queue_size or settings.EVENTS_QUEUE_SIZE
+        self._channels: dict[str, set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, event: Event) -> None:
+        with self._lock:
+            subscriptions = list(self._channels.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # the loop is closed
+                self._unsubscribe(channel, subscription)
+
+    def has_subscribers(self, channel: str) -> bool:
+        return bool(self._channels.get(channel))
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._channels[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._unsubscribe(channel, subscription)
+
+    def _unsubscribe(self, channel: str, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._channels.get(channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._channels[channel]
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Broker of several processes, events are saved to EventMessage table.
+    One task of the process polls new events of its channels and delivers them to local subscribers,
+    it is stopped when there are no subscribers.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None, interval: Optional[float] = None) -> None:
+        super().__init__(queue_size)
+        self.interval = interval or settings.EVENTS_POLL_INTERVAL
+        self._poller: Optional[asyncio.Task] = None
+
+    def publish(self, channel: str, event: Event) -> None:
+        """Saves the event, it is called by synchronous code after commit"""
+        now = timezone.now()
+        EventMessage.objects.filter(created__lt=now - timedelta(seconds=settings.EVENTS_RETENTION)).delete()
+        EventMessage.objects.create(channel=channel, name=event.name, data=event.data, created=now)
+
+    def has_subscribers(self, channel: str) -> bool:
+        # subscribers of other processes are unknown
+        return True
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        async with super().subscribe(channel) as subscription:
+            if self._poller is None or self._poller.done():
+                self._poller = asyncio.create_task(self.poll())
+            yield subscription
+
+    @staticmethod
+    def last_id() -> int:
+        return EventMessage.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    @staticmethod
+    def fetch(last_id: int, channels: list[str]) -> list[EventMessage]:
+        return list(EventMessage.objects.filter(id__gt=last_id, channel__in=channels).order_by('id'))
+
+    def deliver(self, messages: Iterable[EventMessage]) -> None:
+        for message in messages:
+            super().publish(message.channel, Event(message.name, message.data))
+
+    async def poll(self) -> None:
+        # queries are run by the shared thread pool, the task outlives the request which has started it
+        last_id = await sync_to_async(self.last_id, thread_sensitive=False)()
+        while self._channels:
+            await asyncio.sleep(self.interval)
+            with self._lock:
+                channels = list(self._channels)
+            messages = await sync_to_async(self.fetch, thread_sensitive=False)(last_id, channels)
+            if messages:
+                last_id = messages[-1].id
+                self.deliver(messages)
+
+
+def get_broker() -> Broker:
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.EVENT_BROKER)()
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting: str, **kwargs) -> None:
+    global _broker
+    if setting in ('EVENT_BROKER', 'EVENTS_QUEUE_SIZE', 'EVENTS_POLL_INTERVAL'):
+        _broker = None
+
+
+def channel(iteration_id: int) -> str:
+    return f'iteration:{iteration_id}'
+
+
+def events_url(iteration_id: int) -> Optional[str]:
+    """URL of the iteration events stream if they are enabled"""
+    if not settings.EVENTS_ENABLED:
+        return None
+    return reverse('iteration_events', kwargs={'pk': iteration_id})
+
+
+def _send(iteration_id: int, name: str, build: Callable[[], dict[str, Any]]) -> None:
+    broker = get_broker()
+    key = channel(iteration_id)
+    if broker.has_subscribers(key):
+        broker.publish(key, Event(name, build()))
+
+
+def publish(iteration_id: int, name: str, build: Callable[[], dict[str, Any]]) -> None:
+    """Publishes the event of the iteration after commit, its data is built only if there are subscribers"""
+    transaction.on_commit(partial(_send, iteration_id, name, build))
+
+
+def worker_totals(iteration_id: int, worker_ids: Iterable[int]) -> dict[str, dict[str, int]]:
+    """Report counters of the iteration workers, keys are JSON object ones"""
+    counters = dict.fromkeys(('planned', 'in_progress', 'done'), 0)
+    result = {str(worker_id): counters.copy() for worker_id in worker_ids}
+    items = IterationStats.objects.filter(iteration_id=iteration_id, worker_id__in=worker_ids)
+    for item in items.values('worker_id', *counters):
+        result[str(item.pop('worker_id'))] = item
+    return result
+
+
+def reports_changed(action: str, pairs: Iterable[tuple[int, int]], report_id: Optional[int] = None) -> None:
+    """
+    Event "reports" of changed worker sections with their counters,
+    action is "created", "updated", "deleted" for one report or "changed" for bulk changes.
+    """
+    iteration_workers = defaultdict(set)
+    for iteration_id, worker_id in pairs:
+        iteration_workers[iteration_id].add(worker_id)
+
+    for iteration_id, worker_ids in iteration_workers.items():
+        build = partial(_reports_data, action, report_id, iteration_id, sorted(worker_ids))
+        publish(iteration_id, 'reports', build)
+
+
+def _reports_data(action: str, report_id: Optional[int], iteration_id: int, worker_ids: list[int]) -> dict[str, Any]:
+    return {'action': action, 'report': report_id, 'workers': worker_totals(iteration_id, worker_ids)}
+
+
+def iteration_changed(iteration_id: int, comment: str) -> None:
+    publish(iteration_id, 'iteration', lambda: {'comment': comment})
@@ -0,0 +1,25 @@
+"""
+File-based cache backend for the default cache of several server processes.
+
+Django FileBasedCache lists all cache files on every write to check MAX_ENTRIES,
+this backend checks the size of the directory at most once per CULL_INTERVAL seconds of a process.
+The cache may exceed MAX_ENTRIES by the entries written during the interval.
+"""
+import time
+
+from django.core.cache.backends import filebased
+
+
+class FileBasedCache(filebased.FileBasedCache):
+
+    def __init__(self, dir, params) -> None:
+        super().__init__(dir, params)
+        self._cull_interval = float(params.get('OPTIONS', {}).get('CULL_INTERVAL', 60))
+        self._culled = None
+
+    def _cull(self) -> None:
+        now = time.monotonic()
+        if self._culled is not None and now - self._culled < self._cull_interval:
+            return
+        self._culled = now
+        super()._cull()
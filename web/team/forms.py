@@ -1,7 +1,22 @@
-from django.forms import CharField, ModelChoiceField, ModelForm, Select, TextInput, ValidationError
+from typing import Optional
+
+from django.forms import (
+    CharField,
+    CheckboxInput,
+    ClearableFileInput,
+    DateInput,
+    FileField,
+    Form,
+    ModelChoiceField,
+    ModelForm,
+    Select,
+    TextInput,
+    ValidationError,
+)
 from django.utils.translation import gettext_lazy as _
 
-from team.models import Iteration, Report, Task, Tracker, Worker
+from team import trackers
+from team.models import ExportJob, Iteration, Report, Task, Worker
 
 
 class ReportForm(ModelForm):
@@ -27,6 +42,30 @@ class ReportForm(ModelForm):
             }),
         }
 
+    def __init__(self, *args, choices: Optional[dict[str, list]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, values in (choices or {}).items():
+            self.fields[name].choices = values
+
+    @classmethod
+    def shared_choices(cls) -> dict[str, list]:
+        """
+        Evaluated choices of select fields.
+        They are shared by many forms on one page,
+        so the worker queryset is not requested for every form.
+        """
+        return {name: list(cls.base_fields[name].choices) for name in ('worker', 'status', 'delegation')}
+
+    @classmethod
+    async def ashared_choices(cls) -> dict[str, list]:
+        """Asynchronous version of shared_choices()"""
+        field = cls.base_fields['worker']
+        iterator = field.iterator(field)
+        choices = {name: list(cls.base_fields[name].choices) for name in ('status', 'delegation')}
+        choices['worker'] = [('', field.empty_label)] if field.empty_label is not None else []
+        choices['worker'] += [iterator.choice(worker) async for worker in field.queryset]
+        return choices
+
 
 class ReportCreateForm(ModelForm):
     number = CharField(
@@ -70,16 +109,15 @@ class ReportCreateForm(ModelForm):
         data = super().clean()
         if data:
             if data.get('number') and data.get('title'):
-                task_values = data['number'].rsplit('/', 1)
-                if len(task_values) != 2:
+                if len(data['number'].rsplit('/', 1)) != 2:
                     raise ValidationError(_('failed task URL'))
-                try:
-                    tracker = Tracker.objects.get(url__startswith=task_values[0])
-                except (Tracker.DoesNotExist, Tracker.MultipleObjectsReturned):
+                resolved = trackers.resolve(data['number'])
+                if resolved is None:
                     raise ValidationError(_('can not find tracker'))
 
+                tracker, number = resolved
                 task, created = Task.objects.get_or_create(
-                    number=task_values[1],
+                    number=number,
                     defaults={
                         'title': data['title'],
                         'tracker': tracker,
@@ -102,3 +140,31 @@ class IterationForm(ModelForm):
                 'placeholder': _('Comment'),
             })
         }
+
+
+class ReportImportForm(Form):
+    file = FileField(
+        label=_('Reports file'),
+        widget=ClearableFileInput(attrs={
+            'class': 'form-control-file mb-2 mr-sm-2',
+            'accept': '.csv,.json',
+        })
+    )
+
+
+class ExportJobForm(ModelForm):
+    class Meta:
+        model = ExportJob
+        fields = ['date_from', 'date_to', 'format', 'planned']
+        widgets = {
+            'date_from': DateInput(attrs={'type': 'date', 'class': 'form-control mb-2 mr-sm-2'}),
+            'date_to': DateInput(attrs={'type': 'date', 'class': 'form-control mb-2 mr-sm-2'}),
+            'format': Select(attrs={'class': 'form-control mb-2 mr-sm-2'}),
+            'planned': CheckboxInput(attrs={'class': 'form-check-input'}),
+        }
+
+    def clean(self):
+        data = super().clean()
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise ValidationError(_('start date is after end date'))
+        return data
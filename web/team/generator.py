@@ -0,0 +1,106 @@
+"""
+Synthetic data set of a large team for benchmarks.
+
+Every iteration contains a fixed number of reports, not done reports of the previous iteration
+are carried over like iteration_create() does and the rest are new tasks.
+Objects are inserted by bulk_create, so derived data (cache versions, search index, statistics)
+is updated once by reports_bulk_changed signal.
+"""
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import transaction
+
+from team import latest
+from team.models import Iteration, iteration_start, Report, Task, Tracker, Worker
+from team.signals import reports_bulk_changed
+
+TASK_PREFIX = 'GEN'
+BATCH_SIZE = 500
+# statuses weights of the iteration reports at its end
+STATUS_WEIGHTS = {Report.PLANNED: 25, Report.IN_PROGRESS: 25, Report.DONE: 50}
+DELEGATIONS = [d for d, _ in Report.DELEGATION_CHOICES]
+WORDS = (
+    'fix', 'add', 'update', 'remove', 'refactor', 'migrate', 'check', 'review', 'release', 'document',
+    'api', 'database', 'cache', 'search', 'export', 'import', 'report', 'iteration', 'worker', 'tracker',
+    'timeout', 'error', 'performance', 'settings', 'permissions', 'template', 'index', 'query', 'client', 'server',
+)
+
+
+@dataclass
+class GeneratedData:
+    workers: int
+    iterations: int
+    tasks: int
+    reports: int
+
+
+def _title(rnd: random.Random) -> str:
+    return ' '.join(rnd.choices(WORDS, k=rnd.randint(3, 8))).capitalize()
+
+
+def generate(workers: int = 50, weeks: int = 260, reports: int = 500, seed: int = 0) -> GeneratedData:
+    """
+    Creates workers, weekly iterations before the earliest existing one and their reports.
+    Workers with the same generated names are reused.
+    """
+    rnd = random.Random(seed)
+    statuses, weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+
+    with transaction.atomic():
+        tracker, _ = Tracker.objects.get_or_create(
+            name='Generated', defaults={'url': 'https://tracker.example.com/browse/'},
+        )
+        names = [f'Worker {i:03}' for i in range(1, workers + 1)]
+        existing = Worker.objects.in_bulk(names, field_name='name')
+        Worker.objects.bulk_create([
+            Worker(name=name, email=f'{name.lower().replace(" ", ".")}@example.com')
+            for name in names if name not in existing
+        ])
+        worker_ids = list(Worker.objects.filter(name__in=names).values_list('id', flat=True))
+
+        earliest = Iteration.objects.order_by('start').first()
+        # the last generated iteration is the current one or the previous to the earliest
+        start = iteration_start(earliest.start - timedelta(days=7) if earliest else None) - timedelta(days=7 * weeks)
+        iterations = Iteration.objects.bulk_create([
+            Iteration(start=start + timedelta(days=7 * week), stop=start + timedelta(days=7 * week + 6))
+            for week in range(weeks)
+        ], batch_size=BATCH_SIZE)
+        latest.reset()
+
+        # new tasks numbers continue previous generated data
+        number = Task.objects.filter(number__startswith=TASK_PREFIX).count()
+        tasks: list[Task] = []
+        plan: list[tuple[Iteration, int, int, str]] = []  # iteration, task index, worker_id, status
+        carried: list[tuple[int, int]] = []  # not done task indexes and workers of the previous iteration
+        for iteration in iterations:
+            items = [(task_index, worker_id, True) for task_index, worker_id in carried[:reports]]
+            while len(items) < reports:
+                number += 1
+                tasks.append(Task(tracker=tracker, number=f'{TASK_PREFIX}-{number:06}', title=_title(rnd)))
+                items.append((len(tasks) - 1, rnd.choice(worker_ids), False))
+            carried = []
+            for task_index, worker_id, is_carried in items:
+                status = rnd.choices(statuses, weights)[0]
+                if is_carried and status == Report.PLANNED:
+                    status = Report.IN_PROGRESS
+                if status != Report.DONE:
+                    carried.append((task_index, worker_id))
+                plan.append((iteration, task_index, worker_id, status))
+        tasks = Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+
+        objects = [
+            Report(
+                iteration=iteration,
+                worker_id=worker_id,
+                task=tasks[task_index],
+                status=status,
+                delegation=rnd.choice(DELEGATIONS),
+            )
+            for iteration, task_index, worker_id, status in plan
+        ]
+        Report.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        reports_bulk_changed.send(sender=Report, pairs={(r.iteration.pk, r.worker_id) for r in objects})
+
+    return GeneratedData(workers=len(worker_ids), iterations=len(iterations), tasks=len(tasks), reports=len(objects))
@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterable
+
+from django.db import transaction
+from django.utils.translation import gettext as _
+
+from team import trackers
+from team.models import Iteration, Report, Task, Worker
+from team.signals import reports_bulk_changed
+
+FIELDS = ('worker', 'url', 'title', 'status', 'delegation', 'comment')
+STATUSES = set(dict(Report.STATUS_CHOICES))
+DELEGATIONS = set(dict(Report.DELEGATION_CHOICES))
+DEFAULT_DELEGATION = Report._meta.get_field('delegation').default
+
+
+@dataclass
+class ImportResult:
+    created: list[Report] = field(default_factory=list)
+    errors: list[tuple[int, str]] = field(default_factory=list)  # row number and error message
+
+
+@dataclass
+class Row:
+    number: int
+    worker: str
+    url: str
+    title: str
+    status: str
+    delegation: str
+    comment: str
+
+
+def read_rows(f: IO[bytes], name: str) -> list[dict[str, Any]]:
+    """Rows from JSON (list of objects) or CSV (with header) file"""
+    content = f.read().decode('utf-8-sig')
+    if name.lower().endswith('.json'):
+        rows = json.loads(content)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError(_('JSON file must contain a list of objects'))
+        return rows
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+def _parse(rows: Iterable[dict[str, Any]], result: ImportResult) -> list[Row]:
+    parsed = []
+    for number, row in enumerate(rows, 1):
+        values = {name: str(row.get(name) or '').strip() for name in FIELDS}
+        values['status'] = values['status'] or Report.PLANNED
+        values['delegation'] = values['delegation'] or DEFAULT_DELEGATION
+        if not values['worker'] or not values['url']:
+            result.errors.append((number, _('worker and task URL are required')))
+        elif values['status'] not in STATUSES:
+            result.errors.append((number, _('unknown status "{}"').format(values['status'])))
+        elif values['delegation'] not in DELEGATIONS:
+            result.errors.append((number, _('unknown delegation "{}"').format(values['delegation'])))
+        else:
+            parsed.append(Row(number=number, **values))
+    return parsed
+
+
+def import_reports(iteration: Iteration, rows: Iterable[dict[str, Any]]) -> ImportResult:
+    """
+    Creates iteration reports from rows with fields: worker (name), url (task URL),
+    title, status, delegation and comment. Workers, trackers and tasks are resolved by batches,
+    missing tasks are created. Invalid rows are skipped and returned as errors.
+    """
+    result = ImportResult()
+    parsed = _parse(rows, result)
+    workers = Worker.objects.filter(disabled=False).in_bulk({row.worker for row in parsed}, field_name='name')
+    index = trackers.get_index()
+
+    candidates = []
+    for row in parsed:
+        worker = workers.get(row.worker)
+        resolved = index.resolve(row.url)
+        if worker is None:
+            result.errors.append((row.number, _('unknown worker "{}"').format(row.worker)))
+        elif resolved is None:
+            result.errors.append((row.number, _('can not find tracker')))
+        else:
+            tracker, task_number = resolved
+            candidates.append((row, worker, tracker, task_number))
+
+    with transaction.atomic():
+        tasks = Task.objects.in_bulk({candidate[-1] for candidate in candidates}, field_name='number')
+        new_tasks = {}
+        for row, _worker, tracker, task_number in candidates:
+            if task_number not in tasks and task_number not in new_tasks and row.title:
+                new_tasks[task_number] = Task(tracker=tracker, number=task_number, title=row.title)
+        tasks.update({task.number: task for task in Task.objects.bulk_create(new_tasks.values())})
+
+        existing = set(iteration.reports.filter(task__in=tasks.values()).values_list('task_id', flat=True))
+        reports = []
+        for row, worker, _tracker, task_number in candidates:
+            task = tasks.get(task_number)
+            if task is None:
+                result.errors.append((row.number, _('task title is required')))
+            elif task.pk in existing:
+                result.errors.append((row.number, _('task is already exists in this iteration')))
+            else:
+                existing.add(task.pk)
+                reports.append(Report(
+                    iteration=iteration,
+                    worker=worker,
+                    task=task,
+                    status=row.status,
+                    delegation=row.delegation,
+                    comment=row.comment,
+                ))
+        result.created = Report.objects.bulk_create(reports, batch_size=500)
+        reports_bulk_changed.send(sender=Report, pairs={(r.iteration_id, r.worker_id) for r in result.created})
+
+    result.errors.sort()
+    return result
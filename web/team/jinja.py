@@ -0,0 +1,84 @@
+"""
+Jinja2 environment for Jinja2 versions of hot templates (team/jinja2, settings.JINJA2_TEMPLATES).
+
+Form widgets are rendered by Jinja2 too (FormRenderer), because a large iteration page
+contains thousands of them. Templates are compiled once per process and their bytecode is kept in JINJA2_CACHE_DIR,
+so new processes do not parse them again. Output is the same as the Django templates one:
+values are localized and escaped like Django does and filters are Django ones.
+"""
+from pathlib import Path
+from typing import Any, Optional
+
+from django import forms
+from django.conf import settings
+from django.forms.renderers import BaseRenderer, EngineMixin
+from django.template import defaultfilters
+from django.template.backends.jinja2 import Jinja2
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import formats, timezone
+from django.utils.functional import cached_property
+from django.utils.html import conditional_escape
+from django.utils.translation import gettext, ngettext
+from jinja2 import ChainableUndefined, Environment, FileSystemBytecodeCache
+
+from team.timing import TimedTemplate
+
+
+def url(name: str, *args: Any) -> str:
+    return reverse(name, args=args)
+
+
+def querystring(request, **kwargs: Any) -> str:
+    """Current query string with replaced parameters like Django {% querystring %} tag"""
+    params = request.GET.copy()
+    for key, value in kwargs.items():
+        if value is None:
+            params.pop(key, None)
+        else:
+            params[key] = value
+    if not params and not request.GET:
+        return ''
+    return '?' + params.urlencode()
+
+
+def finalize(value: Any) -> Any:
+    # Django escapes quotes as &quot; and &#x27;, SafeString has __html__, so it is not escaped again
+    return conditional_escape(formats.localize(timezone.template_localtime(value)))
+
+
+def environment(**options: Any) -> Environment:
+    cache_dir: Optional[str] = getattr(settings, 'JINJA2_CACHE_DIR', None)
+    if cache_dir:
+        options.setdefault('bytecode_cache', FileSystemBytecodeCache(cache_dir))
+    # missing attributes are rendered as empty strings like in Django templates
+    options['undefined'] = ChainableUndefined
+    env = Environment(extensions=['jinja2.ext.i18n'], finalize=finalize, **options)
+    env.install_gettext_callables(gettext, ngettext, newstyle=True)
+    env.globals.update(url=url, static=static, querystring=querystring)
+    env.filters.update(join=defaultfilters.join, truncatechars=defaultfilters.truncatechars)
+    return env
+
+
+class TimedJinja2(Jinja2):
+    """Jinja2 backend which measures rendering time for TimingMiddleware"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class FormRenderer(EngineMixin, BaseRenderer):
+    """Jinja2 form renderer with the same environment as pages"""
+    backend = TimedJinja2
+
+    @cached_property
+    def engine(self) -> Jinja2:
+        return self.backend({
+            'APP_DIRS': True,
+            'DIRS': [Path(forms.__file__).parent / 'jinja2'],
+            'NAME': 'djangoforms',
+            'OPTIONS': {'environment': 'team.jinja.environment'},
+        })
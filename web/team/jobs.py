@@ -0,0 +1,154 @@
+"""
+Background exports: jobs are queued by the web UI and processed by export_worker command.
+
+The queue is ExportJob table, a worker takes the oldest pending job, identical active jobs are prevented
+by a partial unique constraint. Results are gzip files of the default storage (MEDIA_ROOT).
+A running job refreshes its "updated" time before every iteration, jobs without it are queued again,
+so a result is saved only if the job is still the same run (status and "started" time are not changed).
+"""
+import gzip
+import logging
+import tempfile
+from datetime import date, timedelta
+from itertools import chain
+from typing import Iterable, Iterator, Optional, TextIO
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from team.models import ArchivedIteration, ExportJob, Iteration
+
+logger = logging.getLogger(__name__)
+
+
+class JobLost(Exception):
+    """The running job has been queued again or deleted"""
+
+
+def submit(date_from: date, date_to: date, fmt: str = 'text', planned: bool = False) -> tuple[ExportJob, bool]:
+    """Queues a new job or returns the identical active one, the flag is True for a new job"""
+    # planned export differs only in text format
+    params = {'date_from': date_from, 'date_to': date_to, 'format': fmt, 'planned': planned and fmt == 'text'}
+    try:
+        with transaction.atomic():
+            return ExportJob.objects.create(**params), True
+    except IntegrityError:
+        job = ExportJob.objects.filter(status__in=ExportJob.ACTIVE, **params).first()
+        if job is None:
+            # the identical job has been finished just now
+            return ExportJob.objects.create(**params), True
+        return job, False
+
+
+def claim(timeout: Optional[float] = None) -> Optional[ExportJob]:
+    """
+    Takes the oldest pending job and marks it running.
+    Running jobs without heartbeat for timeout seconds (settings.EXPORT_JOB_TIMEOUT by default) are lost
+    by stopped workers, they are queued again.
+    """
+    if timeout is None:
+        timeout = settings.EXPORT_JOB_TIMEOUT
+    now = timezone.now()
+    with transaction.atomic():
+        lost = ExportJob.objects.filter(status=ExportJob.RUNNING, updated__lt=now - timedelta(seconds=timeout))
+        lost.update(status=ExportJob.PENDING, updated=now)
+        job = ExportJob.objects.select_for_update(skip_locked=True).filter(status=ExportJob.PENDING).order_by(
+            'id'
+        ).first()
+        if job is not None:
+            job.status, job.started = ExportJob.RUNNING, now
+            job.save(update_fields=['status', 'started', 'updated'])
+    return job
+
+
+def _current(job: ExportJob) -> models.QuerySet[ExportJob]:
+    """The job if it is still running by this worker"""
+    return ExportJob.objects.filter(pk=job.pk, status=ExportJob.RUNNING, started=job.started)
+
+
+def heartbeat(job: ExportJob) -> None:
+    """Refreshes "updated" time of the running job, raises JobLost if it has been queued again"""
+    if not _current(job).update(updated=timezone.now()):
+        raise JobLost(f'export job #{job.pk} is not running by this worker')
+
+
+def _beating(job: ExportJob, items: Iterable) -> Iterator:
+    for item in items:
+        heartbeat(job)
+        yield item
+
+
+def iterations(job: ExportJob) -> list[Iteration | ArchivedIteration]:
+    """Hot and archived iterations which start in the job date range"""
+    filters = {'start__gte': job.date_from, 'start__lte': job.date_to}
+    items = [*Iteration.objects.filter(**filters), *ArchivedIteration.objects.filter(**filters)]
+    return sorted(items, key=lambda x: x.start)
+
+
+def write(job: ExportJob, output: TextIO) -> tuple[int, int]:
+    """Writes export of the job iterations to the output, returns numbers of iterations and reports"""
+    from team.views import Export  # views use this module
+
+    items = iterations(job)
+    if job.format != 'text':
+        rows = chain.from_iterable(Export(iteration).rows() for iteration in _beating(job, items))
+        return len(items), Export.write_rows(rows, output, job.format)
+
+    reports = 0
+    for iteration in _beating(job, items):
+        # the same as export command output
+        output.write(f'Iteration {iteration}\n========\n')
+        reports += Export(iteration, planned=job.planned).write(output)
+    return len(items), reports
+
+
+def run(job: ExportJob) -> ExportJob:
+    """
+    Exports the claimed job to a gzip file and saves its result.
+    The result of a lost job is dropped and it is left "running", it belongs to the worker which has claimed it again.
+    """
+    try:
+        with tempfile.TemporaryFile() as f:
+            with gzip.open(f, 'wt', encoding='utf-8', newline='') as output:
+                job.iterations, job.reports = write(job, output)
+            f.seek(0)
+            job.file.save(job.filename, File(f), save=False)
+    except JobLost as e:
+        logger.warning('%s', e)
+        return job
+    except Exception as e:
+        logger.exception('export job #%s failed', job.pk)
+        job.status, job.error = ExportJob.FAILED, str(e) or e.__class__.__name__
+    else:
+        job.status = ExportJob.DONE
+
+    job.finished = job.updated = timezone.now()
+    fields = ('status', 'error', 'file', 'iterations', 'reports', 'finished', 'updated')
+    if not _current(job).update(**{name: getattr(job, name) for name in fields}):
+        logger.warning('export job #%s is not running by this worker, its result is dropped', job.pk)
+        if job.file:
+            job.file.delete(save=False)
+        # it is not finished by this worker
+        job.status = ExportJob.RUNNING
+    return job
+
+
+def cleanup(days: Optional[int] = None) -> int:
+    """
+    Deletes jobs finished more than days (settings.EXPORT_JOBS_KEEP_DAYS by default) ago with their files,
+    returns a number of deleted jobs.
+    """
+    if days is None:
+        days = settings.EXPORT_JOBS_KEEP_DAYS
+    jobs = ExportJob.objects.exclude(status__in=ExportJob.ACTIVE).filter(
+        finished__lt=timezone.now() - timedelta(days=days),
+    )
+    count = 0
+    for job in jobs:
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
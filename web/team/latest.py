@@ -0,0 +1,77 @@
+"""
+Pointer to the latest iteration.
+
+The iteration is cached in the process and in the shared cache under its version,
+the version is bumped when any iteration is saved or deleted.
+Callers get a copy, so attributes set by views are not shared between requests.
+"""
+import copy
+from typing import Optional
+
+from django.core.cache import cache as shared_cache
+
+from team import cache
+from team.models import Iteration
+
+VERSION_KEY = cache.version_key('latest_iteration')
+
+# process cache of the version and the iteration
+_latest: tuple[int, Optional[Iteration]] | None = None
+
+
+def _key(version: int) -> str:
+    return f'team:latest_iteration:{version}'
+
+
+def _version() -> int:
+    return cache.get_versions([VERSION_KEY])[VERSION_KEY]
+
+
+def _get_cached(version: int) -> tuple[bool, Optional[Iteration]]:
+    if _latest is not None and _latest[0] == version:
+        return True, _latest[1]
+    # the value is a list, so "no iterations" is not a cache miss
+    value = shared_cache.get(_key(version))
+    return value is not None, value[0] if value else None
+
+
+def _set_cached(version: int, iteration: Optional[Iteration]) -> None:
+    global _latest
+    _latest = version, iteration
+    shared_cache.set(_key(version), [iteration], timeout=None)
+
+
+def get_iteration() -> Optional[Iteration]:
+    version = _version()
+    found, iteration = _get_cached(version)
+    if not found:
+        iteration = Iteration.objects.first()
+        _set_cached(version, iteration)
+    return copy.copy(iteration)
+
+
+async def aget_iteration() -> Optional[Iteration]:
+    """Asynchronous version of get_iteration()"""
+    version = _version()
+    found, iteration = _get_cached(version)
+    if not found:
+        iteration = await Iteration.objects.afirst()
+        _set_cached(version, iteration)
+    return copy.copy(iteration)
+
+
+def _is_last(iteration: Iteration, latest: Optional[Iteration]) -> bool:
+    # iterations can have the same start
+    return latest is not None and iteration.start >= latest.start
+
+
+def is_last(iteration: Iteration) -> bool:
+    return _is_last(iteration, get_iteration())
+
+
+async def ais_last(iteration: Iteration) -> bool:
+    return _is_last(iteration, await aget_iteration())
+
+
+def reset() -> None:
+    cache.bump_versions([VERSION_KEY])
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from team import archive, db
+
+
+class Command(BaseCommand):
+    help = 'Moves old iterations and their reports to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weeks', type=int, default=settings.ARCHIVE_AFTER_WEEKS,
+            help='archive iterations finished more than this number of weeks ago',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.ARCHIVE_CHUNK_SIZE,
+            help='number of reports moved by one transaction',
+        )
+        parser.add_argument('--limit', type=int, default=0, help='maximum number of iterations, 0 is unlimited')
+
+    def handle(self, *args, **options):
+        iterations, reports = 0, 0
+        for iteration in archive.archivable(options['weeks']):
+            if options['limit'] and iterations >= options['limit']:
+                break
+            reports += archive.archive_iteration(iteration, options['chunk_size'])
+            iterations += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Archived iteration {iteration}\n')
+        if iterations:
+            db.optimize()
+        self.stdout.write(f'Archived {iterations} iterations, {reports} reports\n')
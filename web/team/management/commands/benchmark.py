@@ -0,0 +1,55 @@
+from importlib.util import find_spec
+
+from django.core.management.base import BaseCommand, CommandError
+
+from team import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks of views using the data of the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=['servers', 'sqlite', 'templates', 'views'])
+        parser.add_argument('--requests', type=int, default=200, help='total number of requests')
+        parser.add_argument('--concurrency', type=int, default=10, help='number of concurrent clients')
+        parser.add_argument('--repeat', type=int, default=5, help='number of runs of every view/template benchmark')
+        parser.add_argument('--save', help='path to save view/template results as a baseline JSON')
+        parser.add_argument('--compare', help='path of a baseline JSON to compare view/template results')
+        parser.add_argument('--threshold', type=float, default=1.2, help='allowed slowdown ratio to the baseline')
+
+    def handle(self, suite: str, *args, **options):
+        if suite == 'servers':
+            results = benchmarks.server_throughput(options['requests'], options['concurrency'])
+            for result in results:
+                self.stdout.write(
+                    '{name}: {requests} requests in {duration:.2f}s, {rps:.1f} requests/s'.format(**result)
+                )
+        elif suite == 'sqlite':
+            results = benchmarks.sqlite_writes(options['requests'], options['concurrency'])
+            for result in results:
+                self.stdout.write(
+                    '{name}: {requests} updates in {duration:.2f}s, {rps:.1f} updates/s, {errors} errors'.format(
+                        **result
+                    )
+                )
+        elif suite == 'templates':
+            if find_spec('jinja2') is None:
+                raise CommandError('jinja2 is not installed')
+            self.timings(benchmarks.template_timings(options['repeat']), options)
+        elif suite == 'views':
+            self.timings(benchmarks.view_timings(options['repeat']), options)
+
+    def timings(self, results: list[dict], options: dict):
+        if options['compare']:
+            benchmarks.compare(results, options['compare'], options['threshold'])
+        for result in results:
+            line = '{name}: median {median:.4f}s, min {min:.4f}s, {queries} queries'.format(**result)
+            if 'baseline' in result:
+                line += ' | baseline {median:.4f}s, {queries} queries'.format(**result['baseline'])
+                line += ', {:.2f}x{}'.format(result['ratio'], ' REGRESSION' if result['regression'] else '')
+            self.stdout.write(line)
+        if options['save']:
+            benchmarks.save_baseline(results, options['save'])
+        regressions = [result['name'] for result in results if result.get('regression')]
+        if regressions:
+            raise CommandError('regressions: {}'.format(', '.join(regressions)))
@@ -1,21 +1,111 @@
-from typing import List
+import os
+import time
+from concurrent.futures import as_completed, ProcessPoolExecutor
+from datetime import date
+from functools import partial
+from itertools import chain
+from types import SimpleNamespace
+from typing import List, Optional
 
-from django.core.management.base import BaseCommand
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 
-from team.models import Iteration
+from team import archive
+from team.models import ArchivedIteration, Iteration
 from team.views import Export
 
+EXTENSIONS = {'text': 'txt', 'csv': 'csv', 'json': 'json', 'ndjson': 'ndjson'}
+
+
+def init_process() -> None:
+    # processes may be spawned without inherited Django state
+    django.setup()
+
+
+def export_iteration(iteration_id: int, fmt: str, output: str) -> tuple[int, int]:
+    """Exports one hot or archived iteration to a file, returns a number of reports and file size"""
+    iteration = archive.get_iteration(iteration_id)
+    name = 'iteration_{}_{}.{}'.format(
+        iteration.start.strftime('%Y%m%d'),
+        iteration.stop.strftime('%Y%m%d'),
+        EXTENSIONS[fmt],
+    )
+    path = os.path.join(output, name)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        count = Export(iteration).write(f, fmt)
+    return count, os.path.getsize(path)
+
 
 class Command(BaseCommand):
     help = 'Reports iterations export'
 
     def add_arguments(self, parser):
-        parser.add_argument('iteration_ids', nargs='+', type=int)
+        parser.add_argument('iteration_ids', nargs='*', type=int)
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help='min iteration start date')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help='max iteration start date')
+        parser.add_argument('--id-from', type=int, help='min iteration ID')
+        parser.add_argument('--id-to', type=int, help='max iteration ID')
+        parser.add_argument('--format', default='text', choices=Export.FORMATS)
+        parser.add_argument('--output', help='directory for per-iteration files, stdout is used by default')
+        parser.add_argument('--workers', type=int, default=1, help='number of export processes')
 
     def handle(self, iteration_ids: List[int], *args, **options):
-        iterations = Iteration.objects.filter(id__in=iteration_ids)
+        iterations = self._filter(iteration_ids, options)
+        output: Optional[str] = options['output']
+        if output is None:
+            self._to_stdout(iterations, options['format'])
+            return
+
+        os.makedirs(output, exist_ok=True)
+        ids = [iteration.pk for iteration in iterations]
+        started = time.monotonic()
+        reports = size = 0
+        for count, file_size in self._export(ids, options['format'], output, options['workers']):
+            reports += count
+            size += file_size
+        duration = time.monotonic() - started
+        self.stdout.write(
+            f'Exported {len(ids)} iterations, {reports} reports, {size} bytes '
+            f'in {duration:.2f}s ({reports / (duration or 1):.1f} reports/s)\n'
+        )
+
+    @staticmethod
+    def _filter(iteration_ids: List[int], options) -> list[Iteration | ArchivedIteration]:
+        """Hot and archived iterations in the default order of the model, the latest start first"""
+        filters = {
+            'id__in': iteration_ids or None,
+            'start__gte': options['date_from'],
+            'start__lte': options['date_to'],
+            'id__gte': options['id_from'],
+            'id__lte': options['id_to'],
+        }
+        filters = {key: value for key, value in filters.items() if value is not None}
+        if not filters:
+            raise CommandError('iteration IDs, dates or IDs range are required')
+        items = [*Iteration.objects.filter(**filters), *ArchivedIteration.objects.filter(**filters)]
+        return sorted(items, key=lambda x: x.start, reverse=True)
+
+    def _to_stdout(self, iterations, fmt: str) -> None:
+        # the wrapper adds missed line endings, exports are written as they are
+        output = SimpleNamespace(write=partial(self.stdout.write, ending=''))
+        if fmt != 'text':
+            # one document of all iterations
+            Export.write_rows(chain.from_iterable(Export(iteration).rows() for iteration in iterations), output, fmt)
+            return
         for iteration in iterations:
-            e = Export(iteration)
-            content = e.render()
-            self.stdout.write(f'Iteration {iteration}\n========\n')
-            self.stdout.write(content)
+            output.write(f'Iteration {iteration}\n========\n')
+            Export(iteration).write(output)
+
+    def _export(self, ids: list[int], fmt: str, output: str, workers: int):
+        if workers < 2:
+            for iteration_id in ids:
+                yield export_iteration(iteration_id, fmt, output)
+            return
+
+        # connections must not be shared with child processes
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_process) as executor:
+            futures = [executor.submit(export_iteration, iteration_id, fmt, output) for iteration_id in ids]
+            for future in as_completed(futures):
+                yield future.result()
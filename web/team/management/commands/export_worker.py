@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from team import jobs
+from team.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Processes background export jobs, several workers can share the queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, help='exit after this number of jobs')
+        parser.add_argument(
+            '--interval', type=float, default=settings.EXPORT_WORKER_INTERVAL, help='polling interval, seconds',
+        )
+
+    def cleanup(self) -> None:
+        deleted = jobs.cleanup()
+        if deleted:
+            self.stdout.write(f'Deleted {deleted} old export jobs\n')
+
+    def handle(self, *args, once: bool, max_jobs: int | None, interval: float, **options):
+        processed, cleaned = 0, None
+        while max_jobs is None or processed < max_jobs:
+            # the process is long-running like a web server one
+            close_old_connections()
+            if cleaned is None or time.monotonic() - cleaned >= settings.EXPORT_JOBS_CLEANUP_INTERVAL:
+                self.cleanup()
+                cleaned = time.monotonic()
+            job = jobs.claim()
+            if job is None:
+                if once:
+                    break
+                time.sleep(interval)
+                continue
+
+            started = time.monotonic()
+            jobs.run(job)
+            processed += 1
+            duration = time.monotonic() - started
+            if job.status == ExportJob.RUNNING:
+                self.stderr.write(f'Export job #{job.pk} {job} has been queued again')
+            elif job.status == ExportJob.DONE:
+                self.stdout.write(
+                    f'Export job #{job.pk} {job}: {job.iterations} iterations, {job.reports} reports '
+                    f'in {duration:.2f}s\n'
+                )
+            else:
+                self.stderr.write(f'Export job #{job.pk} {job} failed: {job.error}')
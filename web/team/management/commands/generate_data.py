@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from team import db, generator
+
+
+class Command(BaseCommand):
+    help = 'Generates synthetic data set of a large team for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=50, help='number of workers')
+        parser.add_argument('--weeks', type=int, default=260, help='number of weekly iterations')
+        parser.add_argument('--reports', type=int, default=500, help='number of reports per iteration')
+        parser.add_argument('--seed', type=int, default=0, help='random seed')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = generator.generate(options['workers'], options['weeks'], options['reports'], options['seed'])
+        # the planner needs statistics of the new data set
+        db.optimize(analyze=True)
+        self.stdout.write(
+            f'Generated {result.workers} workers, {result.iterations} iterations, {result.tasks} tasks, '
+            f'{result.reports} reports in {time.perf_counter() - started:.2f}s\n'
+        )
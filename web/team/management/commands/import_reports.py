@@ -0,0 +1,35 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from team import db
+from team.importer import import_reports, read_rows
+from team.models import Iteration
+
+
+class Command(BaseCommand):
+    help = 'Imports iteration reports from CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('iteration_id', type=int)
+        parser.add_argument('path', help='CSV or JSON file with worker, url, title, status, delegation, comment')
+
+    def handle(self, iteration_id: int, path: str, *args, **options):
+        try:
+            iteration = Iteration.objects.get(pk=iteration_id)
+        except Iteration.DoesNotExist:
+            raise CommandError(f'iteration {iteration_id} does not exist')
+
+        try:
+            with open(path, 'rb') as f:
+                rows = read_rows(f, path)
+        except OSError as e:
+            raise CommandError(f'can not read {path}: {e.strerror}')
+        except (ValueError, csv.Error) as e:
+            # decoding and JSON errors are ValueError too
+            raise CommandError(f'reports can not be imported: {e}')
+        result = import_reports(iteration, rows)
+        db.optimize()
+        for number, error in result.errors:
+            self.stderr.write(f'row {number}: {error}')
+        self.stdout.write(f'Imported {len(result.created)} reports, {len(result.errors)} errors\n')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from team import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds full-text search index of iterations and reports'
+
+    def handle(self, *args, **options):
+        if not search.fts_enabled():
+            self.stderr.write('full-text search index is not supported by the database')
+            return
+        with transaction.atomic():
+            count = search.rebuild()
+        self.stdout.write(f'Search index was rebuilt with {count} rows\n')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from team import stats
+
+
+class Command(BaseCommand):
+    help = 'Recalculates reports counters of iterations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='iteration IDs, all iterations by default')
+
+    def handle(self, *args, ids: list[int], **options):
+        with transaction.atomic():
+            count = stats.rebuild(ids or None)
+        self.stdout.write(f'Iteration stats were rebuilt with {count} rows\n')
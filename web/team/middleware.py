@@ -1,11 +1,40 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 
+from team import timing
+
+logger = logging.getLogger('team.performance')
+
+
+class AsyncCapableMiddleware:
+    """Base of middlewares which are called without a thread switch by both WSGI and ASGI handlers"""
+    sync_capable = True
+    async_capable = True
 
-class SettingsMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request)
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+    def process(self, request):
+        raise NotImplementedError
+
+
+class SettingsMiddleware(AsyncCapableMiddleware):
+
+    @staticmethod
+    def set_params(request) -> None:
         # settings configuration params
         request.settings_params = {
             'meta_description': settings.META_DESCRIPTION,
@@ -13,5 +42,57 @@ class SettingsMiddleware:
             'lang': settings.LANGUAGE_CODE,
         }
 
-        response = self.get_response(request)
+    def process(self, request):
+        self.set_params(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.set_params(request)
+        return await self.get_response(request)
+
+
+class TimingMiddleware(AsyncCapableMiddleware):
+    """
+    Measures total, database and templates time of requests,
+    adds them to Server-Timing header and logs slow requests with their slowest queries.
+    Content of streaming responses is produced after this middleware, so it is not measured.
+    """
+
+    @staticmethod
+    def server_timing(t: timing.Timing, total: float) -> str:
+        app = max(total - t.db - t.template, 0.0)
+        return ', '.join([
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={t.db * 1000:.1f};desc="{t.queries} queries"',
+            f'tpl;dur={t.template * 1000:.1f}',
+            f'app;dur={app * 1000:.1f}',
+        ])
+
+    def process(self, request):
+        with timing.collect(settings.SLOW_REQUEST_LOGGED_QUERIES) as t:
+            response = self.get_response(request)
+        return self.finish(request, response, t)
+
+    async def __acall__(self, request):
+        with timing.collect(settings.SLOW_REQUEST_LOGGED_QUERIES) as t:
+            response = await self.get_response(request)
+        return self.finish(request, response, t)
+
+    def finish(self, request, response, t: timing.Timing):
+        total = t.total
+
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = self.server_timing(t, total)
+        if total >= settings.SLOW_REQUEST_TIME or t.queries >= settings.SLOW_REQUEST_QUERIES:
+            data = {
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 2),
+                'db_ms': round(t.db * 1000, 2),
+                'queries': t.queries,
+                'template_ms': round(t.template * 1000, 2),
+                'slowest_queries': t.slowest_queries(),
+            }
+            logger.warning('slow request %s', json.dumps(data), extra={'timing': data})
         return response
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+CREATE_SQL = (
+    'CREATE VIRTUAL TABLE team_search USING fts5('
+    "iteration_id UNINDEXED, number, title, comment, tokenize='unicode61 remove_diacritics 2')"
+)
+INDEX_SQL = (
+    'INSERT INTO team_search (rowid, iteration_id, number, title, comment) '
+    'SELECT r.id * 2, r.iteration_id, t.number, t.title, r.comment '
+    'FROM team_report r INNER JOIN team_task t ON r.task_id = t.id',
+    'INSERT INTO team_search (rowid, iteration_id, number, title, comment) '
+    "SELECT i.id * 2 + 1, i.id, '', '', i.comment FROM team_iteration i",
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(CREATE_SQL)
+        for sql in INDEX_SQL:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS team_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team', '0012_rename_start_stop_idx_start_stop_index_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+STATS_COLUMNS = ('planned', 'in_progress', 'done', 'tell', 'sell', 'consult', 'agree', 'advise', 'inquire', 'delegate')
+FILL_SQL = (
+    # iteration×worker rows
+    'INSERT INTO team_iterationstats (iteration_id, worker_id, {columns}) '
+    'SELECT iteration_id, worker_id, {counts} FROM team_report GROUP BY iteration_id, worker_id',
+    # iteration totals
+    'INSERT INTO team_iterationstats (iteration_id, worker_id, {columns}) '
+    'SELECT iteration_id, NULL, {counts} FROM team_report GROUP BY iteration_id',
+)
+
+
+def fill_stats(apps, schema_editor):
+    columns = ', '.join(STATS_COLUMNS)
+    counts = ', '.join(
+        "SUM(CASE WHEN status = '{0}' OR delegation = '{0}' THEN 1 ELSE 0 END)".format(name) for name in STATS_COLUMNS
+    )
+    for sql in FILL_SQL:
+        schema_editor.execute(sql.format(columns=columns, counts=counts))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team', '0013_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IterationStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('planned', models.IntegerField(default=0, verbose_name='planned')),
+                ('in_progress', models.IntegerField(default=0, verbose_name='in progress')),
+                ('done', models.IntegerField(default=0, verbose_name='done')),
+                ('tell', models.IntegerField(default=0, verbose_name='tell')),
+                ('sell', models.IntegerField(default=0, verbose_name='sell')),
+                ('consult', models.IntegerField(default=0, verbose_name='consult')),
+                ('agree', models.IntegerField(default=0, verbose_name='agree')),
+                ('advise', models.IntegerField(default=0, verbose_name='advise')),
+                ('inquire', models.IntegerField(default=0, verbose_name='inquire')),
+                ('delegate', models.IntegerField(default=0, verbose_name='delegate')),
+                ('iteration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='team.iteration', verbose_name='iteration')),
+                ('worker', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='team.worker', verbose_name='worker')),
+            ],
+            options={
+                'verbose_name_plural': 'iteration stats',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('worker__isnull', False)), fields=('iteration', 'worker'), name='iteration_worker_stats_unique'), models.UniqueConstraint(condition=models.Q(('worker__isnull', True)), fields=('iteration',), name='iteration_stats_unique')],
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
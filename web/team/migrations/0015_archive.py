@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team', '0014_iterationstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedIteration',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('start', models.DateField(verbose_name='start')),
+                ('stop', models.DateField(verbose_name='stop')),
+                ('comment', models.TextField(blank=True, default='', verbose_name='comment')),
+                ('created', models.DateTimeField(verbose_name='created')),
+                ('updated', models.DateTimeField(verbose_name='updated')),
+                ('archived', models.DateTimeField(auto_now_add=True, verbose_name='archived')),
+            ],
+            options={
+                'ordering': ('-start',),
+                'indexes': [models.Index(fields=['start', 'stop'], name='archived_start_stop_index')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedReport',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('planned', 'Planned'), ('in_progress', 'In progress'), ('done', 'Done')], max_length=32, verbose_name='status')),
+                ('delegation', models.CharField(choices=[('tell', 'Tell'), ('sell', 'Sell'), ('consult', 'Consult'), ('agree', 'Agree'), ('advise', 'Advise'), ('inquire', 'Inquire'), ('delegate', 'Delegate')], max_length=32, verbose_name='delegation')),
+                ('comment', models.TextField(blank=True, default='', verbose_name='comment')),
+                ('created', models.DateTimeField(verbose_name='created')),
+                ('updated', models.DateTimeField(verbose_name='updated')),
+                ('iteration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='team.archivediteration', verbose_name='iteration')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='team.task', verbose_name='task')),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='team.worker', verbose_name='worker')),
+            ],
+            options={
+                'ordering': ('iteration', 'worker', 'status'),
+            },
+        ),
+    ]
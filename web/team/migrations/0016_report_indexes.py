@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team', '0015_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['iteration', 'worker', 'status', 'task'], name='report_iteration_worker_index'),
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='iteration',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='team.iteration', verbose_name='iteration'),
+        ),
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(condition=models.Q(('disabled', False)), fields=['name'], name='worker_enabled_index'),
+        ),
+        migrations.AddConstraint(
+            model_name='worker',
+            constraint=models.UniqueConstraint(fields=('order', 'name', 'email'), name='worker_ordering_unique'),
+        ),
+        # statistics let the planner read reports by workers order through the new indexes
+        migrations.RunSQL('ANALYZE', migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team', '0016_report_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='updated')),
+                ('date_from', models.DateField(verbose_name='from')),
+                ('date_to', models.DateField(verbose_name='to')),
+                ('format', models.CharField(choices=[('text', 'Text'), ('csv', 'CSV'), ('json', 'JSON'), ('ndjson', 'NDJSON')], default='text', max_length=16, verbose_name='format')),
+                ('planned', models.BooleanField(default=False, verbose_name='planned')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16, verbose_name='status')),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='file')),
+                ('iterations', models.IntegerField(default=0, verbose_name='iterations')),
+                ('reports', models.IntegerField(default=0, verbose_name='reports')),
+                ('error', models.TextField(blank=True, default='', verbose_name='error')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='started')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finished')),
+            ],
+            options={
+                'ordering': ('-id',),
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='export_job_pending_index')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('date_from', 'date_to', 'format', 'planned'), name='export_job_active_unique')],
+            },
+        ),
+    ]
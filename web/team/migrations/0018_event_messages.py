@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team', '0017_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=255, verbose_name='channel')),
+                ('name', models.CharField(max_length=64, verbose_name='name')),
+                ('data', models.JSONField(default=dict, verbose_name='data')),
+                ('created', models.DateTimeField(db_index=True, verbose_name='created')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -78,6 +78,11 @@ class Worker(CreatedUpdatedModel, NameModel):
 
     class Meta:
         ordering = ('order', 'name', 'email')
+        constraints = [
+            # name is unique already, the unique index lets reports be read in workers order without sorting
+            models.UniqueConstraint(fields=['order', 'name', 'email'], name='worker_ordering_unique'),
+        ]
+        indexes = [models.Index(fields=['name'], condition=models.Q(disabled=False), name='worker_enabled_index')]
 
     @property
     def has_dashboard(self) -> bool:
@@ -108,6 +113,8 @@ class Iteration(CreatedUpdatedModel, CommentModel):
     start = models.DateField(_('start'), default=iteration_start)
     stop = models.DateField(_('stop'), default=iteration_stop)
 
+    is_archived = False
+
     class Meta:
         ordering = ('-start',)
         indexes = [models.Index(fields=['start', 'stop'], name='start_stop_index')]
@@ -119,8 +126,9 @@ class Iteration(CreatedUpdatedModel, CommentModel):
         )
 
     @property
-    def is_last(self):
-        return not self._meta.model.objects.filter(start__gt=self.start).exists()
+    def is_last(self) -> bool:
+        from team import latest
+        return latest.is_last(self)
 
 
 class Report(CreatedUpdatedModel, CommentModel):
@@ -143,9 +151,10 @@ class Report(CreatedUpdatedModel, CommentModel):
         ('delegate', _('Delegate')),  # I will fully delegate
     )
 
+    # iteration_id is the prefix of report_iteration_worker_index and unique_together ones
     iteration = models.ForeignKey(
         Iteration, verbose_name=_('iteration'),
-        on_delete=models.CASCADE, related_name='reports',
+        on_delete=models.CASCADE, related_name='reports', db_index=False,
     )
     worker = models.ForeignKey(Worker, verbose_name=_('worker'), on_delete=models.CASCADE)
     task = models.ForeignKey(Task, verbose_name=_('task'), on_delete=models.CASCADE)
@@ -158,6 +167,49 @@ class Report(CreatedUpdatedModel, CommentModel):
     class Meta:
         ordering = ('iteration', 'worker', 'status')
         unique_together = ('iteration', 'task')
+        indexes = [
+            # covers reports of the iteration in workers sections order
+            models.Index(fields=['iteration', 'worker', 'status', 'task'], name='report_iteration_worker_index'),
+        ]
+
+    # fields of the initial values, they are used by signal receivers of the report change
+    TRACKED_FIELDS = ('iteration_id', 'worker_id', 'status', 'delegation')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # initial values to detect moving of the report between iterations/workers and counters changes
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _load_tracked(self) -> None:
+        """Reloads deferred tracked fields from the database, their initial values are needed before the change"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return
+        missing = [name for name in self.TRACKED_FIELDS if name not in loaded]
+        if not missing:
+            return
+        values = Report.objects.filter(pk=self.pk).values(*missing).first()
+        if values is None:
+            # the row is gone, there are no initial values
+            self._loaded_values = None
+            return
+        loaded.update(values)
+        for name, value in values.items():
+            self.__dict__.setdefault(name, value)
+
+    def save(self, *args, **kwargs):
+        self._load_tracked()
+        super().save(*args, **kwargs)
+        # deferred fields stay deferred
+        self._loaded_values = {
+            f.attname: self.__dict__[f.attname] for f in self._meta.concrete_fields if f.attname in self.__dict__
+        }
+
+    def delete(self, *args, **kwargs):
+        self._load_tracked()
+        return super().delete(*args, **kwargs)
 
     def __str__(self) -> str:
         return '{iteration} / {task} / {worker} / {status}'.format(
@@ -183,3 +235,181 @@ class Report(CreatedUpdatedModel, CommentModel):
     def anchor_url(self) -> str:
         url = reverse('iteration', kwargs={'pk': self.iteration_id})
         return f'{url}#worker_{self.worker_id}'
+
+
+class IterationStats(models.Model):
+    """
+    Reports counters by statuses and delegation levels.
+    Row without worker contains totals of the iteration.
+    """
+    iteration = models.ForeignKey(
+        Iteration, verbose_name=_('iteration'),
+        on_delete=models.CASCADE, related_name='stats',
+    )
+    worker = models.ForeignKey(Worker, verbose_name=_('worker'), on_delete=models.CASCADE, null=True, blank=True)
+    # statuses
+    planned = models.IntegerField(_('planned'), default=0)
+    in_progress = models.IntegerField(_('in progress'), default=0)
+    done = models.IntegerField(_('done'), default=0)
+    # delegation levels
+    tell = models.IntegerField(_('tell'), default=0)
+    sell = models.IntegerField(_('sell'), default=0)
+    consult = models.IntegerField(_('consult'), default=0)
+    agree = models.IntegerField(_('agree'), default=0)
+    advise = models.IntegerField(_('advise'), default=0)
+    inquire = models.IntegerField(_('inquire'), default=0)
+    delegate = models.IntegerField(_('delegate'), default=0)
+
+    class Meta:
+        verbose_name_plural = _('iteration stats')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['iteration', 'worker'],
+                condition=models.Q(worker__isnull=False),
+                name='iteration_worker_stats_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['iteration'],
+                condition=models.Q(worker__isnull=True),
+                name='iteration_stats_unique',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return '{iteration} / {worker}'.format(iteration=self.iteration, worker=self.worker or '-')
+
+    @property
+    def total(self) -> int:
+        return self.planned + self.in_progress + self.done
+
+
+# ----------- archive -----------
+
+class ArchivedIteration(models.Model):
+    """Old iteration moved from the hot tables, it keeps the original ID and timestamps"""
+    id = models.IntegerField(primary_key=True)
+    start = models.DateField(_('start'))
+    stop = models.DateField(_('stop'))
+    comment = models.TextField(_('comment'), default='', blank=True)
+    created = models.DateTimeField(_('created'))
+    updated = models.DateTimeField(_('updated'))
+    archived = models.DateTimeField(_('archived'), auto_now_add=True)
+
+    is_archived = True
+
+    class Meta:
+        ordering = ('-start',)
+        indexes = [models.Index(fields=['start', 'stop'], name='archived_start_stop_index')]
+
+    __str__ = Iteration.__str__
+
+
+class ArchivedReport(models.Model):
+    """Report of the archived iteration, it keeps the original ID and timestamps"""
+    id = models.IntegerField(primary_key=True)
+    iteration = models.ForeignKey(
+        ArchivedIteration, verbose_name=_('iteration'),
+        on_delete=models.CASCADE, related_name='reports',
+    )
+    worker = models.ForeignKey(Worker, verbose_name=_('worker'), on_delete=models.CASCADE)
+    task = models.ForeignKey(Task, verbose_name=_('task'), on_delete=models.CASCADE)
+    status = models.CharField(_('status'), max_length=32, choices=Report.STATUS_CHOICES)
+    delegation = models.CharField(_('delegation'), max_length=32, choices=Report.DELEGATION_CHOICES)
+    comment = models.TextField(_('comment'), default='', blank=True)
+    created = models.DateTimeField(_('created'))
+    updated = models.DateTimeField(_('updated'))
+
+    class Meta:
+        ordering = ('iteration', 'worker', 'status')
+
+    def __str__(self) -> str:
+        return '{iteration} / {task} / {worker} / {status}'.format(
+            iteration=self.iteration,
+            task=self.task,
+            worker=self.worker,
+            status=self.status,
+        )
+
+
+# ----------- export jobs -----------
+
+class ExportJob(CreatedUpdatedModel):
+    """Export of iterations in the date range by export_worker command, the result is a gzip file"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    )
+    ACTIVE = (PENDING, RUNNING)
+    FORMAT_CHOICES = (
+        ('text', _('Text')),
+        ('csv', 'CSV'),
+        ('json', 'JSON'),
+        ('ndjson', 'NDJSON'),
+    )
+
+    date_from = models.DateField(_('from'))
+    date_to = models.DateField(_('to'))
+    format = models.CharField(_('format'), max_length=16, choices=FORMAT_CHOICES, default='text')
+    planned = models.BooleanField(_('planned'), default=False)
+    status = models.CharField(_('status'), max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField(_('file'), upload_to='exports/', blank=True)
+    iterations = models.IntegerField(_('iterations'), default=0)
+    reports = models.IntegerField(_('reports'), default=0)
+    error = models.TextField(_('error'), default='', blank=True)
+    started = models.DateTimeField(_('started'), null=True, blank=True)
+    finished = models.DateTimeField(_('finished'), null=True, blank=True)
+
+    class Meta:
+        ordering = ('-id',)
+        constraints = [
+            # identical jobs are not queued twice
+            models.UniqueConstraint(
+                fields=['date_from', 'date_to', 'format', 'planned'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='export_job_active_unique',
+            ),
+        ]
+        indexes = [
+            # queue of the worker
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='export_job_pending_index'),
+        ]
+
+    def __str__(self) -> str:
+        return '{date_from} / {date_to} / {format}{planned}'.format(
+            date_from=self.date_from.strftime('%Y-%m-%d'),
+            date_to=self.date_to.strftime('%Y-%m-%d'),
+            format=self.format,
+            planned=' / planned' if self.planned else '',
+        )
+
+    @property
+    def filename(self) -> str:
+        extension = 'txt' if self.format == 'text' else self.format
+        return 'export_{}_{}{}.{}.gz'.format(
+            self.date_from.strftime('%Y%m%d'),
+            self.date_to.strftime('%Y%m%d'),
+            '_planned' if self.planned else '',
+            extension,
+        )
+
+
+# ----------- live events -----------
+
+class EventMessage(models.Model):
+    """Published event of team.events.DatabaseBroker, messages are kept for a short time"""
+    channel = models.CharField(_('channel'), max_length=255)
+    name = models.CharField(_('name'), max_length=64)
+    data = models.JSONField(_('data'), default=dict)
+    created = models.DateTimeField(_('created'), db_index=True)
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self) -> str:
+        return f'{self.channel} / {self.name}'
@@ -0,0 +1,233 @@
+"""
+Keyset (cursor) pagination.
+
+A cursor contains sort key values of the last (next page) or the first (previous page) object,
+so a page is selected by an index range instead of OFFSET and every page has the same cost.
+Total count is optional and estimated by database statistics without COUNT(*).
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connection, models
+from django.utils.functional import cached_property
+
+from team.models import ArchivedIteration, Iteration
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class CursorPage:
+    object_list: list = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+
+def encode_cursor(values: Sequence[Any], backward: bool = False) -> str:
+    data = json.dumps([list(values), backward], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, types: Sequence[Callable[[Any], Any]]) -> tuple[tuple, bool]:
+    """Sort key values converted by types and a flag of the previous page"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values, backward = json.loads(data)
+        if len(values) != len(types):
+            raise InvalidCursor('invalid cursor')
+        return tuple(t(v) for t, v in zip(types, values)), bool(backward)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise InvalidCursor('invalid cursor') from e
+
+
+def make_page(
+        items: list,
+        per_page: int,
+        key: Callable[[Any], Sequence[Any]],
+        backward: bool = False,
+        has_cursor: bool = False,
+) -> CursorPage:
+    """
+    Page from items which are selected in the page direction order with limit per_page + 1,
+    the extra item shows that there are more items in this direction.
+    """
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backward:
+        items.reverse()
+        has_next, has_previous = has_cursor, has_more
+    else:
+        has_next, has_previous = has_more, has_cursor
+    page = CursorPage(items)
+    if items and has_next:
+        page.next_cursor = encode_cursor(key(items[-1]))
+    if items and has_previous:
+        page.previous_cursor = encode_cursor(key(items[0]), backward=True)
+    return page
+
+
+def estimate_count(model: type[models.Model]) -> Optional[int]:
+    """Approximate number of table rows from statistics collected by ANALYZE, None if there are no statistics"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator which takes the size of an unfiltered queryset from database statistics.
+    The estimate is only a displayed total: page bounds come from the rows found and raise the count.
+    """
+
+    @cached_property
+    def estimate(self) -> Optional[int]:
+        """Statistics of the unfiltered queryset if it is larger than a page, smaller ones are counted exactly"""
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimated = estimate_count(self.object_list.model)
+            if estimated is not None and estimated > self.per_page:
+                return estimated
+        return None
+
+    @cached_property
+    def count(self) -> int:
+        if self.estimate is not None:
+            return self.estimate
+        return super().count
+
+    def validate_number(self, number) -> int:
+        if self.estimate is None:
+            return super().validate_number(number)
+        # pages after the estimated ones can exist, page() checks them
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number) -> Page:
+        if self.estimate is None:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # the extra row shows that there are more rows than the estimate
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not items and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        if bottom + len(items) > self.count:
+            self.__dict__['count'] = bottom + len(items)
+            self.__dict__.pop('num_pages', None)
+            self.__dict__.pop('page_range', None)
+        return self._get_page(items[:self.per_page], number, self)
+
+
+class IterationPaginator:
+    """
+    Iterations pages in descending (start, id) order, archived iterations are merged if their queryset is given.
+    Both sources are selected by the same cursor, IDs are unique because archived iterations keep them.
+    """
+
+    def __init__(
+            self,
+            queryset: models.QuerySet[Iteration],
+            per_page: int,
+            estimate: bool = False,
+            archived: Optional[models.QuerySet[ArchivedIteration]] = None,
+    ) -> None:
+        self.queryset = queryset
+        self.per_page = per_page
+        self.estimate = estimate
+        self.archived = archived
+
+    @staticmethod
+    def key(iteration: Iteration | ArchivedIteration) -> tuple[str, int]:
+        return iteration.start.isoformat(), iteration.pk
+
+    def _select(self, queryset: models.QuerySet, cursor: Optional[str]) -> tuple[models.QuerySet, bool]:
+        if not cursor:
+            return queryset.order_by('-start', '-id')[:self.per_page + 1], False
+        (start, pk), backward = decode_cursor(cursor, (date.fromisoformat, int))
+        if backward:
+            queryset = queryset.filter(
+                models.Q(start__gt=start) | models.Q(start=start, id__gt=pk),
+            ).order_by('start', 'id')
+        else:
+            queryset = queryset.filter(
+                models.Q(start__lt=start) | models.Q(start=start, id__lt=pk),
+            ).order_by('-start', '-id')
+        return queryset[:self.per_page + 1], backward
+
+    def _selection(self, cursor: Optional[str]) -> tuple[list[models.QuerySet], bool]:
+        queryset, backward = self._select(self.queryset, cursor)
+        if self.archived is None:
+            return [queryset], backward
+        return [queryset, self._select(self.archived, cursor)[0]], backward
+
+    def _page(self, items: list, backward: bool, cursor: Optional[str]) -> CursorPage:
+        if self.archived is not None:
+            # the first per_page + 1 items of both sources in the page direction
+            items = sorted(items, key=self.key, reverse=not backward)[:self.per_page + 1]
+        return make_page(items, self.per_page, self.key, backward, bool(cursor))
+
+    def estimated_total(self) -> Optional[int]:
+        counts = [estimate_count(Iteration)]
+        if self.archived is not None:
+            counts.append(estimate_count(ArchivedIteration))
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+
+    def page(self, cursor: Optional[str] = None) -> CursorPage:
+        querysets, backward = self._selection(cursor)
+        page = self._page([item for queryset in querysets for item in queryset], backward, cursor)
+        if self.estimate:
+            page.estimated_total = self.estimated_total()
+        return page
+
+    async def apage(self, cursor: Optional[str] = None) -> CursorPage:
+        querysets, backward = self._selection(cursor)
+        page = self._page([item for queryset in querysets async for item in queryset], backward, cursor)
+        if self.estimate:
+            page.estimated_total = await sync_to_async(self.estimated_total)()
+        return page
@@ -0,0 +1,64 @@
+"""
+Creation of next iterations with not finished reports of the latest one.
+Reports are copied by one INSERT ... SELECT statement, they are not loaded into Python.
+"""
+from datetime import date
+from typing import Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from team.models import Iteration, iteration_dates, Report
+from team.signals import reports_bulk_changed
+
+DEFAULT_DELEGATION = Report._meta.get_field('delegation').default
+
+
+def missed_weeks(iteration: Iteration, today: Optional[date] = None) -> int:
+    """Number of weekly iterations after the iteration up to the current one, at least one"""
+    today = today or timezone.localdate()
+    return max((today - iteration.start).days // 7, 1)
+
+
+def _copy_reports(base_iteration: Iteration, iteration_ids: list[int]) -> int:
+    """Copies planned and in-progress reports of the base iteration to every iteration as planned ones"""
+    qn = connection.ops.quote_name
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    report_table, iteration_table = qn(Report._meta.db_table), qn(Iteration._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(iteration_ids))
+    sql = (
+        f'INSERT INTO {report_table} (iteration_id, worker_id, task_id, status, delegation, comment, created, updated) '
+        "SELECT i.id, r.worker_id, r.task_id, %s, %s, '', %s, %s "
+        f'FROM {report_table} r CROSS JOIN {iteration_table} i '
+        f'WHERE r.iteration_id = %s AND r.status IN (%s, %s) AND i.id IN ({placeholders})'
+    )
+    params = [
+        Report.PLANNED, DEFAULT_DELEGATION, now, now,
+        base_iteration.pk, Report.PLANNED, Report.IN_PROGRESS, *iteration_ids,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def rollover(base_iteration: Iteration, weeks: int = 1) -> tuple[list[Iteration], int]:
+    """
+    Creates next weekly iterations after the base one, every iteration gets
+    planned and in-progress reports of the base iteration as planned ones.
+    It returns created iterations and a number of created reports.
+    """
+    with transaction.atomic():
+        iterations, start = [], base_iteration.start
+        for _ in range(weeks):
+            start, stop = iteration_dates(start)
+            iterations.append(Iteration.objects.create(start=start, stop=stop))
+
+        iteration_ids = [iteration.pk for iteration in iterations]
+        count = _copy_reports(base_iteration, iteration_ids)
+        if count:
+            worker_ids = base_iteration.reports.filter(
+                status__in=(Report.PLANNED, Report.IN_PROGRESS),
+            ).values_list('worker_id', flat=True).distinct()
+            pairs = {(iteration_id, worker_id) for worker_id in worker_ids for iteration_id in iteration_ids}
+            reports_bulk_changed.send(sender=Report, pairs=pairs)
+    return iterations, count
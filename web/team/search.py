@@ -0,0 +1,230 @@
+"""
+Full-text search of iterations.
+
+SQLite FTS5 virtual table contains one row per report (task number, title and report comment)
+and one row per iteration (its comment). Row IDs are derived from objects IDs,
+so any row is updated/deleted by its primary key. Other database backends
+use a fallback by "icontains" lookups, it does not include archived iterations.
+"""
+import re
+from collections import defaultdict
+from typing import Iterable, Optional, Sequence
+
+from django.db import connection, connections, models
+from django.utils.html import escape
+from django.utils.safestring import mark_safe, SafeString
+
+from team import stats
+from team.models import ArchivedIteration, Iteration, Report
+from team.pagination import CursorPage, decode_cursor, IterationPaginator, make_page
+
+FTS_TABLE = 'team_search'
+SNIPPETS_LIMIT = 3
+SNIPPET_TOKENS = 12
+# highlight markers, they are replaced by HTML tags after escaping
+MARK_START, MARK_STOP = '\x02', '\x03'
+
+INDEX_REPORTS_SQL = (
+    f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, iteration_id, number, title, comment) '
+    'SELECT r.id * 2, r.iteration_id, t.number, t.title, r.comment '
+    'FROM team_report r INNER JOIN team_task t ON r.task_id = t.id'
+)
+INDEX_ITERATIONS_SQL = (
+    f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, iteration_id, number, title, comment) '
+    "SELECT i.id * 2 + 1, i.id, '', '', i.comment FROM team_iteration i"
+)
+# archived objects keep their IDs, so they have the same row IDs
+INDEX_ARCHIVED_REPORTS_SQL = INDEX_REPORTS_SQL.replace('team_report', 'team_archivedreport')
+INDEX_ARCHIVED_ITERATIONS_SQL = INDEX_ITERATIONS_SQL.replace('team_iteration', 'team_archivediteration')
+
+
+# aliases of databases with the FTS table, a missing table is checked again as it could be created by migrate later
+_fts_aliases: set[str] = set()
+
+
+def _fts_table_exists(alias: str) -> bool:
+    if alias not in _fts_aliases and FTS_TABLE in connections[alias].introspection.table_names():
+        _fts_aliases.add(alias)
+    return alias in _fts_aliases
+
+
+def reset_fts(alias: str) -> None:
+    """Forgets the FTS table of the database after migrations, they could remove it"""
+    _fts_aliases.discard(alias)
+
+
+def fts_enabled() -> bool:
+    return connection.vendor == 'sqlite' and _fts_table_exists(connection.alias)
+
+
+def _placeholders(values: Sequence) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+def index_reports(report_ids: Sequence[int]) -> None:
+    if report_ids and fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'{INDEX_REPORTS_SQL} WHERE r.id IN ({_placeholders(report_ids)})', report_ids)
+
+
+def index_task_reports(task_id: int) -> None:
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'{INDEX_REPORTS_SQL} WHERE r.task_id = %s', [task_id])
+
+
+def index_iteration_reports(iteration_ids: Sequence[int]) -> None:
+    if iteration_ids and fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{INDEX_REPORTS_SQL} WHERE r.iteration_id IN ({_placeholders(iteration_ids)})',
+                iteration_ids,
+            )
+
+
+def index_iteration(iteration_id: int) -> None:
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'{INDEX_ITERATIONS_SQL} WHERE i.id = %s', [iteration_id])
+
+
+def index_archived_iteration(iteration_id: int) -> None:
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'{INDEX_ARCHIVED_ITERATIONS_SQL} WHERE i.id = %s', [iteration_id])
+
+
+def unindex_report(report_id: int) -> None:
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [report_id * 2])
+
+
+def unindex_iteration(iteration_id: int) -> None:
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [iteration_id * 2 + 1])
+
+
+def rebuild() -> int:
+    """Rebuilds full search index, returns a number of indexed rows"""
+    if not fts_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        for sql in (INDEX_REPORTS_SQL, INDEX_ITERATIONS_SQL, INDEX_ARCHIVED_REPORTS_SQL, INDEX_ARCHIVED_ITERATIONS_SQL):
+            cursor.execute(sql)
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def match_query(search: str) -> str:
+    """
+    FTS5 query from user's input, every word is a phrase prefix query.
+
+    >>> match_query('XYZ-001 "test')
+    '"xyz 001"* AND "test"*'
+    >>> match_query('--')
+    ''
+    """
+    phrases = (re.findall(r'\w+', term.lower()) for term in search.split())
+    return ' AND '.join('"{}"*'.format(' '.join(tokens)) for tokens in phrases if tokens)
+
+
+def _highlight(text: str) -> str:
+    return escape(text).replace(MARK_START, '<mark>').replace(MARK_STOP, '</mark>')
+
+
+def _snippet(number: str, text: str) -> SafeString:
+    if number:
+        return mark_safe(f'{escape(number)}: {text}')
+    return mark_safe(text)
+
+
+def with_snippets(search: str, iterations: list[Iteration]) -> list[Iteration]:
+    snippets = get_snippets(search, (iteration.pk for iteration in iterations))
+    for iteration in iterations:
+        iteration.snippets = snippets.get(iteration.pk, [])
+    return iterations
+
+
+def _fallback_filter(search: str) -> models.Q:
+    return (
+        models.Q(comment__icontains=search) |
+        models.Q(task__number__icontains=search) |
+        models.Q(task__title__icontains=search) |
+        models.Q(iteration__comment__icontains=search)
+    )
+
+
+def search_page(search: str, per_page: int, cursor: Optional[str] = None) -> CursorPage:
+    """
+    Page of iterations matched by the search string, the best ones are first.
+    FTS results are paginated by (score, iteration_id) in SQL,
+    the fallback paginates matched iterations by (start, id).
+    """
+    if not fts_enabled():
+        reports = Report.objects.filter(_fallback_filter(search))
+        iterations = stats.with_totals(Iteration.objects.filter(id__in=reports.values('iteration_id')))
+        page = IterationPaginator(iterations, per_page).page(cursor)
+        with_snippets(search, page.object_list)
+        return page
+
+    query = match_query(search)
+    if not query:
+        return CursorPage()
+
+    having, order, params = '', 'score, iteration_id DESC', [query]
+    backward = False
+    if cursor:
+        (score, iteration_id), backward = decode_cursor(cursor, (float, int))
+        if backward:
+            having, order = 'HAVING score < %s OR (score = %s AND iteration_id > %s)', 'score DESC, iteration_id'
+        else:
+            having = 'HAVING score > %s OR (score = %s AND iteration_id < %s)'
+        params.extend([score, score, iteration_id])
+    sql = (
+        f'SELECT iteration_id, MIN(rank) AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        f'GROUP BY iteration_id {having} ORDER BY {order} LIMIT %s'
+    )
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, [*params, per_page + 1])
+        rows = db_cursor.fetchall()
+
+    page = make_page(rows, per_page, lambda row: (row[1], row[0]), backward, bool(cursor))
+    ids = [iteration_id for iteration_id, _ in page.object_list]
+    iterations = stats.with_totals(Iteration.objects.all()).in_bulk(ids)
+    if len(iterations) < len(ids):
+        iterations.update(ArchivedIteration.objects.in_bulk([i for i in ids if i not in iterations]))
+    page.object_list = with_snippets(search, [iterations[i] for i in ids if i in iterations])
+    stats.with_archived_totals(page.object_list)
+    return page
+
+
+def get_snippets(search: str, iteration_ids: Iterable[int]) -> dict[int, list[SafeString]]:
+    """Highlighted fragments of matched reports and comments by iterations"""
+    iteration_ids = list(iteration_ids)
+    result: dict[int, list[SafeString]] = defaultdict(list)
+    if not iteration_ids:
+        return result
+
+    if not fts_enabled():
+        reports = Report.objects.filter(_fallback_filter(search), iteration_id__in=iteration_ids).values_list(
+            'iteration_id', 'task__number', 'task__title',
+        )
+        for iteration_id, number, title in reports:
+            if len(result[iteration_id]) < SNIPPETS_LIMIT:
+                result[iteration_id].append(_snippet(number, escape(title)))
+        return result
+
+    sql = (
+        f"SELECT iteration_id, number, snippet({FTS_TABLE}, -1, %s, %s, '…', %s) "
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND iteration_id IN ({_placeholders(iteration_ids)}) '
+        'ORDER BY rank'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [MARK_START, MARK_STOP, SNIPPET_TOKENS, match_query(search), *iteration_ids])
+        for iteration_id, number, text in cursor.fetchall():
+            if len(result[iteration_id]) < SNIPPETS_LIMIT:
+                result[iteration_id].append(_snippet(number, _highlight(text)))
+    return result
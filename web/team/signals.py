@@ -0,0 +1,91 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver, Signal
+
+from team import cache, events, latest, search, stats, trackers
+from team.models import Iteration, Report, Task, Tracker, Worker
+
+# sent by code paths which change reports without model signals (bulk_create, update),
+# "pairs" argument is a set of affected (iteration_id, worker_id)
+reports_bulk_changed = Signal()
+
+
+def report_pairs(report: Report) -> set[tuple[int, int]]:
+    """Current and initially loaded (iteration_id, worker_id) of the report"""
+    pairs = {(report.iteration_id, report.worker_id)}
+    loaded = getattr(report, '_loaded_values', None)
+    if loaded:
+        pairs.add((loaded['iteration_id'], loaded['worker_id']))
+    return pairs
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def report_changed(sender, instance: Report, **kwargs) -> None:
+    cache.bump_reports(report_pairs(instance))
+
+
+@receiver(post_save, sender=Report)
+def report_saved(sender, instance: Report, created: bool, **kwargs) -> None:
+    search.index_reports([instance.pk])
+    stats.report_saved(instance, created)
+    events.reports_changed('created' if created else 'updated', report_pairs(instance), instance.pk)
+
+
+@receiver(post_delete, sender=Report)
+def report_deleted(sender, instance: Report, **kwargs) -> None:
+    search.unindex_report(instance.pk)
+    stats.report_deleted(instance)
+    events.reports_changed('deleted', report_pairs(instance), instance.pk)
+
+
+@receiver(reports_bulk_changed)
+def reports_changed(sender, pairs: set[tuple[int, int]], **kwargs) -> None:
+    cache.bump_reports(pairs)
+    iteration_ids = sorted({iteration_id for iteration_id, _ in pairs})
+    search.index_iteration_reports(iteration_ids)
+    stats.rebuild(iteration_ids)
+    events.reports_changed('changed', pairs)
+
+
+@receiver(post_save, sender=Task)
+def task_changed(sender, instance: Task, created: bool, **kwargs) -> None:
+    if not created:
+        pairs = Report.objects.filter(task=instance).values_list('iteration_id', 'worker_id')
+        cache.bump_reports(pairs)
+        search.index_task_reports(instance.pk)
+
+
+@receiver(post_save, sender=Iteration)
+def iteration_saved(sender, instance: Iteration, created: bool, **kwargs) -> None:
+    # dates are used by exports and analytics
+    cache.bump_versions([cache.version_key('iteration', instance.pk)])
+    search.index_iteration(instance.pk)
+    latest.reset()
+    if not created:
+        events.iteration_changed(instance.pk, instance.comment)
+
+
+@receiver(post_delete, sender=Iteration)
+def iteration_deleted(sender, instance: Iteration, **kwargs) -> None:
+    search.unindex_iteration(instance.pk)
+    latest.reset()
+
+
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Worker)
+@receiver(post_save, sender=Tracker)
+@receiver(post_delete, sender=Tracker)
+def sections_changed(sender, **kwargs) -> None:
+    cache.bump_sections()
+
+
+@receiver(post_save, sender=Tracker)
+@receiver(post_delete, sender=Tracker)
+def tracker_changed(sender, **kwargs) -> None:
+    trackers.reset_index()
+
+
+@receiver(post_migrate, sender=apps.get_app_config('team'))
+def migrated(sender, using: str, **kwargs) -> None:
+    search.reset_fts(using)
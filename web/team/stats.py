@@ -0,0 +1,103 @@
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.db import models
+
+from team.models import ArchivedIteration, ArchivedReport, Iteration, IterationStats, Report
+
+COUNTERS = [status for status, _ in Report.STATUS_CHOICES] + [d for d, _ in Report.DELEGATION_CHOICES]
+
+
+def _apply(iteration_id: int, worker_id: int, status: str, delegation: str, delta: int) -> None:
+    """Changes iteration and iteration×worker counters of one report"""
+    for stats_worker_id in (worker_id, None):
+        updated = IterationStats.objects.filter(iteration_id=iteration_id, worker_id=stats_worker_id).update(**{
+            status: models.F(status) + delta,
+            delegation: models.F(delegation) + delta,
+        })
+        # a missing row is not created by a decrement: its worker or iteration is being deleted by cascade
+        if not updated and delta > 0:
+            IterationStats.objects.create(
+                iteration_id=iteration_id,
+                worker_id=stats_worker_id,
+                **{status: delta, delegation: delta},
+            )
+
+
+def _values(values: dict) -> tuple[int, int, str, str]:
+    return values['iteration_id'], values['worker_id'], values['status'], values['delegation']
+
+
+def report_saved(report: Report, created: bool) -> None:
+    new = _values(report.__dict__)
+    loaded = getattr(report, '_loaded_values', None)
+    old = None if created or not loaded else _values(loaded)
+    if old == new:
+        return
+    if old is not None:
+        _apply(*old, delta=-1)
+    _apply(*new, delta=1)
+
+
+def report_deleted(report: Report) -> None:
+    loaded = getattr(report, '_loaded_values', None)
+    _apply(*_values(loaded or report.__dict__), delta=-1)
+
+
+def rebuild(iteration_ids: Optional[Iterable[int]] = None) -> int:
+    """Recalculates counters of iterations (all by default), returns a number of stats rows"""
+    stats_queryset = IterationStats.objects.all()
+    reports = Report.objects.all()
+    if iteration_ids is not None:
+        iteration_ids = list(iteration_ids)
+        stats_queryset = stats_queryset.filter(iteration_id__in=iteration_ids)
+        reports = reports.filter(iteration_id__in=iteration_ids)
+
+    counters: dict[tuple[int, Optional[int]], dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    groups = reports.values_list('iteration_id', 'worker_id', 'status', 'delegation').annotate(
+        count=models.Count('id'),
+    ).order_by()
+    for iteration_id, worker_id, status, delegation, count in groups:
+        for key in ((iteration_id, worker_id), (iteration_id, None)):
+            counters[key][status] += count
+            counters[key][delegation] += count
+
+    stats_queryset.delete()
+    items = IterationStats.objects.bulk_create([
+        IterationStats(iteration_id=iteration_id, worker_id=worker_id, **values)
+        for (iteration_id, worker_id), values in counters.items()
+    ], batch_size=500)
+    return len(items)
+
+
+def with_totals(queryset: models.QuerySet[Iteration]) -> models.QuerySet[Iteration]:
+    """Iterations with prefetched "totals" list, it contains one iteration stats object or nothing"""
+    return queryset.prefetch_related(
+        models.Prefetch('stats', queryset=IterationStats.objects.filter(worker=None), to_attr='totals'),
+    )
+
+
+def with_archived_totals(iterations: list[Iteration | ArchivedIteration]) -> list[Iteration | ArchivedIteration]:
+    """Sets "totals" of archived iterations like with_totals(), they have no stats and are counted by reports"""
+    archived = [iteration for iteration in iterations if iteration.is_archived]
+    if not archived:
+        return iterations
+    counters: dict[int, dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    groups = ArchivedReport.objects.filter(iteration__in=archived).values_list(
+        'iteration_id', 'status', 'delegation',
+    ).annotate(count=models.Count('id')).order_by()
+    for iteration_id, status, delegation, count in groups:
+        counters[iteration_id][status] += count
+        counters[iteration_id][delegation] += count
+    for iteration in archived:
+        iteration.totals = [counters[iteration.pk]] if iteration.pk in counters else []
+    return iterations
+
+
+def worker_totals(iteration: Iteration) -> models.QuerySet[IterationStats]:
+    """Counters of workers which have reports in the iteration, in worker sections order"""
+    return IterationStats.objects.filter(
+        models.Q(planned__gt=0) | models.Q(in_progress__gt=0) | models.Q(done__gt=0),
+        iteration=iteration,
+        worker__isnull=False,
+    ).select_related('worker').order_by('worker')
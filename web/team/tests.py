@@ -1,18 +1,56 @@
+import asyncio
+import csv
+import gc
+import gzip
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
 from datetime import timedelta
+from importlib.util import find_spec
+from io import StringIO
+from unittest import mock, skipUnless
 
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps
 from django.conf import settings
+from django.contrib.auth.models import User
 from django.contrib.flatpages.models import FlatPage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.core.paginator import EmptyPage
 from django.contrib.sites.models import Site
-from django.test import TestCase
+from django.db import connection
+from django.db.models.signals import post_migrate
+from django.http import HttpResponse
+from django.test import override_settings, TestCase, TransactionTestCase
+from django.template.loader import get_template
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from team.models import Iteration, Report, Task, Tracker, Worker
+from team import analytics, archive, cache as team_cache, importer, latest, pagination, rollover, timing, trackers
+from team import db as team_db, events as team_events, jobs as team_jobs, search as team_search, stats as team_stats
+from team.admin import ReportAdmin
+from team.filecache import FileBasedCache
+from team.forms import ReportForm
+from team.middleware import SettingsMiddleware, TimingMiddleware
+from team.generator import generate
+from team.models import (
+    ArchivedIteration, EventMessage, ExportJob, Iteration, IterationStats, Report, Task, Tracker, Worker,
+)
+from team.views import CSRF_PLACEHOLDER, Export, IterationDetailView, IterationListView
+from web.urls import get_urlconf
 
 
 class TeamBaseTestCase(TestCase):
 
     def setUp(self) -> None:
         super().setUp()
+        cache.clear()
         tracker = Tracker.objects.create(
             name='Jira',
             url='https://jira.test.com/browse/',
@@ -41,6 +79,8 @@ class TeamBaseTestCase(TestCase):
             Report(iteration=self.iteration, worker=self.workers[1], task=self.tasks[4], status=Report.IN_PROGRESS),
             Report(iteration=self.iteration, worker=self.workers[1], task=self.tasks[5], status=Report.DONE),
         ])
+        team_search.rebuild()
+        team_stats.rebuild()
 
 
 class ReportTestCase(TeamBaseTestCase):
@@ -105,6 +145,145 @@ class ReportTestCase(TeamBaseTestCase):
         self.assertEqual(r.delegation, delegation)
 
 
+class BatchUpdateTestCase(TeamBaseTestCase):
+
+    def _post(self, data) -> dict:
+        resp = self.client.post(reverse('reports_batch_update'), data=data, content_type='application/json')
+        return resp.json()
+
+    def test_update(self):
+        planned = Report.objects.get(task=self.tasks[0])
+        in_progress = Report.objects.get(task=self.tasks[1])
+        items = [
+            {'id': planned.pk, 'status': Report.DONE, 'worker': self.workers[1].pk},
+            {'id': in_progress.pk, 'status': 'unknown'},
+            {'id': 0, 'status': Report.DONE},
+            {'id': planned.pk, 'comment': 'twice'},
+            'invalid',
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            data = self._post({'reports': items})
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "team_report"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(data['updated'], 1)
+        results = data['results']
+        self.assertEqual([r['id'] for r in results], [planned.pk, in_progress.pk, 0, planned.pk, None])
+        self.assertEqual([r['ok'] for r in results], [True, False, False, False, False])
+        self.assertIn('status', results[1]['errors'])
+        self.assertIn('id', results[2]['errors'])
+
+        planned.refresh_from_db()
+        self.assertEqual((planned.status, planned.worker, planned.comment), (Report.DONE, self.workers[1], ''))
+        in_progress.refresh_from_db()
+        self.assertEqual(in_progress.status, Report.IN_PROGRESS)
+
+        stats = IterationStats.objects.get(iteration=self.iteration, worker=None)
+        self.assertEqual((stats.planned, stats.in_progress, stats.done), (1, 2, 3))
+        stats = IterationStats.objects.get(iteration=self.iteration, worker=self.workers[0])
+        self.assertEqual((stats.planned, stats.in_progress, stats.done), (0, 1, 1))
+
+    def test_invalid(self):
+        url = reverse('reports_batch_update')
+        self.assertEqual(self.client.get(url).status_code, 405)
+        resp = self.client.post(url, data='{', content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post(url, data={'reports': 1}, content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        with override_settings(BATCH_UPDATE_LIMIT=1):
+            resp = self.client.post(url, data=[{'id': 1}, {'id': 2}], content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+
+
+class TrackerIndexTestCase(TeamBaseTestCase):
+
+    def test_resolve(self):
+        jira = Tracker.objects.get(name='Jira')
+        self.assertEqual(trackers.resolve('https://jira.test.com/browse/XYZ-100'), (jira, 'XYZ-100'))
+        self.assertIsNone(trackers.resolve('https://github.com/test/XYZ-100'))
+        self.assertIsNone(trackers.resolve('XYZ-100'))
+
+        # overlapped URLs, the longest tracker URL wins and the rest of the path is kept in the number
+        other = Tracker.objects.create(name='Jira Other', url='https://jira.test.com/browse/other/')
+        self.assertEqual(trackers.resolve('https://jira.test.com/browse/other/XYZ-100'), (other, 'XYZ-100'))
+        self.assertEqual(trackers.resolve('https://jira.test.com/browse/XYZ-100'), (jira, 'XYZ-100'))
+        self.assertEqual(trackers.resolve('https://jira.test.com/browse/another/XYZ-100'), (jira, 'another/XYZ-100'))
+
+        other.delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(trackers.resolve('https://jira.test.com/browse/other/XYZ-100'), (jira, 'other/XYZ-100'))
+        with self.assertNumQueries(0):
+            self.assertEqual(trackers.resolve('https://jira.test.com/browse/XYZ-100'), (jira, 'XYZ-100'))
+            self.assertIsNone(trackers.resolve('https://jira.test.com/XYZ-100'))
+        task = Task(tracker=jira, number='other/XYZ-100')
+        self.assertEqual(task.url, 'https://jira.test.com/browse/other/XYZ-100')
+
+
+class ImportTestCase(TeamBaseTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.iteration = Iteration.objects.create(
+            start=self.iteration.stop + timedelta(days=1),
+            stop=self.iteration.stop + timedelta(days=7),
+        )
+        self.rows = [
+            {'worker': 'John', 'url': 'https://jira.test.com/browse/XYZ-001', 'status': Report.IN_PROGRESS},
+            {'worker': 'Mike', 'url': 'https://jira.test.com/browse/XYZ-100', 'title': 'New task', 'comment': 'new'},
+            {'worker': 'Mike', 'url': 'https://jira.test.com/browse/XYZ-001'},
+            {'worker': 'Unknown', 'url': 'https://jira.test.com/browse/XYZ-002'},
+            {'worker': 'John', 'url': 'https://github.com/XYZ-003'},
+            {'worker': 'John', 'url': 'https://jira.test.com/browse/XYZ-101'},
+            {'worker': 'John', 'url': 'https://jira.test.com/browse/XYZ-004', 'status': 'unknown'},
+        ]
+
+    def test_import(self):
+        result = importer.import_reports(self.iteration, self.rows)
+        self.assertEqual(len(result.created), 2)
+        self.assertEqual([number for number, _ in result.errors], [3, 4, 5, 6, 7])
+
+        reports = {r.task.number: r for r in self.iteration.reports.select_related('task', 'worker')}
+        self.assertEqual(set(reports), {'XYZ-001', 'XYZ-100'})
+        self.assertEqual(reports['XYZ-001'].status, Report.IN_PROGRESS)
+        self.assertEqual(reports['XYZ-100'].task.title, 'New task')
+        self.assertEqual(reports['XYZ-100'].worker.name, 'Mike')
+        self.assertEqual(reports['XYZ-100'].comment, 'new')
+
+    def test_import_view(self):
+        content = StringIO()
+        writer = csv.DictWriter(content, fieldnames=importer.FIELDS)
+        writer.writeheader()
+        writer.writerows(self.rows)
+        upload = SimpleUploadedFile('reports.csv', content.getvalue().encode(), content_type='text/csv')
+
+        url = '/iterations/{}/import/'.format(self.iteration.id)
+        resp = self.client.post(url, data={'file': upload})
+        self.assertRedirects(resp, '/iterations/{}/'.format(self.iteration.id), fetch_redirect_response=False)
+        self.assertEqual(self.iteration.reports.count(), 2)
+
+        upload = SimpleUploadedFile('reports.json', json.dumps(self.rows).encode(), content_type='application/json')
+        self.client.post(url, data={'file': upload})
+        self.assertEqual(self.iteration.reports.count(), 2)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            json.dump(self.rows, f)
+            f.flush()
+            out, err = StringIO(), StringIO()
+            call_command('import_reports', self.iteration.id, f.name, stdout=out, stderr=err)
+        self.assertIn('Imported 2 reports, 5 errors', out.getvalue())
+        self.assertIn('row 3:', err.getvalue())
+
+        for suffix, content in (('.json', b'{"worker": "John"}'), ('.json', b'[1'), ('.csv', b'\xff\xfe\x00')):
+            with tempfile.NamedTemporaryFile('wb', suffix=suffix) as f:
+                f.write(content)
+                f.flush()
+                with self.subTest(content=content), self.assertRaisesMessage(CommandError, 'can not be imported'):
+                    call_command('import_reports', self.iteration.id, f.name)
+        with self.assertRaisesMessage(CommandError, 'can not read'):
+            call_command('import_reports', self.iteration.id, '/nonexistent/reports.csv')
+
+
 class IterationTestCase(TeamBaseTestCase):
 
     def test_index(self):
@@ -137,6 +316,34 @@ class IterationTestCase(TeamBaseTestCase):
         self.assertEqual(report_ids, {task_id for task_id, _ in migrated_reports})
         self.assertTrue(all(status == Report.PLANNED for _, status in migrated_reports))
 
+    def test_create_weeks(self):
+        url = reverse('iteration_create', kwargs={'pk': self.iteration.pk})
+        resp = self.client.post(url, {'weeks': 100})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(Iteration.objects.count(), 1)
+
+        resp = self.client.post(url, {'weeks': 3}, follow=True)
+        self.assertContains(resp, '3 iterations were created with 12 new reports')
+        iterations = list(Iteration.objects.order_by('start'))[1:]
+        self.assertEqual([i.start for i in iterations], [
+            self.iteration.start + timedelta(days=7 * week) for week in range(1, 4)
+        ])
+        for iteration in iterations:
+            self.assertEqual(iteration.reports.filter(status=Report.PLANNED).count(), 4)
+            self.assertEqual(IterationStats.objects.get(iteration=iteration, worker=None).planned, 4)
+
+    def test_create_queries(self):
+        tracker = Tracker.objects.first()
+        tasks = Task.objects.bulk_create([Task(tracker=tracker, number=f'ABC-{i:03}') for i in range(100)])
+        Report.objects.bulk_create([
+            Report(iteration=self.iteration, worker=self.workers[i % 2], task=task) for i, task in enumerate(tasks)
+        ])
+        with CaptureQueriesContext(connection) as ctx:
+            iterations, count = rollover.rollover(self.iteration)
+        self.assertEqual(count, 104)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "team_report"')]), 1)
+        self.assertEqual(rollover.missed_weeks(iterations[0], iterations[0].start + timedelta(days=20)), 2)
+
     def test_failed_create(self):
         url = '/iterations/{}/create/'.format(self.iteration.id)
         self.assertEqual(Iteration.objects.count(), 1)
@@ -167,7 +374,7 @@ class IterationTestCase(TeamBaseTestCase):
 
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, 200)
-        content = resp.content.decode()
+        content = resp.getvalue().decode()
 
         for r in self.iteration.reports.select_related('worker', 'task__tracker'):
             check_method = self.assertNotIn if r.worker.no_export else self.assertIn
@@ -183,6 +390,38 @@ class IterationTestCase(TeamBaseTestCase):
         url = '/iterations/{}/export/planned/'.format(self.iteration.id)
         self._export(url)
 
+    def test_export_stream(self):
+        report = self.iteration.reports.first()
+        report.comment = 'comment with <tags> & "quotes"'
+        report.save()
+        for planned in (False, True):
+            exporter = Export(self.iteration, planned=planned)
+            self.assertEqual(''.join(exporter.stream()), exporter.render())
+
+    def test_export_conditional(self):
+        url = '/iterations/{}/export/'.format(self.iteration.id)
+        resp = self.client.get(url)
+        etag = resp['ETag']
+        self.assertTrue(resp.has_header('Last-Modified'))
+        content = resp.getvalue()
+
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, 304)
+
+        # the latest iteration is taken from its pointer, content is taken from the cache
+        with self.assertNumQueries(0):
+            resp = self.client.get(url)
+        self.assertEqual(resp.getvalue(), content)
+
+        report = self.iteration.reports.first()
+        report.comment = 'new export comment'
+        report.save()
+        resp = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+        self.assertIn('new export comment', resp.getvalue().decode())
+
     def test_no_export_workers(self):
         no_export_worker = Worker.objects.get(name='John')
         no_export_worker.no_export = True
@@ -194,6 +433,1199 @@ class IterationTestCase(TeamBaseTestCase):
         self._export(url)
 
 
+class QueriesTestCase(TeamBaseTestCase):
+
+    def _count_queries(self, url: str) -> int:
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def _add_reports(self) -> None:
+        tracker = Tracker.objects.first()
+        tasks = Task.objects.bulk_create([
+            Task(tracker=tracker, number=f'ABC-{i:03}', title=f'Extra task #{i}') for i in range(30)
+        ])
+        Report.objects.bulk_create([
+            Report(iteration=self.iteration, worker=self.workers[i % 2], task=task) for i, task in enumerate(tasks)
+        ])
+
+    @override_settings(LAZY_WORKER_SECTIONS=False)
+    def test_iteration_queries(self):
+        url = '/iterations/{}/'.format(self.iteration.id)
+        num_queries = self._count_queries(url)
+        self._add_reports()
+        self.assertEqual(self._count_queries(url), num_queries)
+
+    def test_worker_section_queries(self):
+        url = reverse('worker_section', kwargs={'pk': self.iteration.pk, 'worker_id': self.workers[0].pk})
+        num_queries = self._count_queries(url)
+        self._add_reports()
+        self.assertEqual(self._count_queries(url), num_queries)
+
+
+class TimingMiddlewareTestCase(TeamBaseTestCase):
+
+    def test_server_timing(self):
+        resp = self.client.get(reverse('iteration', kwargs={'pk': self.iteration.pk}))
+        self.assertEqual(resp.status_code, 200)
+        metrics = {item.split(';')[0].strip(): item for item in resp['Server-Timing'].split(',')}
+        self.assertEqual(set(metrics), {'total', 'db', 'tpl', 'app'})
+        self.assertRegex(metrics['db'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertNotIn('tpl;dur=0.0', metrics['tpl'])
+
+    @override_settings(ROOT_URLCONF=get_urlconf(is_async=True))
+    async def test_async(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        for middleware_class in (SettingsMiddleware, TimingMiddleware):
+            self.assertTrue(iscoroutinefunction(middleware_class(get_response)))
+            self.assertFalse(iscoroutinefunction(middleware_class(lambda request: HttpResponse())))
+
+        resp = await self.async_client.get(reverse('iteration', kwargs={'pk': self.iteration.pk}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('meta_description', resp.context['request'].settings_params)
+        self.assertIn('tpl;dur=', resp['Server-Timing'])
+        # queries of the async ORM are run by connections of other threads
+        self.assertRegex(resp['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_slow_request_log(self):
+        with self.assertNoLogs('team.performance'):
+            self.client.get(reverse('iterations'))
+        with override_settings(SLOW_REQUEST_QUERIES=1, SLOW_REQUEST_LOGGED_QUERIES=2):
+            with self.assertLogs('team.performance', level='WARNING') as logs:
+                self.client.get(reverse('iterations'))
+        data = logs.records[0].timing
+        self.assertEqual((data['method'], data['path'], data['status']), ('GET', reverse('iterations'), 200))
+        self.assertGreaterEqual(data['queries'], 1)
+        self.assertEqual(len(data['slowest_queries']), 2)
+        self.assertTrue(all(item['sql'].startswith('SELECT') for item in data['slowest_queries']))
+
+
+class TimingThreadsTestCase(TransactionTestCase):
+    """Other threads can not read the in-memory test database during a transaction of TestCase"""
+
+    async def test_thread_queries(self):
+        def query():
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                connection.close()
+
+        with timing.collect() as t:
+            await sync_to_async(query, thread_sensitive=False)()
+        self.assertIn('SELECT 1', [item['sql'] for item in t.slowest_queries()])
+        await sync_to_async(query, thread_sensitive=False)()
+        self.assertEqual(t.queries, 1)
+
+
+class FileCacheTestCase(TestCase):
+
+    def test_cull_interval(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        file_cache = FileBasedCache(directory.name, {'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_INTERVAL': 60}})
+        with mock.patch.object(file_cache, '_list_cache_files', wraps=file_cache._list_cache_files) as listed:
+            for i in range(6):
+                file_cache.set(f'key{i}', i)
+            # the directory is listed by the first write only
+            self.assertEqual(listed.call_count, 1)
+            self.assertEqual(len(os.listdir(directory.name)), 6)
+
+            with mock.patch('time.monotonic', return_value=time.monotonic() + 61):
+                file_cache.set('key6', 6)
+            self.assertEqual(listed.call_count, 2)
+        self.assertLess(len(os.listdir(directory.name)), 7)
+
+
+@override_settings(LAZY_WORKER_SECTIONS=False)
+class FragmentCacheTestCase(TeamBaseTestCase):
+
+    def test_invalidation(self):
+        url = '/iterations/{}/'.format(self.iteration.id)
+        report = self.iteration.reports.filter(worker=self.workers[0]).first()
+        resp = self.client.get(url)
+        self.assertContains(resp, report.task.title)
+
+        report.task.title = 'Updated task title'
+        report.task.save()
+        report.comment = 'updated report comment'
+        report.save()
+        resp = self.client.get(url)
+        self.assertContains(resp, 'Updated task title')
+        self.assertContains(resp, 'updated report comment')
+
+        # other worker section is still valid in the cache
+        keys = team_cache.worker_section_keys(self.iteration.id, [self.workers[1].pk])
+        self.assertEqual(len(team_cache.get_fragments(keys.values())), 1)
+
+    def test_commit_bump(self):
+        key = team_cache.version_key('section', self.iteration.pk, self.workers[0].pk)
+        version = team_cache.get_versions([key])[key]
+        with self.captureOnCommitCallbacks(execute=True):
+            Report.objects.filter(worker=self.workers[0]).first().save()
+            in_transaction = team_cache.get_versions([key])[key]
+            self.assertGreater(in_transaction, version)
+        # other processes could cache not committed data with the first bumped version
+        self.assertGreater(team_cache.get_versions([key])[key], in_transaction)
+
+    def test_csrf_token(self):
+        url = '/iterations/{}/'.format(self.iteration.id)
+        self.client.get(url)
+        resp = self.client.get(url)
+        self.assertNotContains(resp, CSRF_PLACEHOLDER)
+        self.assertContains(resp, 'csrfmiddlewaretoken')
+
+
+class LazySectionsTestCase(TeamBaseTestCase):
+    XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+    def section_url(self, worker: Worker) -> str:
+        return reverse('worker_section', kwargs={'pk': self.iteration.pk, 'worker_id': worker.pk})
+
+    def test_page(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/iterations/{}/'.format(self.iteration.id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'team_report' in q['sql']])
+        self.assertNotContains(resp, self.tasks[0].title)
+        for worker in self.workers:
+            self.assertContains(resp, self.section_url(worker))
+
+    def test_section(self):
+        url = self.section_url(self.workers[0])
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, self.tasks[0].title)
+        self.assertNotContains(resp, self.tasks[3].title)
+        self.assertNotContains(resp, CSRF_PLACEHOLDER)
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertContains(resp, self.tasks[0].title)
+        self.assertFalse([q for q in ctx.captured_queries if 'team_report' in q['sql']])
+
+        self.assertEqual(self.client.post(url).status_code, 405)
+        resp = self.client.get(reverse('worker_section', kwargs={'pk': self.iteration.pk, 'worker_id': 0}))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_update(self):
+        report = Report.objects.filter(worker=self.workers[0], status=Report.PLANNED).first()
+        url = reverse('report_update', kwargs={'pk': report.pk})
+        data = {'comment': 'moved report', 'status': report.status, 'delegation': report.delegation}
+
+        resp = self.client.post(url, data={**data, 'worker': self.workers[1].pk}, **self.XHR)
+        self.assertEqual(resp.status_code, 200)
+        # section of the previous worker without the moved report
+        self.assertNotContains(resp, report.task.title)
+        self.assertContains(resp, self.tasks[1].title)
+        resp = self.client.get(self.section_url(self.workers[1]))
+        self.assertContains(resp, 'moved report')
+
+        resp = self.client.post(url, data={**data, 'worker': 0}, **self.XHR)
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post(url, data={**data, 'worker': self.workers[0].pk})
+        self.assertEqual(resp.status_code, 302)
+
+    def test_create_delete(self):
+        url = reverse('report_create', kwargs={'iteration_id': self.iteration.pk, 'worker_id': self.workers[0].pk})
+        data = {
+            'number': 'https://jira.test.com/browse/XYZ-007', 'title': 'Lazy task', 'comment': 'lazy',
+            'status': Report.DONE, 'delegation': Report.DELEGATION_CHOICES[0][0],
+        }
+        resp = self.client.post(url, data=data, **self.XHR)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'Lazy task')
+        resp = self.client.post(url, data={}, **self.XHR)
+        self.assertEqual(resp.status_code, 400)
+
+        report = Report.objects.get(task__title='Lazy task')
+        url = reverse('report_delete', kwargs={'pk': report.pk})
+        resp = self.client.post(url, **self.XHR)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotContains(resp, 'Lazy task')
+        self.assertContains(resp, self.tasks[0].title)
+
+
+class ExportCommandTestCase(TeamBaseTestCase):
+
+    def test_stdout(self):
+        out = StringIO()
+        call_command('export', self.iteration.id, stdout=out)
+        self.assertEqual(out.getvalue(), f'Iteration {self.iteration}\n========\n' + Export(self.iteration).render())
+
+        # several iterations are one document of a machine-readable format
+        second = Iteration.objects.create(start=self.iteration.start + timedelta(days=7))
+        Report.objects.create(iteration=second, worker=self.workers[0], task=self.tasks[0])
+        outputs = {}
+        for fmt in ('csv', 'json', 'ndjson'):
+            out = StringIO()
+            call_command('export', '--id-from', self.iteration.id, '--format', fmt, stdout=out)
+            outputs[fmt] = out.getvalue()
+        rows = list(csv.DictReader(StringIO(outputs['csv'])))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(json.loads(outputs['json']), rows)
+        self.assertEqual([json.loads(line) for line in outputs['ndjson'].splitlines()], rows)
+
+        # the latest iteration first as in the model default ordering
+        out = StringIO()
+        call_command('export', '--id-from', self.iteration.id, stdout=out)
+        self.assertEqual(out.getvalue(), ''.join(
+            f'Iteration {iteration}\n========\n' + Export(iteration).render() for iteration in (second, self.iteration)
+        ))
+
+    @skipUnless(multiprocessing.get_start_method() == 'fork', 'processes get the in-memory test database by fork')
+    def test_workers(self):
+        second = Iteration.objects.create(start=self.iteration.start + timedelta(days=7))
+        Report.objects.create(iteration=second, worker=self.workers[0], task=self.tasks[0])
+        with tempfile.TemporaryDirectory() as output:
+            out = StringIO()
+            call_command('export', '--id-from', self.iteration.id, '--output', output, '--workers', 2, stdout=out)
+            self.assertIn('Exported 2 iterations, 7 reports', out.getvalue())
+            for iteration in (self.iteration, second):
+                name = 'iteration_{:%Y%m%d}_{:%Y%m%d}.txt'.format(iteration.start, iteration.stop)
+                with open(os.path.join(output, name), encoding='utf-8') as f:
+                    self.assertEqual(f.read(), Export(iteration).render())
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as output:
+            for fmt in Export.FORMATS:
+                out = StringIO()
+                call_command(
+                    'export', '--id-from', self.iteration.id, '--format', fmt, '--output', output, stdout=out,
+                )
+                self.assertIn('Exported 1 iterations, 6 reports', out.getvalue())
+
+            name = 'iteration_{}_{}.{{}}'.format(
+                self.iteration.start.strftime('%Y%m%d'),
+                self.iteration.stop.strftime('%Y%m%d'),
+            )
+            with open(os.path.join(output, name.format('csv')), encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            with open(os.path.join(output, name.format('json')), encoding='utf-8') as f:
+                self.assertEqual(json.load(f), rows)
+            with open(os.path.join(output, name.format('ndjson')), encoding='utf-8') as f:
+                self.assertEqual([json.loads(line) for line in f], rows)
+            with open(os.path.join(output, name.format('txt')), encoding='utf-8') as f:
+                self.assertEqual(f.read(), Export(self.iteration).render())
+
+        self.assertEqual({row['number'] for row in rows}, {task.number for task in self.tasks})
+
+
+class ExportJobTestCase(TeamBaseTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.params = {'date_from': self.iteration.start, 'date_to': self.iteration.start}
+
+    def read(self, job: ExportJob) -> str:
+        with job.file.open('rb') as f:
+            return gzip.decompress(f.read()).decode()
+
+    def test_submit(self):
+        data = {**self.params, 'format': 'text', 'planned': 'on'}
+        resp = self.client.post(reverse('export_job_create'), data=data)
+        self.assertRedirects(resp, reverse('export_jobs'))
+        resp = self.client.post(reverse('export_job_create'), data=data, follow=True)
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, ExportJob.PENDING)
+        self.assertTrue(job.planned)
+        self.assertContains(resp, f'the same export #{job.pk} is already queued')
+        self.assertContains(resp, str(job))
+
+        # "planned" is ignored by machine-readable formats
+        csv_job, created = team_jobs.submit(self.params['date_from'], self.params['date_to'], 'csv', planned=True)
+        self.assertTrue(created)
+        self.assertFalse(csv_job.planned)
+        self.assertEqual(team_jobs.submit(self.params['date_from'], self.params['date_to'], 'csv'), (csv_job, False))
+
+        ExportJob.objects.filter(pk=job.pk).update(status=ExportJob.DONE)
+        new_job, created = team_jobs.submit(self.params['date_from'], self.params['date_to'], planned=True)
+        self.assertTrue(created)
+        self.assertNotEqual(new_job.pk, job.pk)
+
+        data['date_to'] = self.iteration.start - timedelta(days=1)
+        resp = self.client.post(reverse('export_job_create'), data=data, follow=True)
+        self.assertContains(resp, 'start date is after end date')
+
+    def test_worker(self):
+        archived = ArchivedIteration.objects.create(
+            id=self.iteration.pk + 1,
+            start=self.iteration.start - timedelta(days=7),
+            stop=self.iteration.stop - timedelta(days=7),
+            created=self.iteration.created, updated=self.iteration.updated,
+        )
+        text_job, _ = team_jobs.submit(archived.start, self.iteration.start, planned=True)
+        csv_job, _ = team_jobs.submit(archived.start, self.iteration.start, 'csv')
+        resp = self.client.get(reverse('export_job_download', kwargs={'pk': text_job.pk}))
+        self.assertEqual(resp.status_code, 404)
+
+        out = StringIO()
+        call_command('export_worker', '--once', stdout=out)
+        self.assertIn(f'Export job #{text_job.pk} {text_job}: 2 iterations, 6 reports', out.getvalue())
+        self.assertIn(f'Export job #{csv_job.pk} {csv_job}: 2 iterations, 6 reports', out.getvalue())
+
+        text_job.refresh_from_db()
+        self.assertEqual(text_job.status, ExportJob.DONE)
+        expected = f'Iteration {archived}\n========\n' + Export(archived, planned=True).render()
+        expected += f'Iteration {self.iteration}\n========\n' + Export(self.iteration, planned=True).render()
+        self.assertEqual(self.read(text_job), expected)
+
+        csv_job.refresh_from_db()
+        rows = list(csv.DictReader(StringIO(self.read(csv_job))))
+        self.assertEqual({row['number'] for row in rows}, {task.number for task in self.tasks})
+
+        resp = self.client.get(reverse('export_job_download', kwargs={'pk': text_job.pk}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'application/gzip')
+        self.assertIn(text_job.filename, resp['Content-Disposition'])
+        self.assertEqual(gzip.decompress(b''.join(resp.streaming_content)).decode(), expected)
+
+    def test_failed(self):
+        job, _ = team_jobs.submit(**self.params)
+        with mock.patch('team.jobs.write', side_effect=ValueError('broken export')):
+            with self.assertLogs('team.jobs', 'ERROR'):
+                team_jobs.run(team_jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.FAILED)
+        self.assertEqual(job.error, 'broken export')
+        self.assertFalse(job.file)
+
+    def test_claim(self):
+        self.assertIsNone(team_jobs.claim())
+        first, _ = team_jobs.submit(**self.params)
+        second, _ = team_jobs.submit(**self.params, fmt='json')
+        self.assertEqual(team_jobs.claim(), first)
+        self.assertEqual(team_jobs.claim(), second)
+        self.assertIsNone(team_jobs.claim())
+
+        # a long job of a running worker has a heartbeat
+        first.started = timezone.now() - timedelta(hours=2)
+        ExportJob.objects.filter(pk=first.pk).update(started=first.started)
+        team_jobs.heartbeat(first)
+        self.assertIsNone(team_jobs.claim(timeout=3600))
+
+        # the job of a stopped worker
+        ExportJob.objects.filter(pk=first.pk).update(updated=timezone.now() - timedelta(hours=2))
+        with override_settings(EXPORT_JOB_TIMEOUT=3600):
+            self.assertEqual(team_jobs.claim(), first)
+        with self.assertRaises(team_jobs.JobLost):
+            team_jobs.heartbeat(first)
+
+    def test_lost(self):
+        job, _ = team_jobs.submit(**self.params)
+        lost = team_jobs.claim()
+        ExportJob.objects.filter(pk=job.pk).update(updated=timezone.now() - timedelta(hours=2))
+        claimed = team_jobs.claim(timeout=60)
+        self.assertEqual(claimed, job)
+
+        # the lost run stops at the heartbeat, or its finished result is dropped
+        with self.assertLogs('team.jobs', 'WARNING'):
+            team_jobs.run(lost)
+        with mock.patch('team.jobs.heartbeat'), self.assertLogs('team.jobs', 'WARNING'):
+            self.assertEqual(team_jobs.run(lost).status, ExportJob.RUNNING)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.started), (ExportJob.RUNNING, claimed.started))
+        self.assertFalse(job.file)
+        self.assertFalse(os.listdir(os.path.join(settings.MEDIA_ROOT, 'exports')))
+
+        team_jobs.run(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.DONE)
+        self.assertEqual(self.read(job), f'Iteration {self.iteration}\n========\n' + Export(self.iteration).render())
+
+    def test_cleanup(self):
+        job, _ = team_jobs.submit(**self.params)
+        team_jobs.run(team_jobs.claim())
+        job.refresh_from_db()
+        path = job.file.path
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(team_jobs.cleanup(days=1), 0)
+
+        ExportJob.objects.filter(pk=job.pk).update(finished=timezone.now() - timedelta(days=2))
+        self.assertEqual(team_jobs.cleanup(days=1), 1)
+        self.assertFalse(ExportJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_worker_cleanup(self):
+        # old jobs are deleted at start of the worker and then periodically
+        for interval, calls in ((3600, 1), (0, 2)):
+            team_jobs.submit(**self.params)
+            team_jobs.submit(**self.params, fmt='csv')
+            with override_settings(EXPORT_JOBS_CLEANUP_INTERVAL=interval):
+                with mock.patch('team.jobs.cleanup', return_value=0) as cleanup:
+                    call_command('export_worker', '--max-jobs=2', stdout=StringIO())
+            self.assertEqual(cleanup.call_count, calls)
+            ExportJob.objects.all().delete()
+
+
+class GenerateDataTestCase(TeamBaseTestCase):
+
+    def test_generate(self):
+        out = StringIO()
+        call_command('generate_data', workers=3, weeks=4, reports=5, stdout=out)
+        self.assertIn('Generated 3 workers, 4 iterations', out.getvalue())
+
+        iterations = list(Iteration.objects.order_by('start'))
+        self.assertEqual(len(iterations), 5)
+        self.assertEqual(iterations[-1], self.iteration)
+        self.assertEqual(iterations[-2].start, self.iteration.start - timedelta(days=7))
+        for previous, iteration in zip(iterations[:-2], iterations[1:-1]):
+            self.assertEqual(iteration.reports.count(), 5)
+            # not done tasks are carried over
+            not_done = set(previous.reports.exclude(status=Report.DONE).values_list('task_id', flat=True))
+            self.assertTrue(not_done <= set(iteration.reports.values_list('task_id', flat=True)))
+            self.assertEqual(IterationStats.objects.get(iteration=iteration, worker=None).total, 5)
+
+
+class ArchiveTestCase(TeamBaseTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.old = Iteration.objects.create(
+            start=self.iteration.start - timedelta(weeks=10),
+            stop=self.iteration.start - timedelta(weeks=10) + timedelta(days=6),
+            comment='old iteration',
+        )
+        Report.objects.bulk_create([
+            Report(iteration=self.old, worker=self.workers[i % 2], task=task, status=Report.DONE, comment=f'old #{i}')
+            for i, task in enumerate(self.tasks)
+        ])
+        team_search.rebuild()
+        self.report_ids = set(self.old.reports.values_list('id', flat=True))
+
+    def test_archive(self):
+        out = StringIO()
+        call_command('archive_iterations', weeks=4, chunk_size=4, stdout=out)
+        self.assertIn('Archived 1 iterations, 6 reports', out.getvalue())
+        self.assertFalse(Iteration.objects.filter(pk=self.old.pk).exists())
+        self.assertFalse(Report.objects.filter(id__in=self.report_ids).exists())
+        archived = ArchivedIteration.objects.get(pk=self.old.pk)
+        self.assertEqual((archived.start, archived.created), (self.old.start, self.old.created))
+        self.assertEqual(set(archived.reports.values_list('id', flat=True)), self.report_ids)
+
+        # the latest iteration is never archived
+        call_command('archive_iterations', weeks=0, stdout=out)
+        self.assertTrue(Iteration.objects.filter(pk=self.iteration.pk).exists())
+
+    def test_export_command_and_analytics(self):
+        out = StringIO()
+        call_command('export', '--id-to', self.old.pk, stdout=out)
+        state = analytics.calculate()
+        etag, _ = team_cache.export_version(self.old.pk)
+
+        archive.archive_iteration(Iteration.objects.get(pk=self.old.pk), chunk_size=4)
+        # exports cached during archiving are invalidated
+        self.assertNotEqual(team_cache.export_version(self.old.pk)[0], etag)
+        archived_out = StringIO()
+        call_command('export', '--id-to', self.old.pk, stdout=archived_out)
+        self.assertEqual(archived_out.getvalue(), out.getvalue())
+        archived_state = analytics.calculate()
+        self.assertEqual((archived_state.tasks, archived_state.workers), (state.tasks, state.workers))
+        self.assertEqual([pk for pk, _ in archived_state.versions], [pk for pk, _ in state.versions])
+
+    def test_views(self):
+        expected_export = self.client.get(reverse('iteration_export', kwargs={'pk': self.old.pk})).getvalue()
+        archive.archive_iteration(Iteration.objects.get(pk=self.old.pk), chunk_size=5)
+        cache.clear()
+
+        resp = self.client.get(reverse('iteration', kwargs={'pk': self.old.pk}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'team/archived_iteration.html')
+        self.assertContains(resp, 'old #1')
+        self.assertNotContains(resp, '<form class="form-inline"')
+
+        resp = self.client.get(reverse('iteration_export', kwargs={'pk': self.old.pk}))
+        self.assertEqual(resp.getvalue(), expected_export)
+
+        resp = self.client.get(reverse('iteration_search'), {'search': 'old'})
+        self.assertEqual([i.pk for i in resp.context['iterations']], [self.old.pk])
+        call_command('rebuild_search_index', stdout=StringIO())
+        resp = self.client.get(reverse('iteration_search'), {'search': 'iteration'})
+        self.assertEqual([i.pk for i in resp.context['iterations']], [self.old.pk])
+
+        resp = self.client.get(reverse('iteration', kwargs={'pk': self.old.pk + 100}))
+        self.assertEqual(resp.status_code, 404)
+
+
+class SearchTestCase(TeamBaseTestCase):
+
+    def _search(self, query: str) -> list[Iteration]:
+        resp = self.client.get('/iterations/search/', {'search': query})
+        self.assertEqual(resp.status_code, 200)
+        return list(resp.context['iterations'])
+
+    def test_search(self):
+        old_iteration = Iteration.objects.create(
+            start=self.iteration.start - timedelta(days=7),
+            stop=self.iteration.start - timedelta(days=1),
+            comment='old sprint',
+        )
+        Report.objects.create(iteration=old_iteration, worker=self.workers[0], task=self.tasks[0], comment='legacy')
+        self.assertEqual(self._search('xyz-001'), [self.iteration, old_iteration])
+        self.assertEqual(self._search('sprint'), [old_iteration])
+        self.assertEqual(self._search('unknown'), [])
+
+        iterations = self._search('legacy')
+        self.assertEqual(iterations, [old_iteration])
+        self.assertEqual(iterations[0].snippets, ['XYZ-001: <mark>legacy</mark>'])
+
+    def test_index_sync(self):
+        report = self.iteration.reports.first()
+        report.comment = 'release candidate'
+        report.save()
+        self.assertEqual(self._search('candid'), [self.iteration])
+
+        report.task.title = 'Refactoring'
+        report.task.save()
+        self.assertEqual(self._search('refactor'), [self.iteration])
+
+        report.delete()
+        self.assertEqual(self._search('candidate'), [])
+        self.assertEqual(self._search('refactoring'), [])
+
+    def test_fallback(self):
+        with mock.patch('team.search.fts_enabled', return_value=False):
+            iterations = self._search('task #2')
+        self.assertEqual(iterations, [self.iteration])
+        self.assertEqual(iterations[0].snippets, ['XYZ-002: Test task #2'])
+
+    def test_fts_table_cache(self):
+        alias = connection.alias
+        team_search.reset_fts(alias)
+        with mock.patch.object(connection.introspection, 'table_names', return_value=[]):
+            self.assertFalse(team_search.fts_enabled())
+        # the table created by migrate later is found
+        self.assertTrue(team_search.fts_enabled())
+        with mock.patch.object(connection.introspection, 'table_names', return_value=[]) as table_names:
+            self.assertTrue(team_search.fts_enabled())
+            table_names.assert_not_called()
+            config = apps.get_app_config('team')
+            post_migrate.send(
+                sender=config, app_config=config, verbosity=0, interactive=False, using=alias, apps=apps, plan=[],
+            )
+            self.assertFalse(team_search.fts_enabled())
+        self.assertTrue(team_search.fts_enabled())
+
+    def test_rebuild(self):
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('rebuilt with 7 rows', out.getvalue())
+        self.assertEqual(self._search('xyz'), [self.iteration])
+
+
+@mock.patch.object(IterationListView, 'paginate_by', 3)
+class PaginationTestCase(TeamBaseTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        for i in range(1, 8):
+            iteration = Iteration.objects.create(start=self.iteration.start - timedelta(days=7 * i))
+            Report.objects.create(iteration=iteration, worker=self.workers[0], task=self.tasks[0])
+        # two iterations with the same start are ordered by id
+        Iteration.objects.create(start=self.iteration.start - timedelta(days=7))
+        self.iterations = list(Iteration.objects.order_by('-start', '-id'))
+
+    def _walk(self, url: str, params: dict, same_cost: bool = True) -> list[list[Iteration]]:
+        pages, queries = [], set()
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(url, params)
+            self.assertEqual(resp.status_code, 200)
+            queries.add(len(ctx.captured_queries))
+            page = resp.context['page_obj']
+            pages.append(list(page))
+            if not page.has_next:
+                break
+            params = {**params, 'cursor': page.next_cursor}
+            self.assertIn('cursor=', resp.content.decode())
+        # every page has the same cost
+        if same_cost:
+            self.assertEqual(len(queries), 1)
+
+        # back to the first page
+        previous = []
+        while page.has_previous:
+            resp = self.client.get(url, {**params, 'cursor': page.previous_cursor})
+            page = resp.context['page_obj']
+            previous.append(list(page))
+        self.assertEqual(previous[::-1], pages[:-1])
+        return pages
+
+    def test_iterations(self):
+        pages = self._walk(reverse('iterations'), {})
+        self.assertEqual([len(p) for p in pages], [3, 3, 3])
+        self.assertEqual(sum(pages, []), self.iterations)
+
+        resp = self.client.get(reverse('iterations'), {'cursor': 'WyJ4Il0'})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_archived(self):
+        ids = [i.pk for i in self.iterations]
+        for iteration in self.iterations[3:5]:
+            archive.archive_iteration(iteration)
+        # archived iterations are counted by their reports
+        pages = self._walk(reverse('iterations'), {}, same_cost=False)
+        self.assertEqual([i.pk for page in pages for i in page], ids)
+        archived = [i for page in pages for i in page if i.is_archived]
+        self.assertEqual([i.pk for i in archived], ids[3:5])
+        self.assertEqual([i.totals[0]['planned'] for i in archived], [1, 1])
+
+    def test_search(self):
+        pages = self._walk(reverse('iteration_search'), {'search': 'xyz-001'})
+        self.assertEqual([len(p) for p in pages], [3, 3, 2])
+        matched = [i for i in self.iterations if i.reports.filter(task=self.tasks[0]).exists()]
+        self.assertEqual({i for page in pages for i in page}, set(matched))
+
+        with mock.patch('team.search.fts_enabled', return_value=False):
+            pages = self._walk(reverse('iteration_search'), {'search': 'task #1'})
+        self.assertEqual(sum(pages, []), matched)
+
+    def test_estimated_total(self):
+        self.assertIsNone(pagination.estimate_count(Iteration))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        resp = self.client.get(reverse('iterations'))
+        self.assertEqual(resp.context['page_obj'].estimated_total, len(self.iterations))
+
+
+class StatsTestCase(TeamBaseTestCase):
+
+    def _stats(self, iteration: Iteration, worker: Worker = None) -> tuple[int, ...]:
+        item = IterationStats.objects.get(iteration=iteration, worker=worker)
+        return item.planned, item.in_progress, item.done, item.agree, item.delegate
+
+    def test_incremental(self):
+        self.assertEqual(self._stats(self.iteration), (2, 2, 2, 6, 0))
+        self.assertEqual(self._stats(self.iteration, self.workers[0]), (1, 1, 1, 3, 0))
+
+        report = Report.objects.get(task=self.tasks[0])
+        report.status = Report.DONE
+        report.delegation = 'delegate'
+        report.worker = self.workers[1]
+        report.save()
+        self.assertEqual(self._stats(self.iteration), (1, 2, 3, 5, 1))
+        self.assertEqual(self._stats(self.iteration, self.workers[0]), (0, 1, 1, 2, 0))
+        self.assertEqual(self._stats(self.iteration, self.workers[1]), (1, 1, 2, 3, 1))
+
+        # the second save of the same object does not count it twice
+        report.save()
+        self.assertEqual(self._stats(self.iteration), (1, 2, 3, 5, 1))
+
+        report.delete()
+        self.assertEqual(self._stats(self.iteration), (1, 2, 2, 5, 0))
+
+        Report.objects.create(iteration=self.iteration, worker=self.workers[0], task=self.tasks[0])
+        self.assertEqual(self._stats(self.iteration), (2, 2, 2, 6, 0))
+
+    def test_deferred(self):
+        # initial values of deferred fields are reloaded before the change
+        report = Report.objects.only('comment').get(task=self.tasks[0])
+        report.comment = 'deferred'
+        report.save()
+        self.assertEqual(self._stats(self.iteration), (2, 2, 2, 6, 0))
+
+        report = Report.objects.only('comment').get(task=self.tasks[0])
+        report.status = Report.DONE
+        report.save()
+        self.assertEqual(self._stats(self.iteration), (1, 2, 3, 6, 0))
+        self.assertEqual(Report.objects.get(pk=report.pk).comment, 'deferred')
+
+        Report.objects.defer('status', 'worker').get(task=self.tasks[0]).delete()
+        self.assertEqual(self._stats(self.iteration), (1, 2, 2, 5, 0))
+        self.assertEqual(self._stats(self.iteration, self.workers[0]), (0, 1, 1, 2, 0))
+
+    def test_iteration_create(self):
+        self.client.post(reverse('iteration_create', kwargs={'pk': self.iteration.pk}))
+        iteration = Iteration.objects.first()
+        self.assertNotEqual(iteration, self.iteration)
+        self.assertEqual(self._stats(iteration), (4, 0, 0, 4, 0))
+
+    def test_cascade_delete(self):
+        worker_id = self.workers[0].pk
+        self.workers[0].delete()
+        self.assertFalse(IterationStats.objects.filter(worker_id=worker_id).exists())
+        self.assertEqual(self._stats(self.iteration), (1, 1, 1, 3, 0))
+
+        self.iteration.delete()
+        self.assertFalse(IterationStats.objects.exists())
+
+    def test_rebuild(self):
+        IterationStats.objects.filter(worker=None).update(planned=100)
+        out = StringIO()
+        call_command('rebuild_stats', stdout=out)
+        self.assertIn('rebuilt with 3 rows', out.getvalue())
+        self.assertEqual(self._stats(self.iteration), (2, 2, 2, 6, 0))
+
+    def test_list_queries(self):
+        Iteration.objects.create(start=self.iteration.start - timedelta(days=14))
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('iterations'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'team_report' in q['sql']])
+        self.assertContains(resp, '<td>2</td>', count=3)
+
+
+class AnalyticsTestCase(TeamBaseTestCase):
+
+    def _next_iteration(self) -> Iteration:
+        latest = Iteration.objects.first()
+        self.client.post(reverse('iteration_create', kwargs={'pk': latest.pk}))
+        return Iteration.objects.first()
+
+    def test_summary(self):
+        second = self._next_iteration()
+        second.reports.filter(task=self.tasks[0]).update(status=Report.DONE)
+        third = self._next_iteration()
+
+        state = analytics.calculate()
+        self.assertEqual([iteration_id for iteration_id, _ in state.versions], [self.iteration.pk, second.pk, third.pk])
+        self.assertEqual(state.tasks[self.tasks[0].pk].carry_over, 1)
+        self.assertEqual(state.tasks[self.tasks[0].pk].cycle_time, 14)
+        self.assertEqual(state.tasks[self.tasks[1].pk].carry_over, 2)
+        self.assertIsNone(state.tasks[self.tasks[1].pk].cycle_time)
+        self.assertEqual(state.tasks[self.tasks[2].pk].cycle_time, 7)
+        self.assertEqual(state.workers[self.workers[0].pk].done, 2)
+        self.assertEqual(state.workers[self.workers[0].pk].iterations, 3)
+
+        resp = self.client.get(reverse('iteration_analytics'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'XYZ-002')
+
+    def test_incremental(self):
+        second = self._next_iteration()
+        analytics.calculate()
+        self._next_iteration()
+        with mock.patch('team.analytics.fold', wraps=analytics.fold) as fold:
+            analytics.calculate()
+        # the second iteration is closed now, the latest one is always calculated
+        self.assertEqual([c.args[1] for c in fold.call_args_list], [[second.pk], [Iteration.objects.first().pk]])
+
+        # changes of closed iterations cause full recalculation
+        report = Report.objects.get(iteration=self.iteration, task=self.tasks[0])
+        report.status = Report.DONE
+        report.save()
+        with mock.patch('team.analytics.fold', wraps=analytics.fold) as fold:
+            state = analytics.calculate()
+        self.assertEqual(fold.call_args_list[0].args[1], [self.iteration.pk, second.pk])
+        self.assertEqual(state.tasks[self.tasks[0].pk].cycle_time, 7)
+
+
+@override_settings(ROOT_URLCONF=get_urlconf(is_async=True))
+class AsyncViewsTestCase(TeamBaseTestCase):
+
+    async def test_iteration(self):
+        section_url = reverse('worker_section', kwargs={'pk': self.iteration.pk, 'worker_id': self.workers[0].pk})
+        for url in ('/', '/iterations/{}/'.format(self.iteration.id)):
+            resp = await self.async_client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertInHTML(str(self.iteration), resp.content.decode())
+            self.assertContains(resp, 'Create Next')
+            self.assertContains(resp, section_url)
+            with override_settings(LAZY_WORKER_SECTIONS=False):
+                resp = await self.async_client.get(url)
+            self.assertContains(resp, self.tasks[0].title)
+
+    async def test_iterations(self):
+        resp = await self.async_client.get('/iterations/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.context['iterations']), [self.iteration])
+
+        resp = await self.async_client.get('/iterations/search/', {'search': 'xyz-002'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.context['iterations']), [self.iteration])
+
+        resp = await self.async_client.get('/iterations/', {'cursor': 'invalid'})
+        self.assertEqual(resp.status_code, 404)
+
+    async def test_export(self):
+        for url, planned in (('/iterations/{}/export/', False), ('/iterations/{}/export/planned/', True)):
+            resp = await self.async_client.get(url.format(self.iteration.id))
+            self.assertEqual(resp.status_code, 200)
+            content = b''.join([part async for part in resp.streaming_content]).decode()
+            expected = await sync_to_async(Export(self.iteration, planned=planned).render)()
+            self.assertEqual(content, expected)
+
+
+class RecordingBroker(team_events.Broker):
+    """Broker which keeps published events"""
+    published: list[tuple[str, team_events.Event]] = []
+
+    def publish(self, channel: str, event: team_events.Event) -> None:
+        self.published.append((channel, event))
+
+
+@override_settings(EVENT_BROKER='team.tests.RecordingBroker')
+class EventsTestCase(TeamBaseTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        RecordingBroker.published = []
+        self.channel = team_events.channel(self.iteration.pk)
+
+    def test_report_events(self):
+        report = Report.objects.filter(worker=self.workers[0], status=Report.PLANNED).first()
+        url = reverse('report_update', kwargs={'pk': report.pk})
+        data = {'comment': 'live', 'status': Report.DONE, 'delegation': report.delegation}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, data={**data, 'worker': self.workers[1].pk})
+        [(channel, event)] = RecordingBroker.published
+        self.assertEqual(channel, self.channel)
+        self.assertEqual(event.name, 'reports')
+        self.assertEqual(event.data, {
+            'action': 'updated',
+            'report': report.pk,
+            'workers': {
+                str(self.workers[0].pk): {'planned': 0, 'in_progress': 1, 'done': 1},
+                str(self.workers[1].pk): {'planned': 1, 'in_progress': 1, 'done': 2},
+            },
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('report_delete', kwargs={'pk': report.pk}))
+        _, event = RecordingBroker.published[-1]
+        self.assertEqual(event.data['action'], 'deleted')
+        self.assertEqual(list(event.data['workers']), [str(self.workers[1].pk)])
+
+        # rolled back changes are not published
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Report.objects.first().save()
+        self.assertTrue(callbacks)
+        self.assertEqual(len(RecordingBroker.published), 2)
+
+    def test_iteration_event(self):
+        url = reverse('iteration_update', kwargs={'pk': self.iteration.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, data={'comment': 'stand-up notes'})
+        self.assertEqual(
+            RecordingBroker.published,
+            [(self.channel, team_events.Event('iteration', {'comment': 'stand-up notes'}))],
+        )
+
+    @override_settings(EVENT_BROKER='team.events.InProcessBroker')
+    def test_no_subscribers(self):
+        report = Report.objects.first()
+        with self.assertNumQueries(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                report.save()
+
+    @override_settings(EVENT_BROKER='team.events.InProcessBroker', EVENTS_QUEUE_SIZE=2)
+    async def test_in_process_broker(self):
+        broker = team_events.get_broker()
+        event = team_events.Event('iteration', {'comment': ''})
+        async with broker.subscribe(self.channel) as subscription:
+            self.assertTrue(broker.has_subscribers(self.channel))
+            self.assertIsNone(await subscription.get(timeout=0.01))
+            # publishers are threads of synchronous views
+            await asyncio.to_thread(broker.publish, self.channel, event)
+            broker.publish(team_events.channel(0), event)
+            self.assertEqual(await subscription.get(timeout=1), event)
+
+            for _ in range(3):
+                broker.publish(self.channel, event)
+            await asyncio.sleep(0)
+            self.assertEqual(await subscription.get(timeout=1), team_events.OVERFLOW)
+            self.assertTrue(subscription.queue.empty())
+        self.assertFalse(broker.has_subscribers(self.channel))
+
+    @override_settings(EVENT_BROKER='team.events.InProcessBroker', EVENTS_ENABLED=True, EVENTS_HEARTBEAT=0.01)
+    async def test_stream(self):
+        url = reverse('iteration_events', kwargs={'pk': self.iteration.pk})
+        resp = await self.async_client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        stream = aiter(resp.streaming_content)
+        self.assertEqual(await anext(stream), f'retry: {settings.EVENTS_RETRY}\n\n'.encode())
+        self.assertEqual(await anext(stream), b': ping\n\n')
+
+        team_events.get_broker().publish(self.channel, team_events.Event('iteration', {'comment': 'live'}))
+        self.assertEqual(await anext(stream), b'event: iteration\ndata: {"comment":"live"}\n\n')
+        # the server closes the response content on disconnect, the stream is finalized by the event loop
+        await stream.aclose()
+        del resp, stream
+        gc.collect()
+        await asyncio.sleep(0.01)
+        self.assertFalse(team_events.get_broker().has_subscribers(self.channel))
+
+        resp = await self.async_client.get(reverse('iteration_events', kwargs={'pk': 0}))
+        self.assertEqual(resp.status_code, 404)
+        resp = await self.async_client.post(url)
+        self.assertEqual(resp.status_code, 405)
+
+    async def test_disabled(self):
+        url = reverse('iteration_events', kwargs={'pk': self.iteration.pk})
+        resp = await self.async_client.get(reverse('iteration', kwargs={'pk': self.iteration.pk}))
+        self.assertNotContains(resp, 'data-events')
+        resp = await self.async_client.get(url)
+        self.assertEqual(resp.status_code, 204)
+
+        with override_settings(EVENTS_ENABLED=True):
+            resp = await self.async_client.get(reverse('iteration', kwargs={'pk': self.iteration.pk}))
+            self.assertContains(resp, f'data-events="{url}"')
+            # the endless stream would block threads of WSGI server
+            resp = await sync_to_async(self.client.get)(url)
+            self.assertEqual(resp.status_code, 204)
+
+    @override_settings(EVENT_BROKER='team.events.DatabaseBroker', EVENTS_RETENTION=60)
+    def test_database_broker(self):
+        broker = team_events.get_broker()
+        self.assertIsInstance(broker, team_events.DatabaseBroker)
+        self.assertTrue(broker.has_subscribers(self.channel))
+        event = team_events.Event('iteration', {'comment': 'live'})
+        EventMessage.objects.create(channel=self.channel, name='old', created=timezone.now() - timedelta(hours=1))
+        broker.publish(self.channel, event)
+        broker.publish(team_events.channel(0), event)
+        [message] = broker.fetch(0, [self.channel])
+        self.assertEqual((message.name, message.data), event)
+        self.assertEqual(broker.last_id(), message.id + 1)
+        self.assertEqual(EventMessage.objects.count(), 2)
+
+    @override_settings(EVENT_BROKER='team.events.DatabaseBroker', EVENTS_POLL_INTERVAL=0.01)
+    async def test_database_broker_poll(self):
+        broker = team_events.get_broker()
+        event = team_events.Event('iteration', {'comment': 'live'})
+        messages = [EventMessage(id=5, channel=self.channel, name=event.name, data=event.data)]
+        fetched = []
+
+        def fetch(last_id: int, channels: list[str]) -> list[EventMessage]:
+            fetched.append((last_id, channels))
+            return messages if len(fetched) == 2 else []
+
+        # the test transaction is not visible to the thread pool of the poller
+        with mock.patch.object(broker, 'last_id', return_value=3), mock.patch.object(broker, 'fetch', fetch):
+            async with broker.subscribe(self.channel) as subscription:
+                self.assertEqual(await subscription.get(timeout=1), event)
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.05)
+        self.assertEqual(fetched[:3], [(3, [self.channel]), (3, [self.channel]), (5, [self.channel])])
+        self.assertTrue(broker._poller.done())
+
+
+def query_plan(query) -> list[str]:
+    """EXPLAIN QUERY PLAN details of SQL, a queryset or a query"""
+    if isinstance(query, str):
+        sql, params = query, ()
+    else:
+        sql, params = getattr(query, 'query', query).sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class LatestIterationTestCase(TeamBaseTestCase):
+
+    def test_pointer(self):
+        self.assertEqual(latest.get_iteration(), self.iteration)
+        with self.assertNumQueries(0):
+            self.assertEqual(latest.get_iteration(), self.iteration)
+            self.assertTrue(self.iteration.is_last)
+
+        # other processes take it from the shared cache
+        with mock.patch.object(latest, '_latest', None), self.assertNumQueries(0):
+            self.assertEqual(latest.get_iteration(), self.iteration)
+
+        # a copy is returned, so view attributes are not shared
+        latest.get_iteration().form = 'form'
+        self.assertFalse(hasattr(latest.get_iteration(), 'form'))
+
+        iteration = Iteration.objects.create(start=self.iteration.start + timedelta(days=7))
+        self.assertEqual(latest.get_iteration(), iteration)
+        self.assertFalse(self.iteration.is_last)
+        iteration.delete()
+        self.assertEqual(latest.get_iteration(), self.iteration)
+
+    def test_views(self):
+        self.client.get('/')
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "team_iteration"' in q['sql']])
+
+        resp = self.client.post(reverse('iteration_create', kwargs={'pk': self.iteration.pk}))
+        self.assertEqual(resp.status_code, 302)
+        resp = self.client.get('/')
+        self.assertEqual(resp.context['iteration'], Iteration.objects.first())
+        self.assertNotEqual(resp.context['iteration'], self.iteration)
+
+
+@skipUnless(find_spec('jinja2'), 'jinja2 is not installed')
+class JinjaTemplatesTestCase(TeamBaseTestCase):
+
+    def _contents(self, urls: list[str]) -> list[str]:
+        contents = []
+        for url in urls:
+            cache.clear()
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            # CSRF tokens are masked differently for every request
+            contents.append(re.sub(r'(name="csrfmiddlewaretoken" value=")\w+', r'\1', resp.getvalue().decode()))
+        return contents
+
+    @mock.patch('team.views.shuffle', lambda workers: None)
+    @mock.patch.object(IterationListView, 'paginate_by', 1)
+    def test_parity(self):
+        from team.jinja import TimedJinja2
+
+        worker = Worker.objects.filter(pk=self.workers[0].pk)
+        worker.update(name='John "O\'Neil" <&>', dashboard='https://t.com/?a=1&b=2')
+        Task.objects.filter(pk=self.tasks[1].pk).update(title='Long <title> ' * 10)
+        report = Report.objects.get(task=self.tasks[2])
+        report.comment = 'It\'s <b>done</b>'
+        report.save()
+        Iteration.objects.create(start=self.iteration.start - timedelta(days=7), comment='previous & "old"')
+        pk = self.iteration.pk
+        urls = [
+            '/', f'/iterations/{pk}/', '/iterations/', '/iterations/search/?search=xyz',
+            f'/iterations/{pk}/workers/{self.workers[0].pk}/',
+            f'/iterations/{pk}/export/', f'/iterations/{pk}/export/planned/',
+        ]
+        # pages with all worker sections
+        pages = ['/', f'/iterations/{pk}/']
+        expected = self._contents(urls)
+        with override_settings(LAZY_WORKER_SECTIONS=False):
+            expected += self._contents(pages)
+        templates = [settings.JINJA2_TEMPLATES_BACKEND, *settings.TEMPLATES]
+        with override_settings(TEMPLATES=templates, FORM_RENDERER=settings.JINJA2_FORM_RENDERER):
+            self.assertIsInstance(get_template('team/iteration.html').backend, TimedJinja2)
+            contents = self._contents(urls)
+            with override_settings(LAZY_WORKER_SECTIONS=False):
+                contents += self._contents(pages)
+            export = Export(self.iteration, planned=True).render()
+        self.assertEqual(export, Export(self.iteration, planned=True).render())
+
+        self.assertIn('?cursor=', contents[2])
+        self.assertIn('John &quot;O&#x27;Neil&quot; &lt;&amp;&gt;', contents[0])
+        for url, django_content, jinja_content in zip(urls + pages, expected, contents):
+            with self.subTest(url=url):
+                if '/export/' in url:
+                    self.assertEqual(jinja_content, django_content)
+                else:
+                    # HTML is the same up to whitespace between tags
+                    self.assertEqual(jinja_content.split(), django_content.split())
+
+
+class QueryPlanTestCase(TeamBaseTestCase):
+    """Hot queries must be served by indexes without full scans and temporary sorting of all rows"""
+
+    def setUp(self) -> None:
+        super().setUp()
+        # the planner chooses join order by statistics of a team like data
+        generate(workers=10, weeks=10, reports=50)
+        team_db.optimize(analyze=True)
+
+    def assertIndexedPlan(self, query, scans: tuple[str, ...] = (), index: str = '') -> None:
+        """
+        Only small tables from scans can be read completely,
+        a temporary sorting is allowed for the right part of ORDER BY only, i.e. within groups of rows read in order.
+        """
+        plan = query_plan(query)
+        failed = [
+            line for line in plan
+            if 'TEMP B-TREE' in line and 'RIGHT PART' not in line
+            or line.startswith('SCAN ') and line.split()[1] not in scans
+        ]
+        self.assertFalse(failed, '\n'.join(plan))
+        if index:
+            self.assertIn(index, '\n'.join(plan))
+
+    def test_iteration_reports(self):
+        with CaptureQueriesContext(connection) as ctx:
+            worker_reports = IterationDetailView._prepare_data(self.iteration)
+        for _, reports in worker_reports:
+            keys = [(report.status, report.task.number) for report in reports]
+            self.assertEqual(keys, sorted(keys))
+        sql = next(q['sql'] for q in ctx.captured_queries if 'FROM "team_report"' in q['sql'])
+        # workers are read in sections order and their reports by the composite index, tasks numbers are sorted
+        # within status groups only
+        self.assertIndexedPlan(sql, scans=('team_worker',), index='report_iteration_worker_index')
+        self.assertIndexedPlan(Export(self.iteration).reports, scans=('team_worker',))
+
+    def test_report_exists(self):
+        # ReportCreateForm.clean() check
+        self.assertIndexedPlan(self.iteration.reports.filter(task=self.tasks[0]).query.exists())
+
+    def test_enabled_workers(self):
+        queryset = ReportForm.base_fields['worker'].queryset
+        self.assertIndexedPlan(queryset, scans=('team_worker',), index='worker_enabled_index')
+
+
+class SqliteTestCase(TestCase):
+
+    def test_pragmas(self):
+        expected = {name: settings.SQLITE_PRAGMAS[name] for name in ('busy_timeout', 'cache_size')}
+        with connection.cursor() as cursor:
+            for name, value in expected.items():
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], value)
+
+
+class AdminTestCase(TeamBaseTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        user = User.objects.create_superuser('admin', 'admin@test.com', 'password')
+        self.client.force_login(user)
+
+    def test_report_changelist(self):
+        url = reverse('admin:team_report_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        # task trackers are selected by the same query
+        num_queries = len(ctx.captured_queries)
+        Report.objects.create(iteration=Iteration.objects.create(), worker=self.workers[0], task=self.tasks[0])
+        with self.assertNumQueries(num_queries):
+            self.client.get(url)
+
+        self.workers[1].disabled = True
+        self.workers[1].save()
+        resp = self.client.get(url, {'worker': self.workers[0].pk, 'iteration': self.iteration.pk})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['cl'].result_count, 3)
+        worker_filter = resp.context['cl'].filter_specs[-1]
+        self.assertEqual([name for _, name in worker_filter.lookup_choices], [self.workers[0].name])
+
+    def test_estimated_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Report.objects.create(iteration=Iteration.objects.create(), worker=self.workers[0], task=self.tasks[0])
+        url = reverse('admin:team_report_changelist')
+        with mock.patch.object(ReportAdmin, 'list_per_page', 5):
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(url)
+            self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+            self.assertEqual(len(resp.context['cl'].result_list), 5)
+
+            # statistics are not updated yet, the last page is not cut by them
+            resp = self.client.get(url, {'p': 2})
+            self.assertEqual(len(resp.context['cl'].result_list), 2)
+            self.assertEqual(resp.context['cl'].paginator.count, Report.objects.count())
+
+        paginator = pagination.EstimatedCountPaginator(Report.objects.order_by('id'), 5)
+        self.assertEqual(paginator.count, 6)
+        self.assertEqual(len(paginator.page(1)), 5)
+        self.assertEqual(paginator.count, 6)
+        self.assertEqual(len(paginator.page(2)), 2)
+        self.assertEqual((paginator.count, paginator.num_pages), (7, 2))
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+        # small tables are counted exactly
+        self.assertEqual(pagination.EstimatedCountPaginator(Report.objects.all(), 10).count, 7)
+
+    def test_report_change_form(self):
+        resp = self.client.get(reverse('admin:team_report_change', args=[Report.objects.first().pk]))
+        self.assertEqual(resp.status_code, 200)
+        content = resp.content.decode()
+        self.assertNotIn(self.tasks[1].number, content)
+        self.assertIn('vForeignKeyRawIdAdminField', content)
+
+
 class FlatPagesTestCase(TestCase):
 
     def setUp(self) -> None:
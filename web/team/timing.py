@@ -0,0 +1,123 @@
+"""
+Request timings: database queries and templates rendering.
+
+A collector is bound to the current context by TimingMiddleware,
+queries are measured by the execute wrapper of every connection and templates by TimedDjangoTemplates backend.
+The context is copied to threads of sync_to_async, so queries of their connections are measured too.
+"""
+import heapq
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+_current: ContextVar[Optional['Timing']] = ContextVar('timing', default=None)
+
+
+class Timing:
+    """Durations of one request, slowest queries are kept as a min-heap of (duration, counter, sql)"""
+
+    def __init__(self, slow_queries: int = 3) -> None:
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.slow_queries = slow_queries
+        self.slowest: list[tuple[float, int, str]] = []
+        self._template_depth = 0
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add_query(self, sql: str, duration: float) -> None:
+        self.db += duration
+        self.queries += 1
+        item = (duration, self.queries, sql)
+        if len(self.slowest) < self.slow_queries:
+            heapq.heappush(self.slowest, item)
+        elif self.slowest and duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def slowest_queries(self) -> list[dict[str, Any]]:
+        items = sorted(self.slowest, reverse=True)
+        return [{'sql': sql, 'ms': round(duration * 1000, 2)} for duration, _, sql in items]
+
+    @contextmanager
+    def template_rendering(self) -> Iterator[None]:
+        # templates rendered inside another template are already measured
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template += time.perf_counter() - started
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add_query(sql, time.perf_counter() - started)
+
+
+def current() -> Optional[Timing]:
+    return _current.get()
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Adds the query to the collector of the current context"""
+    timing = current()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing.execute_wrapper(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_wrapper(sender, connection, **kwargs) -> None:
+    """Connections of every thread are measured, a wrapper object is kept after reconnects"""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+@contextmanager
+def collect(slow_queries: int = 3) -> Iterator[Timing]:
+    """Binds a new collector to the current context, queries of all connections in this context are measured"""
+    timing = Timing(slow_queries)
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+class TimedTemplate:
+    """Template wrapper which adds rendering time to the current collector"""
+
+    def __init__(self, template) -> None:
+        self.template = template
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None) -> str:
+        timing = current()
+        if timing is None:
+            return self.template.render(context, request)
+        with timing.template_rendering():
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
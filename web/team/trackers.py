@@ -0,0 +1,52 @@
+from typing import Iterable, Optional
+
+from team import cache
+from team.models import Tracker
+
+VERSION_KEY = cache.version_key('trackers')
+
+
+def normalize(url: str) -> str:
+    return url.strip().rstrip('/')
+
+
+class TrackerIndex:
+    """Trackers by normalized URLs"""
+
+    def __init__(self, trackers: Iterable[Tracker]) -> None:
+        self.prefixes = {normalize(tracker.url): tracker for tracker in trackers}
+
+    def resolve(self, url: str) -> Optional[tuple[Tracker, str]]:
+        """
+        Tracker with the longest URL prefix of the task URL and task number.
+        Prefixes are looked up from the task URL base to shorter parent paths,
+        the rest of the path after the tracker URL is kept in the number, so the task URL is the same.
+        """
+        prefix, sep, number = normalize(url).rpartition('/')
+        while sep and prefix and number:
+            tracker = self.prefixes.get(prefix)
+            if tracker is not None:
+                return tracker, number
+            prefix, sep, segment = prefix.rpartition('/')
+            number = f'{segment}/{number}'
+        return None
+
+
+# process cache of the index and its version
+_index: tuple[int, TrackerIndex] | None = None
+
+
+def get_index() -> TrackerIndex:
+    global _index
+    version = cache.get_versions([VERSION_KEY])[VERSION_KEY]
+    if _index is None or _index[0] != version:
+        _index = version, TrackerIndex(Tracker.objects.all())
+    return _index[1]
+
+
+def reset_index() -> None:
+    cache.bump_versions([VERSION_KEY])
+
+
+def resolve(url: str) -> Optional[tuple[Tracker, str]]:
+    return get_index().resolve(url)
@@ -1,29 +1,37 @@
+from django.conf import settings
 from django.urls import path
 
-from team.views import (
-    index,
-    iteration_create,
-    iteration_export,
-    iteration_export_planned,
-    IterationDetailView,
-    IterationListView,
-    IterationSearchListView,
-    IterationUpdateView,
-    report_create,
-    report_delete,
-    ReportUpdateView,
-)
+from team import async_views, views
 
-urlpatterns = [
-    path('', index, name='index'),
-    path('iterations/', IterationListView.as_view(), name='iterations'),
-    path('iterations/search/', IterationSearchListView.as_view(), name='iteration_search'),
-    path('iterations/<int:pk>/', IterationDetailView.as_view(), name='iteration'),
-    path('iterations/<int:pk>/create/', iteration_create, name='iteration_create'),
-    path('iterations/<int:pk>/update/', IterationUpdateView.as_view(), name='iteration_update'),
-    path('iterations/<int:pk>/export/', iteration_export, name='iteration_export'),
-    path('iterations/<int:pk>/export/planned/', iteration_export_planned, name='iteration_export_planned'),
-    path('reports/<int:pk>/update/', ReportUpdateView.as_view(), name='report_update'),
-    path('reports/<int:pk>/delete/', report_delete, name='report_delete'),
-    path('reports/create/<int:iteration_id>/<int:worker_id>/', report_create, name='report_create'),
-]
+
+def get_urlpatterns(is_async: bool = False) -> list:
+    """URL patterns, read-only views are asynchronous if is_async"""
+    read_views = async_views if is_async else views
+    return [
+        path('', read_views.index, name='index'),
+        path('iterations/', read_views.IterationListView.as_view(), name='iterations'),
+        path('iterations/analytics/', views.iteration_analytics, name='iteration_analytics'),
+        path('iterations/search/', read_views.IterationSearchListView.as_view(), name='iteration_search'),
+        path('iterations/<int:pk>/', read_views.IterationDetailView.as_view(), name='iteration'),
+        path('iterations/<int:pk>/create/', views.iteration_create, name='iteration_create'),
+        path('iterations/<int:pk>/workers/<int:worker_id>/', views.worker_section, name='worker_section'),
+        path('iterations/<int:pk>/events/', async_views.iteration_events, name='iteration_events'),
+        path('iterations/<int:pk>/update/', views.IterationUpdateView.as_view(), name='iteration_update'),
+        path('iterations/<int:pk>/export/', read_views.iteration_export, name='iteration_export'),
+        path(
+            'iterations/<int:pk>/export/planned/',
+            read_views.iteration_export_planned,
+            name='iteration_export_planned',
+        ),
+        path('iterations/<int:pk>/import/', views.report_import, name='report_import'),
+        path('exports/', views.export_jobs, name='export_jobs'),
+        path('exports/create/', views.export_job_create, name='export_job_create'),
+        path('exports/<int:pk>/download/', views.export_job_download, name='export_job_download'),
+        path('reports/batch/', views.reports_batch_update, name='reports_batch_update'),
+        path('reports/<int:pk>/update/', views.ReportUpdateView.as_view(), name='report_update'),
+        path('reports/<int:pk>/delete/', views.report_delete, name='report_delete'),
+        path('reports/create/<int:iteration_id>/<int:worker_id>/', views.report_create, name='report_create'),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.ASYNC_VIEWS)
@@ -1,28 +1,51 @@
+import csv
+import json
+from datetime import date, datetime, timedelta
 from itertools import groupby
 from random import shuffle
-from typing import Any, Iterable, TypeAlias
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional, TextIO, TypeAlias
 
 from django.conf import settings
 from django.contrib import messages
 from django.db import models, transaction
-from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed, HttpResponseRedirect
-from django.shortcuts import get_object_or_404, redirect, reverse
+from django.forms import BaseForm
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
-from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.views.generic import DetailView, ListView, UpdateView
 
-from team.forms import IterationForm, ReportCreateForm, ReportForm
-from team.models import Iteration, iteration_dates, Report, Worker
+from team import analytics, archive, batch, cache, events, importer, jobs, latest, rollover, search, stats
+from team.forms import ExportJobForm, IterationForm, ReportCreateForm, ReportForm, ReportImportForm
+from team.models import ArchivedIteration, ArchivedReport, ExportJob, Iteration, Report, Worker
+from team.pagination import CursorPage, InvalidCursor, IterationPaginator
 
 
 ReportType: TypeAlias = list[tuple[str, bool, tuple[Report, ...]]]
+# cached fragments are shared between users, so CSRF token is substituted for every request
+CSRF_PLACEHOLDER = 'CSRFTOKENPLACEHOLDER'
 
 
 class Export:
     """Export processor"""
 
-    def __init__(self, iteration: Iteration, planned: bool = False) -> None:
+    FORMATS = ('text', 'csv', 'json', 'ndjson')
+    FIELDS = ('iteration', 'worker', 'number', 'url', 'title', 'status', 'delegation', 'comment')
+
+    def __init__(self, iteration: Iteration | ArchivedIteration, planned: bool = False) -> None:
+        self.iteration = iteration
         self.planned = planned
         self.reports = iteration.reports.filter(worker__no_export=False).select_related(
             'worker', 'task__tracker'
@@ -36,49 +59,143 @@ class Export:
             return True
         return status != Report.PLANNED
 
+    def _worker_reports(self, items: Iterable[Report]) -> ReportType:
+        return [
+            (self.status_map[status], self._show_comment(status), tuple(task_items))
+            for status, task_items in groupby(items, lambda y: y.status)
+        ]
+
+    def _worker_planned_reports(self, items: Iterable[Report]) -> list[tuple[str, bool, list[Report]]]:
+        worker_reports = {
+            status: list(task_items)
+            for status, task_items in groupby(items, lambda y: y.status)
+        }
+        in_progress = worker_reports.get(Report.IN_PROGRESS, [])
+        worker_reports.setdefault(Report.PLANNED, []).extend(in_progress)
+
+        return [
+            (self.status_map[status], self._show_comment(status), items)
+            for status, items in sorted(worker_reports.items(), key=lambda x: x[0])
+        ]
+
     def get_reports(self) -> list[tuple[Worker, ReportType]]:
-        result: list[tuple[Worker, ReportType]] = []
         reports: list[Report] = list(self.reports)
-
-        for worker, items in groupby(reports, lambda x: x.worker):
-            worker_reports: ReportType = [
-                (self.status_map[status], self._show_comment(status), tuple(task_items))
-                for status, task_items in groupby(items, lambda y: y.status)
-            ]
-            result.append((worker, worker_reports))
-
-        return result
+        return [(worker, self._worker_reports(items)) for worker, items in groupby(reports, lambda x: x.worker)]
 
     def get_planned_reports(self) -> list[tuple[Worker, list[tuple[str, bool, list[Report]]]]]:
         """It returns in-progress reports duplicated in planned section"""
-        result = []
         reports = list(self.reports)
-        for worker, items in groupby(reports, lambda x: x.worker):
-            worker_reports = {
-                status: list(task_items)
-                for status, task_items in groupby(items, lambda y: y.status)
-            }
-            in_progress = worker_reports.get(Report.IN_PROGRESS, [])
-            worker_reports.setdefault(Report.PLANNED, []).extend(in_progress)
-
-            reports = [
-                (self.status_map[status], self._show_comment(status), items)
-                for status, items in sorted(worker_reports.items(), key=lambda x: x[0])
-            ]
-            result.append((worker, reports))
-        return result
+        return [
+            (worker, self._worker_planned_reports(items))
+            for worker, items in groupby(reports, lambda x: x.worker)
+        ]
+
+    def iter_reports(self, chunk_size: int = settings.EXPORT_CHUNK_SIZE) -> Iterator[tuple[Worker, list]]:
+        """
+        Lazy version of get_reports/get_planned_reports,
+        only reports of one worker are kept in memory.
+        """
+        worker_reports = self._worker_planned_reports if self.planned else self._worker_reports
+        for worker, items in groupby(self.reports.iterator(chunk_size=chunk_size), lambda x: x.worker):
+            yield worker, worker_reports(items)
 
     def render(self) -> str:
         reports = self.get_planned_reports() if self.planned else self.get_reports()
         return render_to_string('team/export.txt', {'result': reports, 'planned': self.planned})
 
+    def _render_worker(self, worker: Worker, status_reports: list) -> str:
+        context = {'worker': worker, 'status_reports': status_reports, 'planned': self.planned}
+        return render_to_string('team/export_worker.txt', context)
+
+    def stream(self) -> Iterator[str]:
+        """Export content by parts, the joined result is the same as render() one"""
+        yield render_to_string('team/export_header.txt')
+        for worker, status_reports in self.iter_reports():
+            yield self._render_worker(worker, status_reports)
+        yield '\n'
+
+    async def astream(self) -> AsyncIterator[str]:
+        """Asynchronous version of stream()"""
+        worker_reports = self._worker_planned_reports if self.planned else self._worker_reports
+        yield render_to_string('team/export_header.txt')
+        worker, items = None, []
+        async for report in self.reports:
+            if items and report.worker != worker:
+                yield self._render_worker(worker, worker_reports(items))
+                items = []
+            worker = report.worker
+            items.append(report)
+        if items:
+            yield self._render_worker(worker, worker_reports(items))
+        yield '\n'
+
+    def rows(self, chunk_size: int = settings.EXPORT_CHUNK_SIZE) -> Iterator[dict[str, str]]:
+        """Flat reports data for machine-readable formats"""
+        iteration = str(self.iteration)
+        for report in self.reports.iterator(chunk_size=chunk_size):
+            yield {
+                'iteration': iteration,
+                'worker': report.worker.name,
+                'number': report.task.number,
+                'url': report.task.url,
+                'title': report.task.title,
+                'status': report.status,
+                'delegation': report.delegation,
+                'comment': report.comment,
+            }
+
+    def write(self, output: TextIO, fmt: str = 'text') -> int:
+        """Writes export in the format to the output, returns a number of reports"""
+        if fmt == 'text':
+            for part in self.stream():
+                output.write(part)
+            return self.reports.count()
+        return self.write_rows(self.rows(), output, fmt)
+
+    @classmethod
+    def write_rows(cls, rows: Iterable[dict[str, str]], output: TextIO, fmt: str) -> int:
+        """Writes rows in the machine-readable format to the output, returns a number of rows"""
+        count = 0
+        if fmt == 'csv':
+            writer = csv.DictWriter(output, fieldnames=cls.FIELDS)
+            writer.writeheader()
+            for count, row in enumerate(rows, 1):
+                writer.writerow(row)
+        elif fmt == 'json':
+            output.write('[')
+            for count, row in enumerate(rows, 1):
+                output.write(('\n' if count == 1 else ',\n') + json.dumps(row, ensure_ascii=False))
+            output.write('\n]\n')
+        elif fmt == 'ndjson':
+            for count, row in enumerate(rows, 1):
+                output.write(json.dumps(row, ensure_ascii=False) + '\n')
+        else:
+            raise ValueError(f'unknown export format "{fmt}"')
+        return count
+
 
 class IterationListView(ListView):
-    queryset = Iteration.objects.all()
+    queryset = stats.with_totals(Iteration.objects.all())
     context_object_name = 'iterations'
     paginate_by = settings.OBJECTS_PER_PAGE
     template_name = 'team/iterations.html'
 
+    def get_page(self, queryset: models.QuerySet[Iteration], per_page: int, cursor: Optional[str]) -> CursorPage:
+        paginator = IterationPaginator(
+            queryset, per_page, estimate=settings.PAGINATION_ESTIMATED_TOTAL, archived=ArchivedIteration.objects.all(),
+        )
+        page = paginator.page(cursor)
+        stats.with_archived_totals(page.object_list)
+        return page
+
+    def paginate_queryset(self, queryset, page_size):
+        """Keyset pagination instead of Paginator, "page_obj" is a CursorPage"""
+        try:
+            page = self.get_page(queryset, page_size, self.request.GET.get('cursor'))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return None, page, page.object_list, page.has_other_pages
+
 
 class IterationSearchListView(IterationListView):
 
@@ -87,60 +204,121 @@ class IterationSearchListView(IterationListView):
         context_data['search'] = self.request.GET.get('search')
         return context_data
 
-    def get_queryset(self) -> models.QuerySet['Iteration']:
-        queryset = super().get_queryset()
-        search = self.request.GET.get('search')
-        if search is not None:
-            reports = Report.objects.filter(
-                models.Q(comment__icontains=search) |
-                models.Q(task__number__icontains=search) |
-                models.Q(task__title__icontains=search) |
-                models.Q(iteration__comment__icontains=search)
-            )
-            reports = reports.filter(iteration__in=queryset)
-            iteration_ids = set(reports.values_list('iteration_id', flat=True))
-            if iteration_ids:
-                queryset = queryset.filter(id__in=iteration_ids)
-            else:
-                queryset = Iteration.objects.none()
-        return queryset
+    def get_page(self, queryset: models.QuerySet[Iteration], per_page: int, cursor: Optional[str]) -> CursorPage:
+        query = self.request.GET.get('search', '').strip()
+        if not query:
+            return super().get_page(queryset, per_page, cursor)
+        return search.search_page(query, per_page, cursor)
 
 
 class IterationDetailView(DetailView):
     queryset = Iteration.objects.all()
     context_object_name = 'iteration'
     template_name = 'team/iteration.html'
+    archived_template_name = 'team/archived_iteration.html'
+
+    def get_object(self, queryset=None) -> Iteration | ArchivedIteration:
+        iteration = archive.get_iteration(self.kwargs[self.pk_url_kwarg])
+        if iteration is None:
+            raise Http404(_('iteration not found'))
+        return iteration
+
+    def get_template_names(self) -> list[str]:
+        if self.object.is_archived:
+            return [self.archived_template_name]
+        return super().get_template_names()
 
     @staticmethod
-    def _set_reports_form(reports: Iterable[Report]) -> list[Report]:
+    def _set_reports_form(reports: Iterable[Report], choices: Optional[dict[str, list]] = None) -> list[Report]:
         result = []
+        choices = choices or ReportForm.shared_choices()
         for r in reports:
-            r.form = ReportForm(instance=r)
+            r.form = ReportForm(instance=r, choices=choices)
             result.append(r)
 
         return result
 
     @classmethod
     def _prepare_data(cls, i: Iteration) -> list[tuple[Worker, list[Report]]]:
-        result = []
         i.form = IterationForm(instance=i)
         reports = i.reports.select_related('worker', 'task__tracker').order_by('worker', 'status', 'task')
-        for worker, items in groupby(reports, lambda x: x.worker):
-            worker.form = ReportCreateForm(iteration=i)
-            result.append((worker, cls._set_reports_form(items)))
-        return result
+        return [(worker, list(items)) for worker, items in groupby(reports, lambda x: x.worker)]
+
+    @classmethod
+    def _render_section(cls, i: Iteration, worker: Worker, reports: list[Report], choices: dict[str, list]) -> str:
+        worker.form = ReportCreateForm(iteration=i)
+        context = {
+            'iteration': i,
+            'worker': worker,
+            'reports': cls._set_reports_form(reports, choices),
+            'csrf_token': CSRF_PLACEHOLDER,
+        }
+        return render_to_string('team/worker_reports.html', context)
+
+    @classmethod
+    def render_sections(
+            cls,
+            request: HttpRequest,
+            i: Iteration,
+            worker_reports: list[tuple[Worker, list[Report]]],
+            choices: Optional[dict[str, list]] = None,
+    ) -> list[tuple[Worker, str]]:
+        """
+        Worker sections HTML, only changed ones are rendered,
+        others are taken from the fragments cache.
+        """
+        keys = cache.worker_section_keys(i.pk, (worker.pk for worker, _ in worker_reports))
+        sections = cache.get_fragments(keys.values())
+        rendered = {}
+        for worker, reports in worker_reports:
+            key = keys[worker.pk]
+            if key not in sections:
+                choices = choices or ReportForm.shared_choices()
+                sections[key] = rendered[key] = cls._render_section(i, worker, reports, choices)
+        cache.set_fragments(rendered)
+
+        csrf_token = get_token(request)
+        return [
+            (worker, mark_safe(sections[keys[worker.pk]].replace(CSRF_PLACEHOLDER, csrf_token)))
+            for worker, _ in worker_reports
+        ]
+
+    @classmethod
+    def worker_section(cls, request: HttpRequest, i: Iteration, worker: Worker) -> str:
+        """Section of one worker, reports are loaded only if it is not cached"""
+        reports = i.reports.filter(worker=worker).select_related('worker', 'task__tracker')
+        reports = reports.order_by('status', 'task')
+        [(_, section)] = cls.render_sections(request, i, [(worker, reports)])
+        return section
 
     @staticmethod
-    def workers_order(worker_reports: list[tuple[Worker, list[Report]]]) -> list[Worker]:
-        workers = [worker for worker, _ in worker_reports]
+    def workers_order(workers: Iterable[Worker]) -> list[Worker]:
+        workers = list(workers)
         shuffle(workers)
         return workers
 
+    @staticmethod
+    def archived_worker_reports(i: ArchivedIteration) -> list[tuple[Worker, list[ArchivedReport]]]:
+        reports = i.reports.select_related('worker', 'task__tracker').order_by('worker', 'status', 'task')
+        return [(worker, list(items)) for worker, items in groupby(reports, lambda x: x.worker)]
+
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         data = super().get_context_data(**kwargs)
-        if self.object:
-            data['worker_reports'] = self._prepare_data(self.object)
-            data['workers'] = self.workers_order(data['worker_reports'])
+        if self.object and self.object.is_archived:
+            data['worker_reports'] = self.archived_worker_reports(self.object)
+        elif self.object:
+            data['is_last'] = self.object.is_last
+            data['missed_weeks'] = rollover.missed_weeks(self.object)
+            data['import_form'] = ReportImportForm()
+            if settings.LAZY_WORKER_SECTIONS:
+                self.object.form = IterationForm(instance=self.object)
+                data['worker_totals'] = list(stats.worker_totals(self.object))
+                data['events_url'] = events.events_url(self.object.pk)
+                data['workers'] = self.workers_order(item.worker for item in data['worker_totals'])
+            else:
+                worker_reports = self._prepare_data(self.object)
+                data['worker_sections'] = self.render_sections(self.request, self.object, worker_reports)
+                data['workers'] = self.workers_order(worker for worker, _ in worker_reports)
         return data
 
 
@@ -165,15 +343,56 @@ class ReportUpdateView(PostUpdateView):
     def get_success_url(self) -> str:
         return self.object.anchor_url
 
+    def form_valid(self, form: ReportForm) -> HttpResponse:
+        if not is_partial(self.request):
+            return super().form_valid(form)
+        # the section of the updated form, the report can be moved to another worker
+        worker = Worker.objects.get(pk=form.initial['worker'])
+        self.object = form.save()
+        return worker_section_response(self.request, self.object.iteration, worker)
+
+    def form_invalid(self, form: ReportForm) -> HttpResponse:
+        if not is_partial(self.request):
+            return super().form_invalid(form)
+        return partial_error(_('report can not be updated: {}'), form)
+
+
+def is_partial(request: HttpRequest) -> bool:
+    """Request of the iteration page script which expects a worker section instead of a redirect"""
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+def worker_section_response(request: HttpRequest, iteration: Iteration, worker: Worker) -> HttpResponse:
+    return HttpResponse(IterationDetailView.worker_section(request, iteration, worker))
+
+
+def partial_error(msg: str, form: BaseForm) -> HttpResponse:
+    msgs = [e for errors in form.errors.values() for e in errors]
+    return HttpResponse(msg.format(', '.join(msgs)), status=400, content_type='text/plain; charset=utf-8')
+
+
+@require_GET
+def worker_section(request: HttpRequest, pk: int, worker_id: int) -> HttpResponse:
+    iteration = get_object_or_404(Iteration, pk=pk)
+    worker = get_object_or_404(Worker, pk=worker_id)
+    return worker_section_response(request, iteration, worker)
+
 
 def index(request: HttpRequest) -> HttpResponse:
-    iteration = Iteration.objects.first()
+    iteration = latest.get_iteration()
+    if iteration is None:
+        raise Http404(_('no iterations'))
     return IterationDetailView.as_view()(request, pk=iteration.pk)
 
 
+@require_GET
+def iteration_analytics(request: HttpRequest) -> HttpResponse:
+    return render(request, 'team/analytics.html', {'summary': analytics.summary()})
+
+
 @require_POST
 @transaction.atomic()
-def report_create(request: HttpRequest, iteration_id: int, worker_id: int) -> HttpResponseRedirect:
+def report_create(request: HttpRequest, iteration_id: int, worker_id: int) -> HttpResponse:
     iteration = get_object_or_404(Iteration, pk=iteration_id)
     worker = get_object_or_404(Worker, pk=worker_id)
 
@@ -184,9 +403,13 @@ def report_create(request: HttpRequest, iteration_id: int, worker_id: int) -> Ht
         report.iteration = iteration
         report.worker = worker
         report.save()
+        if is_partial(request):
+            return worker_section_response(request, iteration, worker)
         msg = _('report #{} was successfully created')
         messages.success(request, msg.format(report.id))
         url = report.anchor_url
+    elif is_partial(request):
+        return partial_error(_('report can not be created: {}'), form)
     else:
         msgs = [e for errors in form.errors.values() for e in errors]
         msg = _('report can not be created: {}')
@@ -195,18 +418,61 @@ def report_create(request: HttpRequest, iteration_id: int, worker_id: int) -> Ht
     return redirect(url)
 
 
+@require_POST
+def report_import(request: HttpRequest, pk: int) -> HttpResponseRedirect:
+    iteration = get_object_or_404(Iteration, pk=pk)
+    form = ReportImportForm(data=request.POST, files=request.FILES)
+    if not form.is_valid():
+        msgs = [e for errors in form.errors.values() for e in errors]
+        messages.error(request, _('reports can not be imported: {}').format(', '.join(msgs)))
+        return redirect('iteration', pk)
+
+    upload = form.cleaned_data['file']
+    try:
+        rows = importer.read_rows(upload, upload.name)
+    except (ValueError, csv.Error) as e:
+        messages.error(request, _('reports can not be imported: {}').format(e))
+        return redirect('iteration', pk)
+
+    result = importer.import_reports(iteration, rows)
+    messages.success(request, _('{} reports were imported').format(len(result.created)))
+    for number, error in result.errors[:settings.IMPORT_ERRORS_LIMIT]:
+        messages.error(request, _('row {}: {}').format(number, error))
+    return redirect('iteration', pk)
+
+
 @require_POST
 @transaction.atomic()
-def report_delete(request: HttpRequest, pk: int) -> HttpResponseRedirect:
+def report_delete(request: HttpRequest, pk: int) -> HttpResponse:
     report = get_object_or_404(Report, pk=pk)
     url = report.anchor_url
     msg = _('report #{} was successfully deleted')
 
     report.delete()
+    if is_partial(request):
+        return worker_section_response(request, report.iteration, report.worker)
     messages.success(request, msg.format(pk))
     return redirect(url)
 
 
+@require_POST
+def reports_batch_update(request: HttpRequest) -> JsonResponse:
+    """Changes of reports as a JSON list or {"reports": [...]}, valid changes are saved even if others fail"""
+    try:
+        data = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': _('invalid JSON')}, status=400)
+    items = data.get('reports') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return JsonResponse({'error': _('a list of reports is expected')}, status=400)
+    if len(items) > settings.BATCH_UPDATE_LIMIT:
+        msg = _('too many reports, the limit is {}').format(settings.BATCH_UPDATE_LIMIT)
+        return JsonResponse({'error': msg}, status=400)
+
+    results = batch.update_reports(items)
+    return JsonResponse({'results': results, 'updated': sum(result['ok'] for result in results)})
+
+
 @require_POST
 @transaction.atomic()
 def iteration_create(request: HttpRequest, pk: int) -> HttpResponseRedirect:
@@ -214,48 +480,131 @@ def iteration_create(request: HttpRequest, pk: int) -> HttpResponseRedirect:
     if not base_iteration.is_last:
         messages.error(request, _('this iteration is not the latest'))
         return redirect('iteration', pk)
+    try:
+        weeks = int(request.POST.get('weeks') or 1)
+    except ValueError:
+        weeks = 0
+    if not 1 <= weeks <= settings.ROLLOVER_MAX_WEEKS:
+        messages.error(request, _('invalid number of weeks'))
+        return redirect('iteration', pk)
 
-    start, stop = iteration_dates(base_iteration.start)
-
-    iteration = Iteration.objects.create(start=start, stop=stop)
-    base_reports = base_iteration.reports.filter(
-        status__in=(Report.PLANNED, Report.IN_PROGRESS),
-    )
     # reports migration to planned status
-    reports = [
-        Report(
-            iteration=iteration,
-            worker_id=r.worker_id,
-            task_id=r.task_id,
-            status=Report.PLANNED,
-        )
-        for r in base_reports
-    ]
-    items = Report.objects.bulk_create(reports, batch_size=100)
-    msg = _('iteration #{} was created with {} new reports')
-    messages.success(request, msg.format(iteration.id, len(items)))
+    iterations, count = rollover.rollover(base_iteration, weeks)
+    if weeks == 1:
+        msg = _('iteration #{} was created with {} new reports').format(iterations[0].id, count)
+    else:
+        msg = _('{} iterations were created with {} new reports').format(weeks, count)
+    messages.success(request, msg)
     return redirect('index')
 
 
-@require_GET
-def iteration_export(request: HttpRequest, pk: int) -> HttpResponse:
-    iteration = get_object_or_404(Iteration, pk=pk)
-    exporter = Export(iteration)
-    response = HttpResponse(exporter.render(), content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="iteration_{}_{}.txt"'.format(
+def export_version(request: HttpRequest, pk: int) -> tuple[str, datetime]:
+    version = getattr(request, 'export_version', None)
+    if version is None:
+        version = request.export_version = cache.export_version(pk)
+    return version
+
+
+def export_etag(request: HttpRequest, pk: int) -> str:
+    etag, _ = export_version(request, pk)
+    return etag
+
+
+def export_last_modified(request: HttpRequest, pk: int) -> datetime:
+    _, modified = export_version(request, pk)
+    return modified
+
+
+def cached_stream(key: str, parts: Iterable[str]) -> Iterator[str]:
+    """Yields parts and saves them to the cache if the full content is not too big"""
+    content, size = [], 0
+    for part in parts:
+        size += len(part)
+        if size <= settings.EXPORT_CACHE_MAX_SIZE:
+            content.append(part)
+        yield part
+    if size <= settings.EXPORT_CACHE_MAX_SIZE:
+        cache.set_export(key, ''.join(content))
+
+
+def export_filename(iteration: Iteration | ArchivedIteration, planned: bool = False) -> str:
+    return 'iteration_{}{}_{}.txt'.format(
+        'planned_' if planned else '',
         iteration.start.strftime('%Y%m%d'),
         iteration.stop.strftime('%Y%m%d'),
     )
+
+
+def export_response(
+        request: HttpRequest, iteration: Iteration | ArchivedIteration, planned: bool = False,
+) -> HttpResponse:
+    etag, _ = export_version(request, iteration.pk)
+    key = cache.export_key(etag, planned)
+    content = cache.get_export(key)
+    if content is not None:
+        response = HttpResponse(content, content_type='text/plain')
+    elif settings.EXPORT_STREAMING:
+        exporter = Export(iteration, planned=planned)
+        response = StreamingHttpResponse(cached_stream(key, exporter.stream()), content_type='text/plain')
+    else:
+        content = Export(iteration, planned=planned).render()
+        cache.set_export(key, content)
+        response = HttpResponse(content, content_type='text/plain')
+
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(iteration, planned)}"'
     return response
 
 
 @require_GET
+@condition(etag_func=export_etag, last_modified_func=export_last_modified)
+def iteration_export(request: HttpRequest, pk: int) -> HttpResponse:
+    iteration = archive.get_iteration(pk)
+    if iteration is None:
+        raise Http404(_('iteration not found'))
+    return export_response(request, iteration)
+
+
+@require_GET
+@condition(etag_func=export_etag, last_modified_func=export_last_modified)
 def iteration_export_planned(request: HttpRequest, pk: int) -> HttpResponse:
-    iteration = get_object_or_404(Iteration, pk=pk)
-    exporter = Export(iteration, planned=True)
-    response = HttpResponse(exporter.render(), content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="iteration_planned_{}_{}.txt"'.format(
-        iteration.start.strftime('%Y%m%d'),
-        iteration.stop.strftime('%Y%m%d'),
+    iteration = archive.get_iteration(pk)
+    if iteration is None:
+        raise Http404(_('iteration not found'))
+    return export_response(request, iteration, planned=True)
+
+
+@require_GET
+def export_jobs(request: HttpRequest) -> HttpResponse:
+    today = date.today()
+    context = {
+        'jobs': ExportJob.objects.all()[:settings.OBJECTS_PER_PAGE],
+        'form': ExportJobForm(initial={'date_from': today - timedelta(days=365), 'date_to': today}),
+    }
+    return render(request, 'team/export_jobs.html', context)
+
+
+@require_POST
+def export_job_create(request: HttpRequest) -> HttpResponseRedirect:
+    form = ExportJobForm(data=request.POST)
+    if not form.is_valid():
+        msgs = [e for errors in form.errors.values() for e in errors]
+        messages.error(request, _('export can not be started: {}').format(', '.join(msgs)))
+        return redirect('export_jobs')
+
+    job, created = jobs.submit(
+        form.cleaned_data['date_from'],
+        form.cleaned_data['date_to'],
+        form.cleaned_data['format'],
+        form.cleaned_data['planned'],
     )
-    return response
+    if created:
+        messages.success(request, _('export #{} was queued').format(job.pk))
+    else:
+        messages.info(request, _('the same export #{} is already queued').format(job.pk))
+    return redirect('export_jobs')
+
+
+@require_GET
+def export_job_download(request: HttpRequest, pk: int) -> FileResponse:
+    job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.DONE)
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename, content_type='application/gzip')
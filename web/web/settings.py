@@ -55,6 +55,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.contrib.flatpages.middleware.FlatpageFallbackMiddleware',
     'team.middleware.SettingsMiddleware',
+    'team.middleware.TimingMiddleware',
 ]
 
 # for flatpages and sites apps
@@ -65,7 +66,8 @@ ROOT_URLCONF = 'web.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates which measures rendering time for TimingMiddleware
+        'BACKEND': 'team.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,18 +81,65 @@ TEMPLATES = [
     },
 ]
 
+# Jinja2 versions of hot templates (team/jinja2) instead of Django ones, it requires jinja2 package
+JINJA2_TEMPLATES = False
+JINJA2_CACHE_DIR = None  # directory of compiled templates bytecode shared by processes
+JINJA2_TEMPLATES_BACKEND = {
+    # templates which are not found in team/jinja2 are rendered by the next Django backend
+    'BACKEND': 'team.jinja.TimedJinja2',
+    'DIRS': [],
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'environment': 'team.jinja.environment',
+        'keep_trailing_newline': True,  # like Django templates, form widgets templates expect the opposite
+        'context_processors': TEMPLATES[0]['OPTIONS']['context_processors'],
+    },
+}
+JINJA2_FORM_RENDERER = 'team.jinja.FormRenderer'
+
 WSGI_APPLICATION = 'web.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# cached fragments, exports and data versions have to be shared by all server processes,
+# use memcached or redis backend if processes run on several hosts.
+# Django file-based backend lists the whole directory on every write, this one does it once per CULL_INTERVAL,
+# evicted versions are initialized again (team.cache), so culling is safe
+CACHES = {
+    'default': {
+        'BACKEND': 'team.filecache.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_INTERVAL': 60,  # seconds
+        },
+    },
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,  # persistent connections, seconds
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # write lock is taken at the transaction start, so concurrent writers wait for busy timeout
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# pragmas of every new SQLite connection (team.db)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -20000,  # negative value is KiB
+    'busy_timeout': 5000,  # milliseconds
+    'temp_store': 'MEMORY',
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -131,11 +180,60 @@ LOCALE_PATHS = [
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+# files of background exports
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_URL = '/media/'
 # STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 META_DESCRIPTION = 'Team work report tool'
 META_AUTHOR = 'z0rr0'
 OBJECTS_PER_PAGE = 20
+PAGINATION_ESTIMATED_TOTAL = True  # approximate number of iterations by database statistics
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24  # seconds
+EXPORT_STREAMING = True
+EXPORT_CHUNK_SIZE = 500
+EXPORT_CACHE_TIMEOUT = 60 * 60 * 24  # seconds
+EXPORT_CACHE_MAX_SIZE = 1024 * 1024  # characters
+EXPORT_JOB_TIMEOUT = 10 * 60  # seconds, running jobs without heartbeat (stopped export workers) are queued again
+EXPORT_JOBS_KEEP_DAYS = 7  # finished export jobs and their files are deleted by export_worker command
+EXPORT_JOBS_CLEANUP_INTERVAL = 60 * 60  # seconds, export_worker deletes old jobs at start and after this interval
+EXPORT_WORKER_INTERVAL = 5  # seconds, export_worker polling interval of the empty queue
+IMPORT_ERRORS_LIMIT = 20
+ROLLOVER_MAX_WEEKS = 52  # iterations created by one request
+ARCHIVE_AFTER_WEEKS = 104  # default age of iterations for archive_iterations command
+ARCHIVE_CHUNK_SIZE = 1000  # reports moved by one transaction
+ANALYTICS_TASKS_LIMIT = 20  # the most carried over tasks
+# iteration page contains worker headers only, their reports are loaded by worker_section view
+LAZY_WORKER_SECTIONS = True
+BATCH_UPDATE_LIMIT = 500  # reports changed by one batch request
+# live changes of the iteration page (lazy worker sections), the events stream is served only by ASGI server,
+# enable it for ASGI deployments. In-process broker delivers events only if changes are served by the same process,
+# team.events.DatabaseBroker shares them between processes by the database table
+EVENTS_ENABLED = False
+EVENT_BROKER = 'team.events.InProcessBroker'
+EVENTS_QUEUE_SIZE = 100  # pending events of a client, a slow client gets "overflow" event instead of them
+EVENTS_HEARTBEAT = 15  # seconds, comment messages keep idle connections open
+EVENTS_RETRY = 5000  # milliseconds, reconnection delay of clients
+EVENTS_POLL_INTERVAL = 1.0  # seconds, DatabaseBroker polling of new events
+EVENTS_RETENTION = 60  # seconds, DatabaseBroker keeps published events
+SERVER_TIMING = True  # Server-Timing response header
+SLOW_REQUEST_TIME = 1.0  # seconds, slower requests are logged by "team.performance" logger
+SLOW_REQUEST_QUERIES = 100  # requests with more queries are logged too
+SLOW_REQUEST_LOGGED_QUERIES = 3  # number of the slowest queries in the log
+
+# asynchronous read-only views for ASGI server
+ASYNC_VIEWS = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'team.performance': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
 
 MESSAGE_TAGS = {
     messages.DEBUG: 'debug',
@@ -147,9 +245,16 @@ MESSAGE_TAGS = {
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
-if 'test' not in sys.argv:
+if 'test' in sys.argv:
+    # tests clear the cache, the shared one of running servers must not be touched
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+else:
     # overwrite custom settings
     try:
         from .local_settings import *  # noqa F403
     except ImportError:
         print('local settings ImportError')
+
+if JINJA2_TEMPLATES:
+    TEMPLATES = [JINJA2_TEMPLATES_BACKEND, *TEMPLATES]
+    FORM_RENDERER = JINJA2_FORM_RENDERER
@@ -13,16 +13,32 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from types import ModuleType
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.flatpages import views
 from django.urls import include, path
 
-urlpatterns = [
-    path('about/', views.flatpage, {'url': '/about/'}, name='about'),
-    path('', include('team.urls')),
-    path('admin/', admin.site.urls),
+from team.urls import get_urlpatterns as get_team_urlpatterns
+
+
+def get_urlpatterns(is_async: bool = False) -> list:
+    return [
+        path('about/', views.flatpage, {'url': '/about/'}, name='about'),
+        path('', include(get_team_urlpatterns(is_async))),
+        path('admin/', admin.site.urls),
+    ]
+
+
+def get_urlconf(is_async: bool) -> ModuleType:
+    """URL configuration module with sync or async read-only views, it can be used as ROOT_URLCONF"""
+    module = ModuleType('web.async_urls' if is_async else 'web.sync_urls')
+    module.urlpatterns = get_urlpatterns(is_async)
+    return module
+
 
-]
+urlpatterns = get_urlpatterns(settings.ASYNC_VIEWS)
 
 # if settings.DEBUG:
 #     urlpatterns += staticfiles_urlpatterns()